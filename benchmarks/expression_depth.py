@@ -0,0 +1,70 @@
+"""
+Benchmark translating a play with one deeply nested expression (a chain of adjectives, each of
+which doubles what follows it) of increasing length. The time and peak memory per adjective
+should stay about the same as the chain gets longer, since expressions are parsed without
+recursion and their code is built from fragments joined once.
+Run from anywhere: python benchmarks/expression_depth.py [--max-length N] [--target java|c]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from translator import TARGETS, translate
+
+
+def adjective_chain_play(length):
+    """:returns: a play which assigns a noun with length adjectives in front of it, and prints it."""
+    return '''Adjectives.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The only act.
+
+Scene I: The only scene.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Thou art a {}cat. Open your heart!
+
+[Exeunt]
+'''.format('big ' * length)
+
+
+def measure(spl, target):
+    """:returns: the time taken to translate spl and the peak memory allocated doing it."""
+    start = time.perf_counter()
+    translate(spl, 'Adjectives', target=target)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    translate(spl, 'Adjectives', target=target)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expression depth benchmark.')
+    parser.add_argument('--max-length', type=int, default=64000, help='The longest chain of adjectives.')
+    parser.add_argument('--target', choices=sorted(TARGETS), default='java', help='The language to translate to.')
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>12} {:>12} {:>14}'.format('adjectives', 'time (s)', 'us/adjective', 'peak (KB)',
+                                                    'bytes/adjective'))
+    length = 1000
+    while length <= args.max_length:
+        elapsed, peak = measure(adjective_chain_play(length), args.target)
+        print('{:>10} {:>10.3f} {:>12.2f} {:>12.0f} {:>14.0f}'.format(length, elapsed, elapsed / length * 1e6,
+                                                                      peak / 1024, peak / length))
+        length *= 2
+
+
+if __name__ == '__main__':
+    main()
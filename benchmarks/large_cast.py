@@ -0,0 +1,79 @@
+"""
+Benchmark translating plays with growing casts of made-up characters, each of whom is spoken
+to once, with a pair of fields per character and with --character-arrays. Reports the
+translation time and size of the Java code, and if javac and java are on the PATH, the size of
+the compiled classes and the time to start a JVM and run the play (mostly loading its classes).
+Run from anywhere: python benchmarks/large_cast.py [--sizes N ...]
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from translator import Translator
+
+
+def character_names(count):
+    """:returns: count made-up character names: Zzaaaa, Zzaaab, etc."""
+    names = (''.join(letters) for letters in itertools.product(string.ascii_lowercase, repeat=4))
+    return ['Zz' + name for name in itertools.islice(names, count)]
+
+
+def large_cast_play(names):
+    """:returns: a play in which each of names is spoken to by the one before, and prints a number."""
+    spl = 'A large cast.\n\n' + ''.join('%s, a person.\n' % name for name in names)
+    spl += '\nAct I: Everyone.\n\nScene I: Everyone in turn.\n\n'
+    for speaker, listener in zip(names, names[1:]):
+        spl += ('[Enter %s and %s]\n\n%s: You are as good as the sum of yourself and a cat! Open your heart!\n\n'
+                '[Exeunt]\n\n' % (speaker, listener, speaker))
+    return spl
+
+
+def run_java(directory, java):
+    """:returns: the total size of the class files compiled from java, and the time taken to run them."""
+    with open(os.path.join(directory, 'Cast.java'), 'w') as java_file:
+        java_file.write(java)
+    subprocess.run(['javac', 'Cast.java'], cwd=directory, check=True)
+    size = sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, '*.class')))
+    start = time.perf_counter()
+    subprocess.run(['java', 'Cast'], cwd=directory, stdout=subprocess.DEVNULL, check=True)
+    return size, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Large cast benchmark.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 4000, 16000],
+                        help='The numbers of characters in the plays.')
+    args = parser.parse_args()
+    has_jdk = shutil.which('javac') is not None and shutil.which('java') is not None
+
+    print('{:>10} {:>8} {:>14} {:>12} {:>12} {:>10}'.format('characters', 'arrays', 'translate (s)', 'java (KB)',
+                                                           'classes (KB)', 'run (s)'))
+    for size in args.sizes:
+        names = character_names(size)
+        translator = Translator(extra_words={'characters': names})
+        spl = large_cast_play(names)
+        for character_arrays in (False, True):
+            start = time.perf_counter()
+            java = translator.translate(spl, 'Cast', character_arrays=character_arrays)
+            elapsed = time.perf_counter() - start
+            classes = run = '-'
+            if has_jdk:
+                with tempfile.TemporaryDirectory() as tmp:
+                    class_size, run_time = run_java(tmp, java)
+                classes, run = '%.0f' % (class_size / 1024), '%.3f' % run_time
+            print('{:>10} {:>8} {:>14.3f} {:>12.0f} {:>12} {:>10}'.format(size, 'yes' if character_arrays else 'no',
+                                                                         elapsed, len(java) / 1024, classes, run))
+
+
+if __name__ == '__main__':
+    main()
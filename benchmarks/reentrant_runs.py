@@ -0,0 +1,139 @@
+"""
+Benchmark running a play many times: translated normally, each run needs a JVM of its own,
+while translated with --reentrant, one warm JVM runs instances of it on a thread pool, each
+with its input and output in memory. Reports the runs per second of each, and checks the
+instances' outputs match the normal translation's.
+Needs javac and java on the PATH.
+Run from anywhere: python benchmarks/reentrant_runs.py [--play NAME] [--input TEXT] [--runs N]
+    [--process-runs N] [--threads N]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from translator import translate
+
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+# runs the reentrant Play class args[0] times on a pool of args[1] threads, with stdin as the input
+# of every run, after as many runs again to warm up; prints the runs per second, then one output
+RUNNER = '''\
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.PrintStream;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.concurrent.Callable;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+
+public class Runner {
+\tstatic String runAll(ExecutorService pool, final byte[] input, int runs) throws Exception {
+\t\tList<Future<String>> futures = new ArrayList<Future<String>>();
+\t\tfor (int i = 0; i < runs; i++) {
+\t\t\tfutures.add(pool.submit(new Callable<String>() {
+\t\t\t\tpublic String call() {
+\t\t\t\t\tByteArrayOutputStream bytes = new ByteArrayOutputStream();
+\t\t\t\t\tPrintStream out = new PrintStream(bytes);
+\t\t\t\t\tnew Play(new ByteArrayInputStream(input), out).run();
+\t\t\t\t\tout.flush();
+\t\t\t\t\treturn bytes.toString();
+\t\t\t\t}
+\t\t\t}));
+\t\t}
+\t\tString output = null;
+\t\tfor (Future<String> future : futures) {
+\t\t\tString result = future.get();
+\t\t\tif (output != null && !output.equals(result)) {
+\t\t\t\tthrow new IllegalStateException("runs printed different outputs");
+\t\t\t}
+\t\t\toutput = result;
+\t\t}
+\t\treturn output;
+\t}
+
+\tpublic static void main(String[] args) throws Exception {
+\t\tint runs = Integer.parseInt(args[0]);
+\t\tExecutorService pool = Executors.newFixedThreadPool(Integer.parseInt(args[1]));
+\t\tbyte[] input = System.in.readAllBytes();
+\t\trunAll(pool, input, runs);
+\t\tlong start = System.nanoTime();
+\t\tString output = runAll(pool, input, runs);
+\t\tdouble seconds = (System.nanoTime() - start) / 1e9;
+\t\tpool.shutdown();
+\t\tSystem.out.println(runs / seconds);
+\t\tSystem.out.print(output);
+\t}
+}
+'''
+
+
+def compile_java(directory, spl, reentrant):
+    """Translate spl to Play.java in directory, with Runner.java if reentrant, and compile them."""
+    with open(os.path.join(directory, 'Play.java'), 'w') as java_file:
+        java_file.write(translate(spl, 'Play', reentrant=reentrant))
+    sources = ['Play.java']
+    if reentrant:
+        with open(os.path.join(directory, 'Runner.java'), 'w') as java_file:
+            java_file.write(RUNNER)
+        sources.append('Runner.java')
+    subprocess.run(['javac'] + sources, cwd=directory, check=True)
+
+
+def process_runs(directory, stdin, runs):
+    """:returns: the runs per second of starting a JVM to run Play each time, and the output of a run."""
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = subprocess.run(['java', 'Play'], cwd=directory, input=stdin, stdout=subprocess.PIPE, check=True)
+    return runs / (time.perf_counter() - start), result.stdout
+
+
+def pool_runs(directory, stdin, runs, threads):
+    """:returns: the runs per second of running Play instances on a thread pool in one JVM, and the output of a run."""
+    result = subprocess.run(['java', 'Runner', str(runs), str(threads)], cwd=directory, input=stdin,
+                            stdout=subprocess.PIPE, check=True)
+    rate, output = result.stdout.split(b'\n', 1)
+    return float(rate), output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reentrant class benchmark.')
+    parser.add_argument('--play', default='primes', help='The example play to run (default primes).')
+    parser.add_argument('--input', default='100\n', help='The input for every run of the play.')
+    parser.add_argument('--runs', type=int, default=10000, help='The number of runs in one JVM.')
+    parser.add_argument('--process-runs', type=int, default=20, help='The number of runs with a JVM each.')
+    parser.add_argument('--threads', type=int, default=os.cpu_count(), help='The size of the thread pool.')
+    args = parser.parse_args()
+
+    if shutil.which('javac') is None or shutil.which('java') is None:
+        sys.exit('This benchmark needs a JDK (javac and java) on the PATH.')
+
+    with open(os.path.join(EXAMPLES_DIR, args.play + '.spl'), 'r') as spl_file:
+        spl = spl_file.read()
+    stdin = args.input.encode()
+
+    with tempfile.TemporaryDirectory() as static_dir, tempfile.TemporaryDirectory() as reentrant_dir:
+        compile_java(static_dir, spl, False)
+        compile_java(reentrant_dir, spl, True)
+
+        static_rate, static_output = process_runs(static_dir, stdin, args.process_runs)
+        pool_rate, pool_output = pool_runs(reentrant_dir, stdin, args.runs, args.threads)
+        if pool_output != static_output:
+            sys.exit('The reentrant class printed %r instead of %r.' % (pool_output, static_output))
+
+    print('{:<32} {:>12}'.format('mode', 'runs/s'))
+    print('{:<32} {:>12.1f}'.format('static, a JVM per run', static_rate))
+    print('{:<32} {:>12.1f}'.format('reentrant, %d threads in one JVM' % args.threads, pool_rate))
+
+
+if __name__ == '__main__':
+    main()
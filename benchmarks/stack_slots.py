@@ -0,0 +1,104 @@
+"""
+Benchmark a loop which remembers and recalls a character each time round, translated normally
+(a real stack, so every remember boxes an Integer into an ArrayDeque in Java) and with
+--promote-stacks (fields). Reports the run time of each, in Java if javac and java are on the
+PATH and in C if a C compiler is, for the numbers of iterations given.
+Run from anywhere: python benchmarks/stack_slots.py [--counts N ...]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from translator import translate
+
+
+# counts down from the number read to 0, remembering Romeo twice and recalling him twice each step
+REMEMBERING_PLAY = '''A forgetful countdown.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The countdown.
+
+Scene I: Romeo learns the number.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Listen to your heart!
+
+Scene II: One fewer.
+
+Juliet:
+ Remember yourself. Remember yourself. You are twice yourself. Recall your past.
+ Recall your childhood. You are as good as the difference between yourself and a cat.
+ Are you better than nothing?
+
+Romeo:
+ If so, let us return to scene II.
+
+Scene III: Done.
+
+Juliet:
+ Open your heart!
+
+[Exeunt]
+'''
+
+CC = shutil.which(os.environ.get('CC', 'cc'))
+
+
+def build(directory, name, target, promote_stacks):
+    """Translate the play to the class or program called name in directory and compile it."""
+    code = translate(REMEMBERING_PLAY, name, target=target, structured=True, promote_stacks=promote_stacks)
+    if target == 'java':
+        with open(os.path.join(directory, name + '.java'), 'w') as java_file:
+            java_file.write(code)
+        subprocess.run(['javac', name + '.java'], cwd=directory, check=True)
+    else:
+        with open(os.path.join(directory, name + '.c'), 'w') as c_file:
+            c_file.write(code)
+        subprocess.run([CC, '-std=c99', '-O2', '-o', name, name + '.c', '-lm'], cwd=directory, check=True)
+
+
+def run(directory, name, target, count):
+    """:returns: the time taken to run the play built as name counting down from count."""
+    command = ['java', name] if target == 'java' else [os.path.join(directory, name)]
+    start = time.perf_counter()
+    subprocess.run(command, cwd=directory, input=b'%d\n' % count, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stack promotion benchmark.')
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000000, 10000000, 100000000],
+                        help='The numbers of loop iterations to time.')
+    args = parser.parse_args()
+
+    targets = []
+    if shutil.which('javac') is not None and shutil.which('java') is not None:
+        targets.append('java')
+    if CC is not None:
+        targets.append('c')
+    if not targets:
+        sys.exit('This benchmark needs a JDK (javac and java) or a C compiler on the PATH.')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print('{:>6} {:>10}  {:>12}  {:>12}'.format('target', 'iterations', 'stacks', 'fields'))
+        for target in targets:
+            build(tmp, 'Stacks', target, False)
+            build(tmp, 'Fields', target, True)
+            for count in args.counts:
+                print('{:>6} {:>10}  {:>10.3f} s  {:>10.3f} s'.format(target, count, run(tmp, 'Stacks', target, count),
+                                                                     run(tmp, 'Fields', target, count)))
+
+
+if __name__ == '__main__':
+    main()
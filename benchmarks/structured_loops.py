@@ -0,0 +1,96 @@
+"""
+Benchmark a loop made of a scene jumping back to itself, translated normally (a method per
+scene, so every iteration is another nested call) and with --structured (a real while loop).
+Reports the run time of each for growing iteration counts, and the count at which the normal
+translation runs out of stack.
+Needs javac and java on the PATH.
+Run from anywhere: python benchmarks/structured_loops.py [--counts N ...] [--java-options ...]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from translator import translate
+
+
+# counts down from the number read to 0, one scene jump per step
+COUNTDOWN_PLAY = '''A countdown.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The countdown.
+
+Scene I: Romeo learns the number.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Listen to your heart!
+
+Scene II: One fewer.
+
+Juliet:
+ You are the difference between yourself and a cat. Are you better than nothing?
+ If so, let us return to scene II.
+
+Scene III: Done.
+
+Juliet:
+ Open your heart!
+
+[Exeunt]
+'''
+
+
+def compile_java(directory, classname, structured):
+    with open(os.path.join(directory, classname + '.java'), 'w') as java_file:
+        java_file.write(translate(COUNTDOWN_PLAY, classname, structured=structured))
+    subprocess.run(['javac', classname + '.java'], cwd=directory, check=True)
+
+
+def run_java(directory, classname, count, java_options):
+    """:returns: the time taken in seconds, or None if the stack overflowed."""
+    start = time.perf_counter()
+    result = subprocess.run(['java'] + java_options + [classname], cwd=directory, input=b'%d\n' % count,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start
+    if b'StackOverflowError' in result.stderr:
+        return None
+    if result.returncode != 0 or result.stdout != b'0':
+        raise RuntimeError('%s failed: %s' % (classname, result.stderr.decode(errors='replace')))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scene loop benchmark.')
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 1000, 10000, 100000, 1000000, 10000000],
+                        help='The numbers of loop iterations to time.')
+    parser.add_argument('--java-options', nargs=argparse.REMAINDER, default=[],
+                        help='Options for the JVM, e.g. -Xss512k.')
+    args = parser.parse_args()
+
+    if shutil.which('javac') is None or shutil.which('java') is None:
+        sys.exit('This benchmark needs a JDK (javac and java) on the PATH.')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        compile_java(tmp, 'Calls', False)
+        compile_java(tmp, 'Loops', True)
+
+        print('{:>10}  {:>22}  {:>12}'.format('iterations', 'method per scene', 'structured'))
+        for count in args.counts:
+            calls = run_java(tmp, 'Calls', count, args.java_options)
+            loops = run_java(tmp, 'Loops', count, args.java_options)
+            print('{:>10}  {:>22}  {:>10.3f} s'.format(
+                count, 'StackOverflowError' if calls is None else '%.3f s' % calls, loops))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark translation throughput: the module-level translate() called once per play,
+against a single shared Translator used directly and from a thread pool, and against
+module-level translate() in a process pool.
+Run from anywhere: python benchmarks/translator_throughput.py [--jobs N] [--workers N]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import translator
+from translator import Translator
+
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples')
+
+
+def load_jobs(count):
+    """:returns: count (spl, java_classname) jobs, cycling through the example plays."""
+    plays = []
+    for filename in sorted(glob.glob(os.path.join(EXAMPLES_DIR, '*.spl'))):
+        with open(filename, 'r') as spl_file:
+            plays.append(spl_file.read())
+    return [(plays[i % len(plays)], 'Play%d' % i) for i in range(count)]
+
+
+def measure(name, jobs, func):
+    start = time.perf_counter()
+    results = func(jobs)
+    elapsed = time.perf_counter() - start
+    print('{:<36} {:>9.1f} plays/s  ({:.3f} s)'.format(name, len(jobs) / elapsed, elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Translation throughput benchmark.')
+    parser.add_argument('--jobs', type=int, default=400, help='The number of plays to translate.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='The pool size.')
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.jobs)
+    shared = Translator()
+
+    expected = measure('module translate(), one call per play', jobs,
+                       lambda jobs: [translator.translate(spl, name) for spl, name in jobs])
+    results = [
+        measure('Translator.translate_many()', jobs, shared.translate_many),
+    ]
+    with ThreadPoolExecutor(args.workers) as pool:
+        results.append(measure('Translator, %d threads' % args.workers, jobs,
+                               lambda jobs: shared.translate_many(jobs, pool)))
+    with ProcessPoolExecutor(args.workers) as pool:
+        # each worker process uses its own module-level translator
+        results.append(measure('module translate(), %d processes' % args.workers, jobs,
+                               lambda jobs: list(pool.map(translator.translate, *zip(*jobs)))))
+
+    for result in results:
+        assert result == expected, 'translations differ between modes'
+
+
+if __name__ == '__main__':
+    main()
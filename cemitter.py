@@ -0,0 +1,375 @@
+"""
+Generates a single portable C99 file for a parsed play, as an alternative to Java.
+Characters are int32_t with the same wraparound arithmetic as Java ints, stacks are
+growable arrays, and each act and scene is a label that jumps go straight to.
+"""
+
+from play import *
+
+
+C_PRELUDE = r'''/* Generated by Ryan Dancy's SPL to C translator. */
+#include <inttypes.h>
+#include <math.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef struct {
+	int32_t *items;
+	size_t size;
+	size_t capacity;
+} spl_stack;
+
+static void spl_die(const char *message) {
+	fflush(stdout);
+	fprintf(stderr, "Exception in SPL program: %s\n", message);
+	exit(1);
+}
+
+static void spl_push(spl_stack *stack, int32_t value) {
+	if (stack->size == stack->capacity) {
+		stack->capacity = stack->capacity ? stack->capacity * 2 : 16;
+		stack->items = realloc(stack->items, stack->capacity * sizeof *stack->items);
+		if (!stack->items) {
+			spl_die("out of memory");
+		}
+	}
+	stack->items[stack->size++] = value;
+}
+
+static int32_t spl_pop(spl_stack *stack) {
+	if (!stack->size) {
+		spl_die("java.util.NoSuchElementException (recalled from an empty stack)");
+	}
+	return stack->items[--stack->size];
+}
+
+/* Java int arithmetic: wrap around instead of overflowing */
+static int32_t spl_add(int32_t a, int32_t b) { return (int32_t) ((uint32_t) a + (uint32_t) b); }
+static int32_t spl_sub(int32_t a, int32_t b) { return (int32_t) ((uint32_t) a - (uint32_t) b); }
+static int32_t spl_mul(int32_t a, int32_t b) { return (int32_t) ((uint32_t) a * (uint32_t) b); }
+
+static int32_t spl_div(int32_t a, int32_t b) {
+	if (b == 0) {
+		spl_die("java.lang.ArithmeticException: / by zero");
+	}
+	return (a == INT32_MIN && b == -1) ? INT32_MIN : a / b;
+}
+
+static int32_t spl_mod(int32_t a, int32_t b) {
+	if (b == 0) {
+		spl_die("java.lang.ArithmeticException: / by zero");
+	}
+	return b == -1 ? 0 : a % b;
+}
+
+/* Java's (int) cast of a double: NaN is 0, out of range values saturate */
+static int32_t spl_d2i(double d) {
+	if (d != d) {
+		return 0;
+	}
+	if (d >= 2147483647.0) {
+		return INT32_MAX;
+	}
+	if (d <= -2147483648.0) {
+		return INT32_MIN;
+	}
+	return (int32_t) d;
+}
+
+static int32_t spl_square(int32_t x) { return spl_d2i((double) x * (double) x); }
+static int32_t spl_cube(int32_t x) { return spl_d2i((double) x * (double) x * (double) x); }
+static int32_t spl_sqrt(int32_t x) { return spl_d2i(sqrt((double) x)); }
+static int32_t spl_cbrt(int32_t x) { return spl_d2i(cbrt((double) x)); }
+
+/* buffered input which can look ahead, to act like java.util.Scanner */
+static unsigned char spl_in[1 << 16];
+static size_t spl_in_pos, spl_in_len;
+
+static int spl_peek(size_t ahead) {
+	if (spl_in_pos + ahead >= spl_in_len) {
+		memmove(spl_in, spl_in + spl_in_pos, spl_in_len - spl_in_pos);
+		spl_in_len -= spl_in_pos;
+		spl_in_pos = 0;
+		while (ahead >= spl_in_len) {
+			size_t n = fread(spl_in + spl_in_len, 1, sizeof spl_in - spl_in_len, stdin);
+			if (n == 0) {
+				return EOF;
+			}
+			spl_in_len += n;
+		}
+	}
+	return spl_in[spl_in_pos + ahead];
+}
+
+/* scanner.findInLine(".").charAt(0), or -1 at the end of a line or the input */
+static int32_t spl_read_char(void) {
+	int c = spl_peek(0);
+	int32_t code_point;
+	size_t length, i;
+	if (c == EOF || c == '\n' || c == '\r') {
+		return -1;
+	}
+	if (c < 0x80) {
+		spl_in_pos++;
+		return c;
+	}
+	length = c >= 0xF0 ? 4 : c >= 0xE0 ? 3 : c >= 0xC0 ? 2 : 1;
+	code_point = length == 4 ? c & 0x07 : length == 3 ? c & 0x0F : length == 2 ? c & 0x1F : 0xFFFD;
+	for (i = 1; i < length; i++) {
+		int next = spl_peek(i);
+		if (next == EOF || (next & 0xC0) != 0x80) {
+			length = i;
+			code_point = 0xFFFD;
+			break;
+		}
+		code_point = (code_point << 6) | (next & 0x3F);
+	}
+	if (code_point == 0x85 || code_point == 0x2028 || code_point == 0x2029) {
+		return -1; /* also line separators to Java */
+	}
+	spl_in_pos += length;
+	if (code_point > 0xFFFF) {
+		return 0xD800 + ((code_point - 0x10000) >> 10); /* the first char of a surrogate pair */
+	}
+	return code_point;
+}
+
+/* scanner.nextInt() */
+static int32_t spl_read_int(void) {
+	char token[64];
+	size_t length = 0;
+	int64_t value = 0;
+	size_t i = 0;
+	int c;
+	while ((c = spl_peek(0)) != EOF && (c == ' ' || (c >= '\t' && c <= '\r'))) {
+		spl_in_pos++;
+	}
+	if (c == EOF) {
+		spl_die("java.util.NoSuchElementException");
+	}
+	while ((c = spl_peek(0)) != EOF && !(c == ' ' || (c >= '\t' && c <= '\r'))) {
+		if (length < sizeof token - 1) {
+			token[length++] = (char) c;
+		} else {
+			spl_die("java.util.InputMismatchException");
+		}
+		spl_in_pos++;
+	}
+	token[length] = '\0';
+	if (token[0] == '-' || token[0] == '+') {
+		i = 1;
+	}
+	if (i == length) {
+		spl_die("java.util.InputMismatchException");
+	}
+	for (; i < length; i++) {
+		if (token[i] < '0' || token[i] > '9') {
+			spl_die("java.util.InputMismatchException");
+		}
+		value = value * 10 + (token[i] - '0');
+		if (value > 2147483648LL) {
+			spl_die("java.util.InputMismatchException");
+		}
+	}
+	if (token[0] == '-') {
+		value = -value;
+	}
+	if (value > INT32_MAX) {
+		spl_die("java.util.InputMismatchException");
+	}
+	return (int32_t) value;
+}
+
+/* System.out.print((char) x): write the UTF-16 code unit x as UTF-8 */
+static void spl_print_char(int32_t x) {
+	unsigned int c = (uint16_t) x;
+	if (c < 0x80) {
+		putchar((int) c);
+	} else if (c < 0x800) {
+		putchar(0xC0 | (c >> 6));
+		putchar(0x80 | (c & 0x3F));
+	} else if (c >= 0xD800 && c <= 0xDFFF) {
+		putchar('?'); /* an unpaired surrogate */
+	} else {
+		putchar(0xE0 | (c >> 12));
+		putchar(0x80 | ((c >> 6) & 0x3F));
+		putchar(0x80 | (c & 0x3F));
+	}
+}
+
+static void spl_print_int(int32_t x) {
+	printf("%" PRId32, x);
+}
+'''
+
+# how each kind of expression is written in C
+EXPR_FORMATS = {
+    EXPR_TWICE: 'spl_mul(2, {})',
+    EXPR_THRICE: 'spl_mul(3, {})',
+    EXPR_SQUARE: 'spl_square({})',
+    EXPR_CUBE: 'spl_cube({})',
+    EXPR_SQUARE_ROOT: 'spl_sqrt({})',
+    EXPR_CUBE_ROOT: 'spl_cbrt({})',
+    EXPR_HALF: '({} / 2)',
+    EXPR_SUM: 'spl_add({}, {})',
+    EXPR_DIFFERENCE: 'spl_sub({}, {})',
+    EXPR_PRODUCT: 'spl_mul({}, {})',
+    EXPR_QUOTIENT: 'spl_div({}, {})',
+    EXPR_REMAINDER: 'spl_mod({}, {})',
+}
+
+EXPR_PIECES = split_formats(EXPR_FORMATS)
+
+COMPARE_OPERATORS = {COMPARE_EQUAL: '==', COMPARE_GREATER: '>', COMPARE_LESS: '<'}
+
+# the most bytes put in one string literal (C99 compilers only have to allow 4095)
+STRING_CHUNK_LENGTH = 4000
+
+
+def utf8_chars(text):
+    """:returns: the bytes spl_print_char() writes for each UTF-16 code unit in text."""
+
+    out = bytearray()
+    for char in text:
+        if 0xD800 <= ord(char) <= 0xDFFF:
+            out += b'?' # an unpaired surrogate
+        else:
+            out += char.encode()
+    return bytes(out)
+
+
+def c_string(data):
+    """:returns: a C string literal for the bytes data."""
+
+    chars = []
+    for byte in data:
+        char = chr(byte)
+        if char in '\\"?':
+            chars.append('\\' + char) # \? so it can't be part of a trigraph
+        elif ' ' <= char <= '~':
+            chars.append(char)
+        else:
+            chars.append('\\%03o' % byte)
+    return '"' + ''.join(chars) + '"'
+
+
+def c_leaf(expr):
+    """:returns: the C code for a constant, character or local."""
+    if expr[0] == EXPR_CONSTANT:
+        return str(expr[1]) if expr[1] >= 0 else '(' + str(expr[1]) + ')'
+    return expr[1]
+
+
+def c_expression(expr):
+    """:returns: the C code for an expression."""
+    return ''.join(expression_fragments(expr, EXPR_PIECES, c_leaf))
+
+
+def c_condition(condition):
+    """:returns: the C code for the condition of a question, including the "if"."""
+
+    op, expr1, expr2, negated = condition
+    fmt_str = 'if (!({} {} {}))' if negated else 'if ({} {} {})'
+    return fmt_str.format(c_expression(expr1), COMPARE_OPERATORS[op], c_expression(expr2))
+
+
+def c_statement(statement, next_method):
+    """
+    :param statement: The statement.
+    :param next_method: The name of the method after this statement's method, or None.
+    :returns: the C code for a statement.
+    """
+
+    stmt_type = statement[0]
+
+    if stmt_type == STMT_ASSIGN or stmt_type == STMT_LOCAL:
+        return statement[1] + ' = ' + c_expression(statement[2]) + ';'
+
+    elif stmt_type == STMT_IF:
+        return c_condition(statement[1]) + ' ' + c_statement(statement[2], None)
+
+    elif stmt_type in GOTO_STMTS:
+        if stmt_type == STMT_NEXT and statement[1] == next_method:
+            return '/* on to %s */' % statement[1] # the label is right after this
+        return 'goto %s;' % statement[1]
+
+    elif stmt_type == STMT_PUSH:
+        return 'spl_push(&{0}_stk, {0});'.format(statement[1])
+
+    elif stmt_type == STMT_POP:
+        return '{0} = spl_pop(&{0}_stk);'.format(statement[1])
+
+    elif stmt_type == STMT_INPUT_NUMBER:
+        return '{} = spl_read_int();'.format(statement[1])
+
+    elif stmt_type == STMT_INPUT_CHARACTER:
+        return '{} = spl_read_char();'.format(statement[1])
+
+    elif stmt_type == STMT_OUTPUT_NUMBER:
+        return 'spl_print_int({});'.format(statement[1])
+
+    elif stmt_type == STMT_OUTPUT_CHARACTER:
+        return 'spl_print_char({});'.format(statement[1])
+
+    elif stmt_type == STMT_OUTPUT_STRING:
+        data = utf8_chars(statement[1])
+        chunks = [data[i:i + STRING_CHUNK_LENGTH] for i in range(0, len(data), STRING_CHUNK_LENGTH)]
+        return '\n\t'.join('fwrite(%s, 1, %d, stdout);' % (c_string(chunk), len(chunk)) for chunk in chunks)
+
+    else:
+        raise ValueError('Unknown statement type: ' + str(stmt_type))
+
+
+def emit_c(play):
+    """
+    Generate the C code for a play. Every act and scene is a label inside main(), so
+    jumps between scenes (and loops made of them) are plain gotos rather than calls.
+    :param play: The parsed Play.
+    :returns: A list of fragments of C code which make up the program when joined.
+    """
+
+    c = [C_PRELUDE, '\n']
+
+    # a number for each character that's used, and a stack for each that uses it
+    stacks = set(stack_characters(play))
+    for character in used_characters(play):
+        if character in play.initial_values:
+            value = c_expression((EXPR_CONSTANT, play.initial_values[character]))
+            c.append('static int32_t %s = %s;\n' % (character, value))
+        else:
+            c.append('static int32_t %s;\n' % character)
+        if character in stacks:
+            c.append('static spl_stack %s_stk;\n' % character)
+
+    c.append('''
+int main(void) {
+\tstatic char out_buf[1 << 16];
+\tsetvbuf(stdout, out_buf, _IOFBF, sizeof out_buf);
+''')
+
+    # locals are declared up here, since a declaration can't come right after a label
+    for local in play_locals(play):
+        c.append('\tint32_t %s;\n' % local)
+
+    # the stacks' contents at the start, bottom first
+    for character, stack in play.initial_stacks.items():
+        for value in stack:
+            c.append('\tspl_push(&%s_stk, %s);\n' % (character, c_expression((EXPR_CONSTANT, value))))
+
+    for i, method in enumerate(play.methods):
+        next_method = play.methods[i + 1].name if i + 1 < len(play.methods) else None
+
+        c.append('%s:\n' % method.name)
+        for statement in method.statements:
+            c.append('\t' + c_statement(statement, next_method) + '\n')
+        if falls_off_end(method):
+            c.append('\tgoto end;\n')
+
+    c.append('''end:
+\tfflush(stdout);
+\treturn 0;
+}
+''')
+    return c
@@ -0,0 +1,170 @@
+"""
+Estimates how big the bytecode javac generates for a play will be, so the Java generator can
+keep methods under HotSpot's huge-method limit and classes under the constant pool limit.
+
+The estimates follow the instructions javac emits for the code in javaemitter.py (e.g. an
+assignment is the expression followed by a putstatic, 3 bytes). They're a little high rather
+than low, and don't need to be exact: the limits they're checked against have headroom.
+"""
+
+from play import *
+
+
+HUGE_METHOD_LIMIT = 8000 # HotSpot's -XX:HugeMethodLimit: bigger methods are never JIT compiled
+JVM_METHOD_LIMIT = 65535 # the most bytes of bytecode a method can have
+CONSTANT_POOL_BUDGET = 32768 # the most constant pool entries to put in a class (out of 65535)
+
+METHOD_OVERHEAD = 1 # the return at the end
+CALL_SIZE = 3 # invokestatic, to chain one part of a method to the next
+CLASS_CONSTANTS = 64 # the class itself, java.lang.Math, Scanner, System.out etc.
+
+# the size of each kind of expression, not counting its operands
+EXPR_SIZES = {
+    EXPR_TWICE: 2, # iconst_2, imul
+    EXPR_THRICE: 2,
+    EXPR_SQUARE: 8, # i2d, ldc2_w 2.0, invokestatic Math.pow, d2i
+    EXPR_CUBE: 8,
+    EXPR_SQUARE_ROOT: 5, # i2d, invokestatic Math.sqrt, d2i
+    EXPR_CUBE_ROOT: 5,
+    EXPR_HALF: 2, # iconst_2, idiv
+    EXPR_SUM: 1,
+    EXPR_DIFFERENCE: 1,
+    EXPR_PRODUCT: 1,
+    EXPR_QUOTIENT: 1,
+    EXPR_REMAINDER: 1,
+}
+
+# the size of each kind of statement, not counting its expressions or conditions
+STMT_SIZES = {
+    STMT_ASSIGN: 3, # putstatic
+    STMT_LOCAL: 2, # istore
+    STMT_PUSH: 14, # getstatic x2, invokestatic Integer.valueOf, invokeinterface Deque.push
+    STMT_POP: 17, # getstatic, invokeinterface Deque.pop, checkcast, invokevirtual intValue, putstatic
+    STMT_INPUT_NUMBER: 9, # getstatic, invokevirtual nextInt, putstatic
+    STMT_INPUT_CHARACTER: 23, # the try/catch
+    STMT_OUTPUT_NUMBER: 9, # getstatic System.out, getstatic, invokevirtual print
+    STMT_OUTPUT_CHARACTER: 10, # and an i2c
+    STMT_JUMP: 4, # invokestatic, return
+    STMT_NEXT: 3, # invokestatic
+}
+
+# how many times each kind of statement loads or stores its character's value or stack
+CHARACTER_ACCESSES = {
+    STMT_ASSIGN: 1,
+    STMT_PUSH: 2,
+    STMT_POP: 2,
+    STMT_INPUT_NUMBER: 1,
+    STMT_INPUT_CHARACTER: 2, # in the try and in the catch
+    STMT_OUTPUT_NUMBER: 1,
+    STMT_OUTPUT_CHARACTER: 1,
+}
+
+CONDITION_SIZE = 3 # if_icmp<cond>
+STRING_CHUNK_SIZE = 9 # getstatic System.out, ldc_w, invokevirtual print
+
+# how many constant pool entries each kind of constant_keys() key takes up
+KEY_CONSTANTS = {
+    'field': 3, # Fieldref, NameAndType, Utf8 name
+    'method': 3, # Methodref, NameAndType, Utf8 name
+    'int': 1, # Integer
+    'string': 2, # String, Utf8
+}
+
+
+def int_size(value):
+    """:returns: the size of the instruction loading the int value."""
+    if -1 <= value <= 5:
+        return 1 # iconst_<n>
+    elif -128 <= value <= 127:
+        return 2 # bipush
+    return 3 # sipush, or ldc_w
+
+
+def character_field(character):
+    """:returns: the name of the field with a character's value: the character, or cast for an array element like cast[3]."""
+    return character.partition('[')[0]
+
+
+def character_size(character):
+    """:returns: the size of the bytecode loading or storing a character's value."""
+    field, bracket, index = character.partition('[')
+    if bracket:
+        return 3 + int_size(int(index[:-1])) + 1 # getstatic, the index, iaload or iastore
+    return 3 # getstatic or putstatic
+
+
+def node_size(expr):
+    """:returns: the estimated size of the bytecode for an expression, not counting its operands."""
+    if expr[0] == EXPR_CONSTANT:
+        return int_size(expr[1])
+    elif expr[0] == EXPR_CHARACTER:
+        return character_size(expr[1])
+    elif expr[0] == EXPR_LOCAL:
+        return 2 # iload
+    return EXPR_SIZES[expr[0]]
+
+
+def expression_size(expr):
+    """:returns: the estimated size of the bytecode for an expression."""
+    return sum(map(node_size, subexpressions(expr)))
+
+
+def statement_size(statement, string_chunk_length):
+    """
+    :param statement: The statement.
+    :param string_chunk_length: The most chars of a STMT_OUTPUT_STRING printed at once.
+    :returns: the estimated size of the bytecode for a statement.
+    """
+
+    statement, conditions = unguarded(statement)
+    size = sum(CONDITION_SIZE + expression_size(expr1) + expression_size(expr2) for _, expr1, expr2, _ in conditions)
+    if statement[0] == STMT_OUTPUT_STRING:
+        return size + STRING_CHUNK_SIZE * -(-len(statement[1]) // string_chunk_length)
+    size += STMT_SIZES[statement[0]]
+    if statement[0] in CHARACTER_ACCESSES:
+        # STMT_SIZES counts a getstatic or putstatic for each
+        size += CHARACTER_ACCESSES[statement[0]] * (character_size(statement[1]) - 3)
+    if statement[0] == STMT_ASSIGN or statement[0] == STMT_LOCAL:
+        size += expression_size(statement[2])
+    return size
+
+
+def expression_keys(expr, keys):
+    """Add the constant_keys() of an expression to the set keys."""
+    for node in subexpressions(expr):
+        if node[0] == EXPR_CONSTANT:
+            if not -32768 <= node[1] <= 32767:
+                keys.add(('int', node[1])) # too big for sipush
+        elif node[0] == EXPR_CHARACTER:
+            keys.add(('field', character_field(node[1])))
+
+
+def constant_keys(statement, keys, string_chunk_length):
+    """
+    Add the constant pool entries a statement needs to the set keys, as (kind, name) pairs where
+    kind is one of KEY_CONSTANTS. Entries the generated classes all need anyway aren't included.
+    """
+
+    statement, conditions = unguarded(statement)
+    for _, expr1, expr2, _ in conditions:
+        expression_keys(expr1, keys)
+        expression_keys(expr2, keys)
+
+    if statement[0] in GOTO_STMTS:
+        keys.add(('method', statement[1]))
+    elif statement[0] == STMT_LOCAL:
+        expression_keys(statement[2], keys)
+    elif statement[0] == STMT_OUTPUT_STRING:
+        text = statement[1]
+        keys.update(('string', text[i:i + string_chunk_length]) for i in range(0, len(text), string_chunk_length))
+    else:
+        keys.add(('field', character_field(statement[1])))
+        if statement[0] in (STMT_PUSH, STMT_POP):
+            keys.add(('field', character_field(statement[1]) + '_stk'))
+        elif statement[0] == STMT_ASSIGN:
+            expression_keys(statement[2], keys)
+
+
+def keys_constants(keys):
+    """:returns: the number of constant pool entries the constant_keys() keys take up."""
+    return sum(KEY_CONSTANTS[kind] for kind, _ in keys)
@@ -0,0 +1,194 @@
+"""
+Common subexpression elimination: an expression worked out again later in the same act or
+scene, while none of the characters it reads have changed, is put in a local the first time
+and the local is used after that.
+
+A local is only set where its expression is always worked out: the expression of an
+assignment that isn't guarded by a question, or a question's comparison (the outermost one
+if there are several). Setting it anywhere else could divide by zero where the play wouldn't.
+Uses of it can be anywhere, guarded or not. The biggest repeated expression is the one put in
+a local, not the expressions inside it.
+"""
+
+from itertools import count
+
+from play import *
+
+
+CSE_WINDOW = 64 # the most statements after a local is set that it's used in, so big methods can still be split
+
+# statements which change the value of the character in them
+CHANGING_STMTS = (STMT_ASSIGN, STMT_POP, STMT_INPUT_NUMBER, STMT_INPUT_CHARACTER)
+
+
+class Candidate:
+    """An expression put in a local if it's used again: where it's first worked out and how often it's used."""
+
+    def __init__(self, expr, position):
+        self.expr = expr
+        self.position = position # the index of the statement it's worked out in
+        self.uses = 0
+        self.local = None
+
+
+def expression_nodes(expr):
+    """:returns: the number of nodes in the expression tree."""
+    return sum(1 for _ in subexpressions(expr))
+
+
+def number_nodes(expr, numbers):
+    """
+    Number the nodes of an expression so equal subexpressions get the same number, without
+    recursing or hashing whole subtrees: each node is numbered from its operands' numbers.
+    :param expr: The expression.
+    :param numbers: A dict of the numbers given so far, added to.
+    :returns: A dict mapping the id() of each operator node in expr to its number and the
+        frozenset of characters whose values it reads.
+    """
+
+    nodes = {}
+    stack = [(expr, False)]
+    while stack:
+        node, operands_done = stack.pop()
+        if node[0] == EXPR_CONSTANT or node[0] == EXPR_CHARACTER or id(node) in nodes:
+            continue
+        if not operands_done:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in node[1:])
+            continue
+
+        key = [node[0]]
+        characters = frozenset()
+        for operand in node[1:]:
+            if operand[0] == EXPR_CONSTANT or operand[0] == EXPR_CHARACTER:
+                key.append(numbers.setdefault(operand, len(numbers)))
+                if operand[0] == EXPR_CHARACTER:
+                    characters |= {operand[1]}
+            else:
+                number, operand_characters = nodes[id(operand)]
+                key.append(number)
+                characters |= operand_characters
+        nodes[id(node)] = numbers.setdefault(tuple(key), len(numbers)), characters
+    return nodes
+
+
+def find_candidates(statements):
+    """
+    Find the repeated expressions in the statements of a method.
+    :returns: A list for each statement of the Candidate that each of its expression nodes defines
+        or uses (or None if neither), in order, as visited by eliminate_in_method().
+    """
+
+    numbers = {} # see number_nodes()
+    available = {} # expression number -> Candidate
+    reading = {} # character -> numbers of expressions in available that read it
+    visits = []
+
+    for position, statement in enumerate(statements):
+        visits.append([])
+        for expr, always in statement_expressions(statement):
+            nodes = number_nodes(expr, numbers)
+            stack = [expr]
+            while stack:
+                node = stack.pop()
+                if node[0] == EXPR_CONSTANT or node[0] == EXPR_CHARACTER:
+                    continue
+
+                number, characters = nodes[id(node)]
+                candidate = available.get(number)
+                if candidate is not None and position - candidate.position <= CSE_WINDOW:
+                    candidate.uses += 1
+                    visits[-1].append(candidate)
+                    continue # so what's inside it is never used
+
+                if always and characters: # one with only constants is worked out by the compiler
+                    candidate = Candidate(node, position)
+                    available[number] = candidate
+                    for character in characters:
+                        reading.setdefault(character, []).append(number)
+                    visits[-1].append(candidate)
+                else:
+                    visits[-1].append(None)
+                stack.extend(reversed(node[1:]))
+
+        # forget the expressions which read a character this changes
+        inner, _ = unguarded(statement)
+        if inner[0] in CHANGING_STMTS:
+            for number in reading.pop(inner[1], ()):
+                available.pop(number, None)
+
+    return visits
+
+
+def eliminate_in_method(statements, local_names, stats=None):
+    """
+    Eliminate the common subexpressions in the statements of a method.
+    :param statements: The statements.
+    :param local_names: An iterator of names for new locals.
+    :param stats: An optional TranslationStats to count locals and eliminated expression nodes in.
+    :returns: The new list of statements.
+    """
+
+    visits = find_candidates(statements)
+    defined = set()
+    new_statements = []
+
+    def rewrite(expr, visited, prelude):
+        # built bottom up like play.rename_expression(), visiting the nodes in the same order as find_candidates()
+        done = []
+        stack = [(expr, None, False)]
+        while stack:
+            node, candidate, operands_done = stack.pop()
+            if node[0] == EXPR_CONSTANT or node[0] == EXPR_CHARACTER:
+                done.append(node)
+                continue
+
+            if not operands_done:
+                candidate = next(visited)
+                if candidate is not None and candidate.uses and candidate in defined:
+                    if stats is not None:
+                        stats.cse_eliminated_nodes += expression_nodes(node)
+                    done.append((EXPR_LOCAL, candidate.local))
+                else:
+                    stack.append((node, candidate, True))
+                    stack.extend((operand, None, False) for operand in reversed(node[1:]))
+                continue
+
+            count = len(node) - 1
+            new_expr = (node[0],) + tuple(done[-count:])
+            del done[-count:]
+            if candidate is None or not candidate.uses:
+                done.append(new_expr)
+                continue
+
+            # the first time it's worked out: its operands' locals are set first
+            candidate.local = next(local_names)
+            defined.add(candidate)
+            prelude.append((STMT_LOCAL, candidate.local, new_expr))
+            if stats is not None:
+                stats.cse_locals += 1
+            done.append((EXPR_LOCAL, candidate.local))
+        return done[0]
+
+    for statement, statement_visits in zip(statements, visits):
+        visited = iter(statement_visits)
+        prelude = []
+        exprs = [rewrite(expr, visited, prelude) for expr, _ in statement_expressions(statement)]
+        new_statements += prelude
+        new_statements.append(replace_expressions(statement, iter(exprs)))
+
+    return new_statements
+
+
+def eliminate_common_subexpressions(play, stats=None):
+    """
+    Eliminate the common subexpressions in each act and scene of a play.
+    :param play: The Play.
+    :param stats: An optional TranslationStats to count locals and eliminated expression nodes in.
+    :returns: A new Play, with locals named cse0, cse1, etc., all different.
+    """
+
+    local_names = ('cse%d' % i for i in count())
+    methods = [Method(method.name, eliminate_in_method(method.statements, local_names, stats))
+               for method in play.methods]
+    return Play(play.characters, methods, play.initial_values, play.initial_stacks)
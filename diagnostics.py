@@ -0,0 +1,77 @@
+"""
+Where in the SPL source the errors in a play are. Symbols don't keep track of where they came
+from, since that would slow down translating plays without errors; instead, when there are
+errors, the source is tokenized and symbolized again, once, noting where each token starts.
+"""
+
+import bisect
+import re
+
+from symbolizer import *
+
+
+def token_offsets(spl, tokens):
+    """:returns: the index in spl of each of the tokens tokenize() split it into."""
+
+    offsets = []
+    offset = 0
+    for token in tokens:
+        # only whitespace is skipped between tokens, and a token has none in it
+        offset = spl.find(token, offset)
+        offsets.append(offset)
+        offset += len(token)
+    return offsets
+
+
+class SourceMap:
+    """
+    Where the symbols of some SPL code came from, from tokenizing and symbolizing it once more: the
+    line and column of each symbol without the SYM_IGNOREs, and the words ignored around them. It's
+    made once for all of the errors in a play, for locate() and suggestions.suggest_words().
+    """
+
+    def __init__(self, spl, vocabulary, limits=None):
+        """
+        :param spl: The SPL code.
+        :param vocabulary: The Vocabulary it was symbolized with.
+        :param limits: Optional Limits whose deadline to check while symbolizing it.
+        """
+
+        tokens = tokenize(spl)
+        offsets = token_offsets(spl, tokens)
+        token_indices = []
+        symbols = symbolize(tokens, vocabulary=vocabulary, limits=limits, keep_ignored=True,
+                            token_indices=token_indices)
+
+        line_starts = [0] + [match.end() for match in re.finditer('\n', spl)]
+        self.positions = [] # the (line, column) of each symbol, both counting from 1
+        self.ignored = [[]] # the words ignored before the first symbol, after it, after the second, etc.
+        for symbol, token_index in zip(symbols, token_indices):
+            if symbol[0] != SYM_IGNORE:
+                offset = offsets[token_index]
+                line = bisect.bisect_right(line_starts, offset)
+                self.positions.append((line, offset - line_starts[line - 1] + 1))
+                self.ignored.append([])
+            elif symbol[1].isalpha():
+                self.ignored[-1].append(symbol[1])
+
+    def ignored_words(self, start, end):
+        """
+        :param start: The index of a symbol in the symbols without any SYM_IGNOREs.
+        :param end: The index of a later symbol.
+        :returns: The words between the symbols before start and after end which were ignored, in order.
+        """
+        return [word for words in self.ignored[start:end+1] for word in words]
+
+
+def locate(errors, source):
+    """
+    Set the line and column of each SplError in errors which has the symidx of the statement it's
+    in (see translator.parse_section()) to where that statement starts.
+    :param errors: The SplErrors.
+    :param source: The SourceMap of the SPL code.
+    """
+
+    for error in errors:
+        if getattr(error, 'symidx', None) is not None and error.symidx < len(source.positions):
+            error.line, error.column = source.positions[error.symidx]
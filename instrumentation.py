@@ -0,0 +1,166 @@
+"""
+Optional instrumentation for the SPL -> Java translator: per-stage timings and
+allocations, translation counters, and cProfile output as collapsed stacks.
+Nothing in here runs unless a TranslationStats object is passed in.
+"""
+
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+STAGES = ('tokenize', 'symbolize', 'parse', 'optimize', 'emit')
+
+
+class TranslationStats:
+    """
+    Collects statistics about a single translation. Pass one to translate() and
+    read it afterwards.
+    """
+
+    def __init__(self, track_allocations=False):
+        """
+        :param track_allocations: if True, also record the peak memory allocated during
+            each stage using tracemalloc. This slows translation down noticeably.
+        """
+
+        self.track_allocations = track_allocations
+        self.stage_times = {} # stage name -> wall time in seconds
+        self.stage_allocations = {} # stage name -> peak bytes allocated during the stage
+
+        self.tokens = 0
+        self.ignored_tokens = 0
+        self.multi_token_matches = 0
+        self.expressions = 0
+        self.output_bytes = 0
+        self.cse_locals = 0
+        self.cse_eliminated_nodes = 0
+        self.promoted_stacks = [] # characters whose stacks were replaced by fields (see stackslots.py)
+        self.method_sizes = {} # generated Java method name -> estimated bytes of bytecode
+
+    @contextmanager
+    def stage(self, name):
+        """Time the code in the with-block as the stage called name."""
+
+        started_tracing = False
+        if self.track_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_times[name] = self.stage_times.get(name, 0) + time.perf_counter() - start
+
+            if self.track_allocations:
+                _, peak = tracemalloc.get_traced_memory()
+                self.stage_allocations[name] = max(self.stage_allocations.get(name, 0), peak - before)
+                if started_tracing:
+                    tracemalloc.stop()
+
+    def counters(self):
+        """:returns: a dict of the translation counters."""
+        return {
+            'tokens': self.tokens,
+            'ignored_tokens': self.ignored_tokens,
+            'multi_token_matches': self.multi_token_matches,
+            'expressions': self.expressions,
+            'output_bytes': self.output_bytes,
+            'cse_locals': self.cse_locals,
+            'cse_eliminated_nodes': self.cse_eliminated_nodes,
+            'promoted_stacks': len(self.promoted_stacks),
+        }
+
+    def report(self):
+        """:returns: a human-readable, multi-line report of the statistics."""
+
+        lines = ['Stage          Time (ms)' + ('   Peak alloc (KiB)' if self.track_allocations else '')]
+        for name in STAGES:
+            if name not in self.stage_times:
+                continue
+            line = '{:<12} {:>11.3f}'.format(name, self.stage_times[name] * 1000)
+            if self.track_allocations:
+                line += ' {:>18.1f}'.format(self.stage_allocations.get(name, 0) / 1024)
+            lines.append(line)
+        lines.append('{:<12} {:>11.3f}'.format('total', sum(self.stage_times.values()) * 1000))
+
+        lines.append('')
+        for name, value in self.counters().items():
+            lines.append('{:<20} {:>10}'.format(name.replace('_', ' '), value))
+        if self.promoted_stacks:
+            lines.append('Stacks replaced by fields: ' + ', '.join(self.promoted_stacks))
+
+        if self.method_sizes:
+            lines.append('')
+            lines.append('Largest methods (estimated bytecode bytes, of {}):'.format(len(self.method_sizes)))
+            for name, size in sorted(self.method_sizes.items(), key=lambda item: -item[1])[:10]:
+                lines.append('{:<30} {:>10}'.format(name, size))
+        return '\n'.join(lines)
+
+
+def timed(stats, name):
+    """
+    :returns: a context manager timing the stage called name if stats is a
+        TranslationStats, or one that does nothing if stats is None.
+    """
+    return stats.stage(name) if stats is not None else nullcontext()
+
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == '~':
+        return name # a builtin, e.g. "<built-in method builtins.len>"
+    return '{}:{}:{}'.format(filename.replace('\\', '/').rsplit('/', 1)[-1], line, name)
+
+
+def collapsed_stacks(profile, max_depth=64):
+    """
+    Turn a cProfile.Profile into collapsed stacks ("a;b;c 123" lines, in
+    microseconds of self time) suitable for flamegraph.pl and friends.
+    cProfile only records caller/callee pairs, so time is split between deeper
+    stacks in proportion to how much of each function's time came from each caller.
+    :param profile: the (disabled) cProfile.Profile.
+    :param max_depth: the maximum stack depth to follow.
+    :returns: a list of collapsed stack lines.
+    """
+
+    profile_stats = pstats.Stats(profile).stats
+    callees = {}
+    for func, (_, _, _, _, callers) in profile_stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3])) # edge[3] is the cumulative time
+
+    lines = []
+
+    def walk(func, path, amount):
+        _, _, self_time, cumulative, _ = profile_stats[func]
+        if cumulative <= 0:
+            return
+        path = path + [_frame_name(func)]
+        self_us = round(amount * self_time / cumulative * 1e6)
+        if self_us > 0:
+            lines.append('{} {}'.format(';'.join(path), self_us))
+        if len(path) >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, ()):
+            if _frame_name(callee) in path or callee not in profile_stats:
+                continue # recursion: don't follow it around again
+            walk(callee, path, amount * edge_time / cumulative)
+
+    for func, (_, _, _, cumulative, callers) in profile_stats.items():
+        if not callers:
+            walk(func, [], cumulative)
+
+    return lines
+
+
+def write_collapsed_stacks(profile, filename):
+    """Write collapsed_stacks(profile) to the file with name filename."""
+    with open(filename, 'w') as stacks_file:
+        for line in collapsed_stacks(profile):
+            stacks_file.write(line + '\n')
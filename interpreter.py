@@ -0,0 +1,368 @@
+"""
+Runs a parsed play at translation time, with the same int arithmetic as the generated Java,
+and uses that to precompute the part of a play which doesn't depend on its input.
+"""
+
+import re
+
+from play import *
+
+
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+# default limits for precompute()
+PRECOMPUTE_MAX_STEPS = 100000 # statements run
+PRECOMPUTE_MAX_OUTPUT = 1 << 20 # chars output
+PRECOMPUTE_MAX_STACK = 1024 # values on all of the stacks together
+PRECOMPUTE_DEADLINE_STEPS = 100 # statements run by precompute() between checks of the deadline, which can each be slow
+
+# why Interpreter.run() stopped
+STOP_END = 'end' # the play ended
+STOP_INPUT = 'input' # the next statement reads input
+STOP_ERROR = 'error' # the next statement throws an exception
+STOP_LIMIT = 'limit' # the next statement would go over a limit
+
+# what the generated Java's Scanner counts as whitespace between numbers and as the end of a line
+WHITESPACE = re.compile(r'\s*')
+TOKEN = re.compile(r'\S+')
+INTEGER = re.compile(r'[+-]?[0-9]+\Z')
+LINE_SEPARATORS = '\n\r\x85\u2028\u2029'
+
+
+class ProgramError(Exception):
+    """An exception the generated program would throw, e.g. when dividing by zero."""
+
+
+def java_int(x):
+    """:returns: x wrapped around to a 32-bit signed int."""
+    return (x - INT_MIN) % 2 ** 32 + INT_MIN
+
+
+def saturate(x):
+    """:returns: the int x clamped to the range of an int, like Java's (int) cast of a double."""
+    return max(INT_MIN, min(INT_MAX, x))
+
+
+def integer_root(x, n):
+    """:returns: the nth root of the non-negative int x, rounded down."""
+    root = int(round(x ** (1 / n)))
+    while root ** n > x:
+        root -= 1
+    while (root + 1) ** n <= x:
+        root += 1
+    return root
+
+
+def java_divide(x, y):
+    """:returns: x / y in Java, rounded towards zero. :raises ProgramError: if y is 0."""
+    if y == 0:
+        raise ProgramError('java.lang.ArithmeticException: / by zero')
+    quotient = abs(x) // abs(y)
+    return java_int(quotient if (x < 0) == (y < 0) else -quotient)
+
+
+def java_remainder(x, y):
+    """:returns: x % y in Java, with the sign of x. :raises ProgramError: if y is 0."""
+    if y == 0:
+        raise ProgramError('java.lang.ArithmeticException: / by zero')
+    remainder = abs(x) % abs(y)
+    return remainder if x >= 0 else -remainder
+
+
+# how the generated Java works out each type of expression from the values of its operands
+UNARY_OPERATIONS = {
+    EXPR_TWICE: lambda x: java_int(2 * x),
+    EXPR_THRICE: lambda x: java_int(3 * x),
+    EXPR_SQUARE: lambda x: saturate(x ** 2), # (int) Math.pow(x, 2) is exact until it saturates
+    EXPR_CUBE: lambda x: saturate(x ** 3),
+    EXPR_SQUARE_ROOT: lambda x: integer_root(x, 2) if x >= 0 else 0, # the square root of a negative number is NaN
+    EXPR_CUBE_ROOT: lambda x: integer_root(x, 3) if x >= 0 else -integer_root(-x, 3),
+    EXPR_HALF: lambda x: java_divide(x, 2),
+}
+BINARY_OPERATIONS = {
+    EXPR_SUM: lambda x, y: java_int(x + y),
+    EXPR_DIFFERENCE: lambda x, y: java_int(x - y),
+    EXPR_PRODUCT: lambda x, y: java_int(x * y),
+    EXPR_QUOTIENT: java_divide,
+    EXPR_REMAINDER: java_remainder,
+}
+
+
+NESTED_EVALUATE_DEPTH = 50 # how deep evaluate() recurses before carrying on with a stack of its own
+
+
+def evaluate(expr, values, depth=NESTED_EVALUATE_DEPTH):
+    """
+    :param expr: The expression.
+    :param values: A dict mapping characters to their values.
+    :param depth: How much deeper to recurse into the expression: beyond that, it's worked out by
+        evaluate_deep(), so there's no limit on how deeply it's nested.
+    :returns: the value of the expression, as the generated Java would compute it.
+    :raises ProgramError: if the expression divides by zero.
+    """
+
+    expr_type = expr[0]
+    if expr_type == EXPR_CONSTANT:
+        return expr[1]
+    elif expr_type == EXPR_CHARACTER:
+        return values[expr[1]]
+    elif depth == 0:
+        return evaluate_deep(expr, values)
+
+    # recursing is quicker than evaluate_deep() for the usual shallow expressions
+    if expr_type in UNARY_OPERATIONS:
+        return UNARY_OPERATIONS[expr_type](evaluate(expr[1], values, depth - 1))
+    elif expr_type in BINARY_OPERATIONS:
+        x = evaluate(expr[1], values, depth - 1)
+        return BINARY_OPERATIONS[expr_type](x, evaluate(expr[2], values, depth - 1))
+    else:
+        raise ValueError('Unknown expression type: ' + str(expr_type))
+
+
+def evaluate_deep(expr, values):
+    """Work out an expression like evaluate(), with a stack of operands instead of recursing."""
+
+    # an expression type on the stack means its operands' values are on top of operands
+    operands = []
+    stack = [expr]
+    while stack:
+        item = stack.pop()
+        if item.__class__ is int:
+            if item in UNARY_OPERATIONS:
+                operands.append(UNARY_OPERATIONS[item](operands.pop()))
+            else:
+                y = operands.pop()
+                operands.append(BINARY_OPERATIONS[item](operands.pop(), y))
+            continue
+
+        expr_type = item[0]
+        if expr_type == EXPR_CONSTANT:
+            operands.append(item[1])
+        elif expr_type == EXPR_CHARACTER:
+            operands.append(values[item[1]])
+        elif expr_type in UNARY_OPERATIONS:
+            stack.append(expr_type)
+            stack.append(item[1])
+        elif expr_type in BINARY_OPERATIONS:
+            stack.append(expr_type)
+            stack.append(item[2])
+            stack.append(item[1])
+        else:
+            raise ValueError('Unknown expression type: ' + str(expr_type))
+    return operands[0]
+
+
+def check(condition, values):
+    """:returns: True if the condition of a question holds. :raises ProgramError: as in evaluate()."""
+
+    op, expr1, expr2, negated = condition
+    value1 = evaluate(expr1, values)
+    value2 = evaluate(expr2, values)
+    if op == COMPARE_EQUAL:
+        result = value1 == value2
+    elif op == COMPARE_GREATER:
+        result = value1 > value2
+    else:
+        result = value1 < value2
+    return result != negated
+
+
+class Interpreter:
+    """
+    Runs a play one statement at a time, without reading any input unless it's given some.
+    Output is collected as a list of strings of UTF-16 code units, like the chars Java prints.
+    """
+
+    def __init__(self, play, stdin=None, record=False):
+        """
+        :param play: The parsed Play.
+        :param stdin: The text the play reads as its input, or None to stop before reading any.
+        :param record: If True, count how many times each method is entered in self.entries, and
+            how many times the jumps guarded by questions from each method to each other one are
+            taken and not taken in self.jumps (source -> target -> [taken, not taken]).
+        """
+        self.methods = play.method_dict()
+        self.values = {character: play.initial_values.get(character, 0) for character in play.characters}
+        self.stacks = {character: list(play.initial_stacks.get(character, ())) for character in play.characters}
+        self.stack_size = sum(len(stack) for stack in self.stacks.values())
+        self.output = []
+        self.output_length = 0
+
+        # the next statement to run
+        self.method = play.entry
+        self.index = 0
+        self.steps = 0
+
+        self.stdin = stdin
+        self.stdin_position = 0
+
+        self.entries = {play.entry: 1} if record else None
+        self.jumps = {} if record else None
+
+    def read_number(self):
+        """:returns: the next int in the input, like Scanner.nextInt(). :raises ProgramError: if there isn't one."""
+
+        start = WHITESPACE.match(self.stdin, self.stdin_position).end()
+        token = TOKEN.match(self.stdin, start)
+        if token is None:
+            raise ProgramError('java.util.NoSuchElementException')
+        if not INTEGER.match(token.group()) or not INT_MIN <= int(token.group()) <= INT_MAX:
+            raise ProgramError('java.util.InputMismatchException')
+        self.stdin_position = token.end()
+        return int(token.group())
+
+    def read_character(self):
+        """:returns: the next char in the input on this line, like Scanner.findInLine("."), or -1 if there isn't one."""
+
+        if self.stdin_position == len(self.stdin) or self.stdin[self.stdin_position] in LINE_SEPARATORS:
+            return -1
+        char = ord(self.stdin[self.stdin_position])
+        self.stdin_position += 1
+        if char > 0xFFFF:
+            return 0xD800 + ((char - 0x10000) >> 10) # the first of its two UTF-16 code units
+        return char
+
+    def record_jump(self, statement, taken):
+        """Count a jump guarded by a question from the current method as taken or not."""
+        target = unguarded(statement)[0][1]
+        counts = self.jumps.setdefault(self.method, {}).setdefault(target, [0, 0])
+        counts[0 if taken else 1] += 1
+
+    def run(self, max_steps, max_output, max_stack):
+        """
+        Run the play until it ends, is about to read input (if it wasn't given any) or throw an
+        exception, or is about to go over one of the limits. The statement it stopped at is self.index in self.method.
+        :param max_steps: The maximum number of statements to run in total.
+        :param max_output: The maximum number of chars to output in total.
+        :param max_stack: The maximum number of values on all of the stacks together.
+        :returns: STOP_END, STOP_INPUT, STOP_ERROR or STOP_LIMIT.
+        """
+
+        values = self.values
+        while True:
+            statements = self.methods[self.method].statements
+            if self.index == len(statements):
+                return STOP_END
+            if self.steps >= max_steps:
+                return STOP_LIMIT
+
+            try:
+                original = statement = statements[self.index]
+                while statement[0] == STMT_IF and check(statement[1], values):
+                    statement = statement[2]
+                stmt_type = statement[0]
+
+                if stmt_type == STMT_IF:
+                    # a question said no
+                    if self.jumps is not None and unguarded(original)[0][0] in GOTO_STMTS:
+                        self.record_jump(original, False)
+
+                elif stmt_type == STMT_ASSIGN:
+                    values[statement[1]] = evaluate(statement[2], values)
+
+                elif stmt_type in GOTO_STMTS:
+                    if self.entries is not None:
+                        if original is not statement:
+                            self.record_jump(original, True)
+                        self.entries[statement[1]] = self.entries.get(statement[1], 0) + 1
+                    self.method = statement[1]
+                    self.index = 0
+                    self.steps += 1
+                    continue
+
+                elif stmt_type == STMT_PUSH:
+                    if self.stack_size >= max_stack:
+                        return STOP_LIMIT
+                    self.stacks[statement[1]].append(values[statement[1]])
+                    self.stack_size += 1
+
+                elif stmt_type == STMT_POP:
+                    stack = self.stacks[statement[1]]
+                    if not stack:
+                        raise ProgramError('java.util.NoSuchElementException')
+                    values[statement[1]] = stack.pop()
+                    self.stack_size -= 1
+
+                elif stmt_type in (STMT_INPUT_NUMBER, STMT_INPUT_CHARACTER):
+                    if self.stdin is None:
+                        return STOP_INPUT
+                    if stmt_type == STMT_INPUT_NUMBER:
+                        values[statement[1]] = self.read_number()
+                    else:
+                        values[statement[1]] = self.read_character()
+
+                else:
+                    if stmt_type == STMT_OUTPUT_NUMBER:
+                        text = str(values[statement[1]])
+                    elif stmt_type == STMT_OUTPUT_CHARACTER:
+                        text = chr(values[statement[1]] & 0xFFFF)
+                    elif stmt_type == STMT_OUTPUT_STRING:
+                        text = statement[1]
+                    else:
+                        raise ValueError('Unknown statement type: ' + str(stmt_type))
+                    if self.output_length + len(text) > max_output:
+                        return STOP_LIMIT
+                    self.output.append(text)
+                    self.output_length += len(text)
+
+            except ProgramError:
+                return STOP_ERROR
+
+            self.index += 1
+            self.steps += 1
+
+
+def precompute(play, max_steps=PRECOMPUTE_MAX_STEPS, max_output=PRECOMPUTE_MAX_OUTPUT,
+               max_stack=PRECOMPUTE_MAX_STACK, limits=None):
+    """
+    Partially evaluate a play: run it at translation time until it needs input (or would throw
+    an exception or go over a limit), and replace everything it did up to there with one output
+    of everything it printed, and the values and stacks of the characters at that point.
+    A play that reads no input becomes a single output.
+    :param play: The parsed Play.
+    :param max_steps: The maximum number of statements to run.
+    :param max_output: The maximum number of chars of output to precompute.
+    :param max_stack: The maximum number of values to leave on the stacks.
+    :param limits: Optional Limits whose deadline it has to finish by (see limits.py).
+    :returns: A new Play which does the same thing.
+    :raises DeadlineExceededError: if the deadline is up before it's done.
+    """
+
+    interpreter = Interpreter(play)
+    if limits is None:
+        stop = interpreter.run(max_steps, max_output, max_stack)
+    else:
+        limits = limits.start()
+        while True:
+            # check the deadline between runs of a few statements
+            steps = min(interpreter.steps + PRECOMPUTE_DEADLINE_STEPS, max_steps)
+            stop = interpreter.run(steps, max_output, max_stack)
+            if stop != STOP_LIMIT or interpreter.steps < steps or steps == max_steps:
+                break
+            limits.check_deadline()
+    if interpreter.steps == 0:
+        return play
+
+    # the entry method outputs everything, then carries on from where the interpreter stopped
+    statements = []
+    output = ''.join(interpreter.output)
+    if output:
+        statements.append((STMT_OUTPUT_STRING, output))
+    if stop != STOP_END:
+        if interpreter.index == 0:
+            statements.append((STMT_NEXT, interpreter.method))
+        else:
+            statements += interpreter.methods[interpreter.method].statements[interpreter.index:]
+
+    methods = [Method(play.entry, statements)] + [method for method in play.methods if method.name != play.entry]
+    methods = reachable_methods(Play(play.characters, methods))
+
+    # characters nothing uses any more can go
+    characters = used_characters(Play(play.characters, methods))
+
+    initial_values = {character: interpreter.values[character] for character in characters
+                      if interpreter.values[character] != 0}
+    initial_stacks = {character: interpreter.stacks[character] for character in characters
+                      if interpreter.stacks[character]}
+    return Play(characters, methods, initial_values, initial_stacks)
@@ -0,0 +1,667 @@
+"""
+Generates the Java code for a parsed play.
+"""
+
+from codesize import *
+from play import *
+from sceneprofile import hot_methods
+from structurer import BLOCK, DISPATCH, structure_play
+
+
+# how each kind of expression is written in Java
+EXPR_FORMATS = {
+    EXPR_TWICE: '(2*{})',
+    EXPR_THRICE: '(3*{})',
+    EXPR_SQUARE: '((int) Math.pow({}, 2))',
+    EXPR_CUBE: '((int) Math.pow({}, 3))',
+    EXPR_SQUARE_ROOT: '((int) Math.sqrt({}))',
+    EXPR_CUBE_ROOT: '((int) Math.cbrt({}))',
+    EXPR_HALF: '({}/2)',
+    EXPR_SUM: '({} + {})',
+    EXPR_DIFFERENCE: '({} - {})',
+    EXPR_PRODUCT: '({} * {})',
+    EXPR_QUOTIENT: '({} / {})',
+    EXPR_REMAINDER: '({} % {})',
+}
+
+EXPR_PIECES = split_formats(EXPR_FORMATS)
+
+COMPARE_OPERATORS = {COMPARE_EQUAL: '==', COMPARE_GREATER: '>', COMPARE_LESS: '<'}
+
+# the most chars put in one string literal: a constant can be at most 65535 bytes of modified UTF-8
+STRING_CHUNK_LENGTH = 16384
+
+STRING_ESCAPES = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+# main() of a --bench class: runs the play over and over on the bytes of a file, throwing away what
+# it prints, and prints the latency percentiles and throughput
+BENCH_MAIN = '''\
+\t// usage: java {0} [INPUT_FILE [ITERATIONS [WARMUP_ITERATIONS]]]
+\tpublic static void main(String[] args) throws java.io.IOException {{
+\t\tbyte[] input = args.length > 0 ? java.nio.file.Files.readAllBytes(java.nio.file.Paths.get(args[0])) : new byte[0];
+\t\tint iterations = args.length > 1 ? Integer.parseInt(args[1]) : {1};
+\t\tint warmup = args.length > 2 ? Integer.parseInt(args[2]) : {2};
+\t\tCountingSink sink = new CountingSink();
+\t\tPrintStream out = new PrintStream(sink);
+\t\tfor (int i = 0; i < warmup; i++) {{
+\t\t\tnew {0}(new java.io.ByteArrayInputStream(input), out).run();
+\t\t}}
+\t\tout.flush();
+\t\tlong warmupBytes = sink.count;
+\t\tlong[] times = new long[iterations];
+\t\tlong start = System.nanoTime();
+\t\tfor (int i = 0; i < iterations; i++) {{
+\t\t\tlong runStart = System.nanoTime();
+\t\t\tnew {0}(new java.io.ByteArrayInputStream(input), out).run();
+\t\t\tout.flush();
+\t\t\ttimes[i] = System.nanoTime() - runStart;
+\t\t}}
+\t\tlong total = System.nanoTime() - start;
+\t\tjava.util.Arrays.sort(times);
+\t\tSystem.out.printf("iterations: %d (after %d to warm up)%n", iterations, warmup);
+\t\tSystem.out.printf("output: %d bytes per run%n", iterations > 0 ? (sink.count - warmupBytes) / iterations : 0);
+\t\tSystem.out.printf("throughput: %.1f runs/s%n", iterations / (total / 1e9));
+\t\tfor (double p : new double[] {{50, 90, 99, 99.9, 100}}) {{
+\t\t\tSystem.out.printf("p%s: %.3f us%n", p == (int) p ? String.valueOf((int) p) : String.valueOf(p),
+\t\t\t\t\tpercentile(times, p) / 1e3);
+\t\t}}
+\t}}
+\t// the nearest-rank percentile of sorted times
+\tstatic long percentile(long[] times, double p) {{
+\t\treturn times.length == 0 ? 0 : times[Math.max(0, (int) Math.ceil(p / 100 * times.length) - 1)];
+\t}}
+\t// an OutputStream which only counts the bytes written to it
+\tstatic final class CountingSink extends java.io.OutputStream {{
+\t\tlong count;
+\t\tpublic void write(int b) {{
+\t\t\tcount++;
+\t\t}}
+\t\tpublic void write(byte[] b, int off, int len) {{
+\t\t\tcount += len;
+\t\t}}
+\t}}
+'''
+
+BENCH_ITERATIONS = 1000 # the default number of timed runs of a --bench class
+BENCH_WARMUP_ITERATIONS = 1000 # and of runs before them, for the JIT to compile the play
+
+
+# the names of the arrays of the characters' values and stacks, with character_arrays
+CAST_ARRAY = 'cast'
+CAST_STACK_ARRAY = 'cast_stk'
+
+
+def stack_name(character):
+    """:returns: the Java code for a character's stack: Romeo_stk for Romeo, or cast_stk[3] for cast[3]."""
+    name, bracket, index = character.partition('[')
+    return name + '_stk' + bracket + index
+
+
+def output_stream(reentrant):
+    """:returns: the PrintStream the generated code prints to: its own for a reentrant class, or System.out."""
+    return 'out' if reentrant else 'System.out'
+
+
+def entry_header(reentrant):
+    """:returns: the header of the method the play starts in: run() for a reentrant class, or main()."""
+    return 'public void run() {' if reentrant else 'public static void main(String[] args) {'
+
+
+def java_string(text):
+    """:returns: a Java string literal for text, a string of UTF-16 code units."""
+
+    chars = []
+    for char in text:
+        if char in STRING_ESCAPES:
+            # these can't be \u escapes, which javac replaces before reading string literals
+            chars.append(STRING_ESCAPES[char])
+        elif ' ' <= char <= '~':
+            chars.append(char)
+        else:
+            chars.append('\\u%04x' % ord(char))
+    return '"' + ''.join(chars) + '"'
+
+
+def java_leaf(expr):
+    """:returns: the Java code for a constant, character or local."""
+    return str(expr[1]) if expr[0] == EXPR_CONSTANT else expr[1]
+
+
+def java_expression(expr):
+    """:returns: the Java code for an expression."""
+    return ''.join(expression_fragments(expr, EXPR_PIECES, java_leaf))
+
+
+def java_condition(condition):
+    """:returns: the Java code for the condition of a question, including the "if"."""
+
+    op, expr1, expr2, negated = condition
+    fmt_str = 'if (!({} {} {}))' if negated else 'if ({} {} {})'
+    return fmt_str.format(java_expression(expr1), COMPARE_OPERATORS[op], java_expression(expr2))
+
+
+def java_statement(statement, out='System.out'):
+    """
+    :param statement: The statement.
+    :param out: The PrintStream to print to.
+    :returns: the Java code for a statement, with no trailing newline.
+    """
+
+    stmt_type = statement[0]
+
+    if stmt_type == STMT_ASSIGN:
+        return statement[1] + ' = ' + java_expression(statement[2]) + ';'
+
+    elif stmt_type == STMT_LOCAL:
+        return 'int ' + statement[1] + ' = ' + java_expression(statement[2]) + ';'
+
+    elif stmt_type == STMT_IF:
+        return java_condition(statement[1]) + ' ' + java_statement(statement[2], out)
+
+    elif stmt_type == STMT_JUMP:
+        # in a block so that it can be used with if statements/questions
+        return '{ %s(); return; }' % statement[1]
+
+    elif stmt_type == STMT_NEXT:
+        return statement[1] + '();'
+
+    elif stmt_type == STMT_PUSH:
+        return '{}.push({});'.format(stack_name(statement[1]), statement[1])
+
+    elif stmt_type == STMT_POP:
+        return '{} = {}.pop();'.format(statement[1], stack_name(statement[1]))
+
+    elif stmt_type == STMT_INPUT_NUMBER:
+        return '{} = scanner.nextInt();'.format(statement[1])
+
+    elif stmt_type == STMT_INPUT_CHARACTER:
+        return '''try {{
+\t\t\t{0} = scanner.findInLine(".").charAt(0);
+\t\t}} catch (NullPointerException e) {{
+\t\t\t{0} = -1;
+\t\t}}'''.format(statement[1])
+
+    elif stmt_type == STMT_OUTPUT_NUMBER:
+        return '{}.print({});'.format(out, statement[1])
+
+    elif stmt_type == STMT_OUTPUT_CHARACTER:
+        return '{}.print((char) {});'.format(out, statement[1])
+
+    elif stmt_type == STMT_OUTPUT_STRING:
+        text = statement[1]
+        return '\n\t\t'.join('%s.print(%s);' % (out, java_string(text[i:i + STRING_CHUNK_LENGTH]))
+                             for i in range(0, len(text), STRING_CHUNK_LENGTH))
+
+    else:
+        raise ValueError('Unknown statement type: ' + str(stmt_type))
+
+
+def indented(code, indent):
+    """:returns: the code of a statement, re-indented from two tabs deep to indent."""
+    return code.replace('\n\t\t', '\n' + indent)
+
+
+def emit_structured_method(method, structure, enclosing, indent, java, reentrant=False):
+    """
+    Add the statements of a method to the Java code, with jumps as breaks and continues.
+    :param method: The Method.
+    :param structure: The Structure of the play.
+    :param enclosing: The Constructs around the method, outermost first.
+    :param indent: The indentation of the statements.
+    :param java: The list of fragments of Java code to add to.
+    :param reentrant: If True, the code is in an instance method of a reentrant class (see emit_java()).
+    """
+
+    java.append('%s// %s\n' % (indent, method.name))
+    position = structure.positions[method.name]
+
+    for k, statement in enumerate(method.statements):
+        inner, conditions = unguarded(statement)
+        if inner[0] not in GOTO_STMTS:
+            java.append(indent + indented(java_statement(statement, output_stream(reentrant)), indent) + '\n')
+            continue
+
+        final = k == len(method.statements) - 1 and not conditions
+        transfer = structure.transfer(position, inner[1], enclosing, final)
+        if transfer is None:
+            continue # falls through to the next method
+        kind, label, settings = transfer
+        code = ''.join('%s = %d; ' % (dispatch.variable, case) for dispatch, case in settings) + '%s %s;' % (kind, label)
+        if conditions:
+            code = ''.join(java_condition(condition) + ' ' for condition in conditions) + '{ ' + code + ' }'
+        java.append(indent + code + '\n')
+
+    if falls_off_end(method):
+        java.append(indent + 'return;\n')
+
+
+def emit_structured_items(items, structure, enclosing, indent, java, reentrant=False):
+    """Add a sequence of Methods and Constructs to the Java code."""
+
+    for item in items:
+        if isinstance(item, Method):
+            emit_structured_method(item, structure, enclosing, indent, java, reentrant)
+        elif item.kind == DISPATCH:
+            # the methods whose jumps can't be nested, as the cases of a switch
+            java.append('%s%s: while (true) {\n%s\tswitch (%s) {\n' % (indent, item.label, indent, item.variable))
+            for case, method in enumerate(item.children):
+                java.append('%s\tcase %d:\n' % (indent, case))
+                emit_structured_method(method, structure, enclosing + [item], indent + '\t\t', java, reentrant)
+            java.append('%s\t}\n%s}\n' % (indent, indent))
+        else:
+            java.append('%s%s: %s{\n' % (indent, item.label, '' if item.kind == BLOCK else 'while (true) '))
+            emit_structured_items(item.children, structure, enclosing + [item], indent + '\t', java, reentrant)
+            java.append(indent + '}\n')
+
+
+def dispatch_goto(statement, numbers, fall_through):
+    """
+    :returns: the Java code in a dispatch loop for a statement going to another method: setting
+        scene to its case and going round again, or calling it if it isn't in the loop and going
+        round again to the case it returns. None if it just falls through to the next case.
+    """
+
+    inner, conditions = unguarded(statement)
+    if inner[1] not in numbers:
+        code = 'scene = %s(); continue dispatch;' % inner[1]
+    elif fall_through and not conditions and numbers[inner[1]] == fall_through:
+        return None
+    else:
+        code = 'scene = %d; continue dispatch;' % numbers[inner[1]]
+    if conditions:
+        code = ''.join(java_condition(condition) + ' ' for condition in conditions) + '{ ' + code + ' }'
+    return code
+
+
+def emit_dispatch_loop(methods, java, reentrant=False):
+    """
+    Add methods to the Java code as a loop around a switch with a case for each, for when the
+    play's control flow can't be structured. Jumps to methods that aren't in the loop call them,
+    then carry on with the case whose number they return, or return if it's -1.
+    """
+
+    numbers = {method.name: i for i, method in enumerate(methods)}
+
+    java.append('\t\tint scene = 0;\n\t\tdispatch: while (true) {\n\t\t\tswitch (scene) {\n')
+    for i, method in enumerate(methods):
+        java.append('\t\t\tcase %d: // %s\n' % (i, method.name))
+        for k, statement in enumerate(method.statements):
+            if unguarded(statement)[0][0] not in GOTO_STMTS:
+                java.append('\t\t\t\t' + indented(java_statement(statement, output_stream(reentrant)), '\t\t\t\t') + '\n')
+                continue
+            code = dispatch_goto(statement, numbers, i + 1 if k == len(method.statements) - 1 else None)
+            if code is not None:
+                java.append('\t\t\t\t' + code + '\n')
+        if falls_off_end(method):
+            java.append('\t\t\t\treturn;\n')
+    if any(target not in numbers for method in methods for target in method_targets(method)):
+        java.append('\t\t\tdefault:\n\t\t\t\treturn;\n')
+    java.append('\t\t\t}\n\t\t}\n')
+
+
+def emit_cold_method(name, statements, numbers, java, reentrant=False):
+    """
+    Add a method that isn't in the dispatch loop to the Java code. It returns the number of the
+    case in the loop to carry on with, or -1 if the play ends, and calls methods outside the loop
+    it goes to, returning what they return.
+    """
+
+    java.append('\tprivate %sint %s() {\n' % ('' if reentrant else 'static ', name))
+    for statement in statements:
+        inner, conditions = unguarded(statement)
+        if inner[0] not in GOTO_STMTS:
+            java.append('\t\t' + java_statement(statement, output_stream(reentrant)) + '\n')
+            continue
+        code = 'return %d;' % numbers[inner[1]] if inner[1] in numbers else 'return %s();' % inner[1]
+        java.append('\t\t' + ''.join(java_condition(condition) + ' ' for condition in conditions) + code + '\n')
+    if not statements or statements[-1][0] not in GOTO_STMTS:
+        java.append('\t\treturn -1;\n')
+    java.append('\t}\n')
+
+
+def split_method(method, max_size):
+    """
+    Split a method whose code would be bigger than max_size into parts at statement boundaries.
+    Each part but the last ends by calling the next one, so a jump (which returns) in any part
+    returns all the way out of the method. A method isn't split between a local and its uses.
+    :param method: The Method.
+    :param max_size: The most bytes of bytecode in a part, or None to never split.
+    :returns: A list of (name, statements, estimated size) for each part, starting with the method's.
+    """
+
+    last_uses = {} # local -> index of the last statement using it
+    for i, statement in enumerate(method.statements):
+        for expr, _ in statement_expressions(statement):
+            locals_ = set()
+            expression_locals(expr, locals_)
+            last_uses.update(dict.fromkeys(locals_, i))
+
+    parts = [[]]
+    sizes = [METHOD_OVERHEAD]
+    live_until = -1 # the index of the last statement using a local set so far
+    for i, statement in enumerate(method.statements):
+        size = statement_size(statement, STRING_CHUNK_LENGTH)
+        if max_size is not None and parts[-1] and i > live_until and sizes[-1] + size + CALL_SIZE > max_size:
+            parts.append([])
+            sizes.append(METHOD_OVERHEAD)
+        parts[-1].append(statement)
+        sizes[-1] += size
+        if statement[0] == STMT_LOCAL:
+            live_until = max(live_until, last_uses.get(statement[1], i))
+
+    names = [method.name] + ['%s_%d' % (method.name, k) for k in range(2, len(parts) + 1)]
+    for k in range(len(parts) - 1):
+        parts[k].append((STMT_NEXT, names[k + 1]))
+        sizes[k] += CALL_SIZE
+    return list(zip(names, parts, sizes))
+
+
+def assign_classes(parts, characters, max_constants=CONSTANT_POOL_BUDGET):
+    """
+    Spread the methods of a play over as many classes as it takes to keep each one's constant
+    pool under max_constants entries. The first class also has the characters' fields.
+    :param parts: A list of (name, statements, estimated size) for each method, in order.
+    :param characters: The characters in the play.
+    :param max_constants: The most constant pool entries to put in a class.
+    :returns: A list of the parts in each class, in order.
+    """
+
+    keys = {('field', name) for character in characters for name in (character, character + '_stk')}
+    constants = CLASS_CONSTANTS + keys_constants(keys)
+    classes = [[]]
+
+    for part in parts:
+        name, statements, _ = part
+        part_keys = {('method', name)}
+        for statement in statements:
+            constant_keys(statement, part_keys, STRING_CHUNK_LENGTH)
+
+        new_constants = keys_constants(part_keys - keys)
+        if classes[-1] and constants + new_constants > max_constants:
+            classes.append([])
+            keys = set()
+            constants = CLASS_CONSTANTS
+            new_constants = keys_constants(part_keys)
+        classes[-1].append(part)
+        keys |= part_keys
+        constants += new_constants
+
+    return classes
+
+
+def retarget(statement, qualified):
+    """:returns: the statement, going to qualified[name] instead of any method name in qualified."""
+    if statement[0] == STMT_IF:
+        return STMT_IF, statement[1], retarget(statement[2], qualified)
+    elif statement[0] in GOTO_STMTS and statement[1] in qualified:
+        return statement[0], qualified[statement[1]]
+    return statement
+
+
+def emit_method(name, statements, modifier, indent, java, reentrant=False):
+    """Add a method made of statements to the Java code, indented by indent."""
+
+    if name == 'main':
+        java.append(indent + entry_header(reentrant) + '\n' + indent + '\t')
+    else:
+        java.append(indent + modifier + ('' if reentrant else 'static ') + 'void ' + name + '() {\n' + indent + '\t')
+
+    out = output_stream(reentrant)
+    for statement in statements:
+        java.append(indented(java_statement(statement, out), indent + '\t') + '\n' + indent + '\t')
+
+    java[-1] = java[-1][:-1] # remove the last tab
+    java.append('}\n')
+
+
+def cast_arrays(play, characters):
+    """:returns: the play, with characters numbered in order and renamed to elements of CAST_ARRAY, e.g. cast[3]."""
+
+    names = {character: '%s[%d]' % (CAST_ARRAY, number) for number, character in enumerate(characters)}
+    methods = [Method(method.name, [rename_characters(statement, names) for statement in method.statements])
+               for method in play.methods]
+    return Play([names[character] for character in characters], methods,
+                {names[character]: value for character, value in play.initial_values.items() if character in names},
+                {names[character]: stack for character, stack in play.initial_stacks.items() if character in names})
+
+
+def emit_cast_arrays(play, characters, modifier, static, java):
+    """
+    Add the arrays of the characters' values and stacks made by cast_arrays() to the Java code,
+    with an initializer filling them in.
+    :param play: The Play returned by cast_arrays().
+    :param characters: The characters' original names, in order.
+    :param modifier: The access modifier of the arrays, with a space after it, or ''.
+    :param static: 'static ' if the arrays are static fields, or '' for instance fields.
+    """
+
+    java.extend('\t// %d: %s\n' % (number, character) for number, character in enumerate(characters))
+    java.append('''\
+\t{0}{1}int[] {2} = new int[{4}];
+\t@SuppressWarnings("unchecked")
+\t{0}{1}Deque<Integer>[] {3} = new Deque[{4}];
+\t{1}{{
+\t\tfor (int i = 0; i < {4}; i++) {{
+\t\t\t{3}[i] = new ArrayDeque<Integer>();
+\t\t}}
+'''.format(modifier, static, CAST_ARRAY, CAST_STACK_ARRAY, len(characters)))
+    for character in play.characters:
+        if character in play.initial_values:
+            java.append('\t\t%s = %d;\n' % (character, play.initial_values[character]))
+        if character in play.initial_stacks:
+            # addAll() adds to the end, but push() adds to the start
+            values = ', '.join(map(str, reversed(play.initial_stacks[character])))
+            java.append('\t\t%s.addAll(java.util.Arrays.asList(%s));\n' % (stack_name(character), values))
+    java.append('\t}\n')
+
+
+def emit_character_fields(play, characters, modifier, static, java):
+    """
+    Add a field for each character's value, and one for its stack if it uses it, to the Java code
+    (see emit_cast_arrays()).
+    """
+
+    stacks = set(stack_characters(play))
+    for character in characters:
+        if character in play.initial_values:
+            java.append('\t%s%sint %s = %d;\n' % (modifier, static, character, play.initial_values[character]))
+        else:
+            java.append('\t%s%sint %s;\n' % (modifier, static, character))
+        if character not in stacks:
+            continue
+        if character in play.initial_stacks:
+            # ArrayDeque(Collection) adds to the end, but push() adds to the start
+            values = ', '.join(map(str, reversed(play.initial_stacks[character])))
+            java.append('\t%s%sDeque<Integer> %s_stk = '
+                        'new ArrayDeque<Integer>(java.util.Arrays.asList(%s));\n' % (modifier, static, character, values))
+        else:
+            java.append('\t%s%sDeque<Integer> %s_stk = new ArrayDeque<Integer>();\n' % (modifier, static, character))
+
+
+def structured_size(play):
+    """:returns: the estimated size of the bytecode for the whole play in main(), structured."""
+    methods = reachable_methods(play)
+    size = sum(statement_size(statement, STRING_CHUNK_LENGTH) for method in methods for statement in method.statements)
+    return size + 4 * len(methods) + 32 # a jump table entry for each, if it needs a dispatch loop
+
+
+def method_size(method):
+    """:returns: the estimated size of the bytecode for a method's statements, as a case of a dispatch loop."""
+    return sum(statement_size(statement, STRING_CHUNK_LENGTH) for statement in method.statements) + 4
+
+
+def emit_java(play, java_classname, structured=False, max_method_size=HUGE_METHOD_LIMIT, method_sizes=None,
+              max_constants=CONSTANT_POOL_BUDGET, profile=None, reentrant=False, bench=False,
+              character_arrays=False, limits=None):
+    """
+    Generate the Java code for a play. Normally each act and scene becomes a static method
+    which calls the next one when it's done, and jumps call the method they jump to then return.
+    Methods bigger than max_method_size are split into parts which call each other, and a play
+    with too many constants for one class is spread over nested classes.
+    :param play: The parsed Play.
+    :param java_classname: The name of the output Java class.
+    :param structured: If True, put the whole play in main() instead, with jumps turned into
+        loops and labeled blocks (see structurer.py), and a dispatch loop for any parts that can't be. If
+        that would be too big for one method, it isn't structured after all.
+    :param max_method_size: The most bytes of bytecode to put in a method, or None for no limit.
+    :param method_sizes: An optional dict to fill with the estimated bytecode size of each method.
+    :param max_constants: The most constant pool entries to put in a class.
+    :param profile: An optional ScenesProfile (see sceneprofile.py). If given and not structured,
+        the most entered acts and scenes are put in a dispatch loop in main(), laid out so each
+        falls through into its usual successor, and only the rest are methods.
+    :param reentrant: If True, the characters are instance fields instead of static ones, and the
+        class is a Runnable whose constructor takes the InputStream to read from and PrintStream to
+        print to, so any number of instances can run at once in one JVM. main() runs one on
+        System.in and System.out.
+    :param bench: If True, generate a reentrant class whose main() is a benchmark harness instead:
+        it runs the play on the bytes of a file (see BENCH_MAIN), first to warm up and then timing
+        each run, throws away what it prints, and prints latency percentiles and throughput.
+    :param character_arrays: If True, the characters' values and stacks are elements of two arrays
+        (see CAST_ARRAY) instead of two fields each, so a play with thousands of characters makes a
+        small class which loads quickly. Either way, characters nothing uses are left out.
+    :param limits: Optional Limits whose deadline structuring the play has to finish by (see limits.py).
+    :returns: A list of fragments of Java code which make up the class when joined.
+    :raises DeadlineExceededError: if the deadline is up before the play is structured.
+    """
+
+    reentrant = reentrant or bench
+    characters = used_characters(play)
+    fields = characters # the names the fields are made from
+    if character_arrays:
+        play = cast_arrays(play, characters)
+        fields = [CAST_ARRAY]
+
+    if structured:
+        size = structured_size(play)
+        structured = size <= JVM_METHOD_LIMIT
+
+    hot = None
+    if profile is not None and not structured:
+        hot = hot_methods(play, profile, method_size, max_method_size or JVM_METHOD_LIMIT)
+        hot_names = {method.name for method in hot}
+        parts = []
+        for method in reachable_methods(play):
+            if method.name not in hot_names:
+                parts += split_method(method, max_method_size)
+        hot_size = METHOD_OVERHEAD + sum(method_size(method) for method in hot)
+        main_part = 'main', [statement for method in hot for statement in method.statements], hot_size
+        if len(assign_classes([main_part] + parts, fields, max_constants)) > 1:
+            hot = None # too big for one class: it's laid out without the profile
+
+    classes = [[]]
+    if not structured and hot is None:
+        parts = []
+        for method in play.methods:
+            parts += split_method(method, max_method_size)
+        classes = assign_classes(parts, fields, max_constants)
+    modifier = 'private ' if len(classes) == 1 else '' # nested classes can't use private members before Java 11
+    class_names = [java_classname] + ['Part%d' % k for k in range(2, len(classes) + 1)]
+
+    if reentrant:
+        java = ['''\
+// Generated by Ryan Dancy's SPL to Java translator.
+import java.io.InputStream;
+import java.io.PrintStream;
+import java.util.ArrayDeque;
+import java.util.Deque;
+import java.util.Scanner;
+
+public class %s implements Runnable {
+\t%sfinal Scanner scanner;
+\t%sfinal PrintStream out;
+''' % (java_classname, modifier, modifier)]
+        static = ''
+    else:
+        java = ['''\
+// Generated by Ryan Dancy's SPL to Java translator.
+import java.util.ArrayDeque;
+import java.util.Deque;
+import java.util.Scanner;
+
+public class %s {
+\t%sstatic Scanner scanner = new Scanner(System.in);
+''' % (java_classname, modifier)]
+        static = 'static '
+
+    # add the characters
+    if character_arrays:
+        emit_cast_arrays(play, characters, modifier, static, java)
+    else:
+        emit_character_fields(play, characters, modifier, static, java)
+
+    if reentrant:
+        # an instance of each nested class, which are inner classes so they can use the characters
+        for name in class_names[1:]:
+            java.append('\tfinal %s %s = new %s();\n' % (name, name.lower(), name))
+        java.append('''\
+\tpublic {0}(InputStream in, PrintStream out) {{
+\t\tscanner = new Scanner(in);
+\t\tthis.out = out;
+\t}}
+\tpublic {0}() {{
+\t\tthis(System.in, System.out);
+\t}}
+'''.format(java_classname))
+        if bench:
+            java.append(BENCH_MAIN.format(java_classname, BENCH_ITERATIONS, BENCH_WARMUP_ITERATIONS))
+        else:
+            java.append('\tpublic static void main(String[] args) {\n\t\tnew %s().run();\n\t}\n' % java_classname)
+
+    if structured:
+        if method_sizes is not None:
+            method_sizes['main'] = size
+        java.append('\t' + entry_header(reentrant) + '\n')
+        structure = structure_play(play, limits)
+        if structure is not None:
+            for dispatch in structure.dispatches:
+                java.append('\t\tint %s = 0;\n' % dispatch.variable)
+            emit_structured_items(structure.items, structure, [], '\t\t', java, reentrant)
+        else:
+            emit_dispatch_loop(reachable_methods(play), java, reentrant)
+        java.append('\t}\n}\n')
+        return java
+
+    if hot is not None:
+        # the hot methods are cases in main(), and the others return which case to go on to
+        numbers = {method.name: i for i, method in enumerate(hot)}
+        java.append('\t' + entry_header(reentrant) + '\n')
+        emit_dispatch_loop(hot, java, reentrant)
+        java.append('\t}\n')
+        for name, statements, size in parts:
+            emit_cold_method(name, statements, numbers, java, reentrant)
+            if method_sizes is not None:
+                method_sizes[name] = size
+        if method_sizes is not None:
+            method_sizes['main'] = hot_size
+        java.append('}\n')
+        return java
+
+    locations = {name: k for k, parts in enumerate(classes) for name, _, _ in parts}
+
+    for k, parts in enumerate(classes):
+        # calls to methods in other classes need the class name, or for a reentrant class, the
+        # instance of the inner class (the outer class' methods can be called as they are)
+        if reentrant:
+            qualified = {name: class_names[location].lower() + '.' + name
+                         for name, location in locations.items() if location not in (0, k)}
+        else:
+            qualified = {name: class_names[location] + '.' + name
+                         for name, location in locations.items() if location != k}
+        indent = '\t'
+        if k > 0:
+            java.append('\t%sfinal class %s {\n' % (static, class_names[k]))
+            indent = '\t\t'
+
+        for name, statements, size in parts:
+            if qualified:
+                statements = [retarget(statement, qualified) for statement in statements]
+            emit_method(name, statements, modifier, indent, java, reentrant)
+            if method_sizes is not None:
+                method_sizes[class_names[k] + '.' + name if k > 0 else name] = size
+
+        if k > 0:
+            java.append('\t}\n')
+
+    java.append('}\n')
+    return java
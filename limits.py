@@ -0,0 +1,87 @@
+"""
+Limits on the resources translating one play may use, for translating plays from untrusted
+sources, e.g. in a shared service. Every stage of translation takes time and memory linear in
+the size of its input, so bounding the input, its tokens and the output bounds the rest; the
+deadline is checked as translation goes so that even a play within those bounds can't pin a CPU.
+"""
+
+import copy
+import time
+
+from splerror import *
+
+
+class Limits:
+    """
+    Bounds on translating one play, each None for no bound. Going over one raises the LimitError
+    subclass for it. A Limits is never changed once translation starts, so one can be shared.
+    """
+
+    def __init__(self, max_input_size=None, max_tokens=None, max_expression_depth=None, max_sections=None,
+                 max_output_size=None, deadline=None):
+        """
+        :param max_input_size: The most chars of SPL source.
+        :param max_tokens: The most tokens (words and punctuation) in the source.
+        :param max_expression_depth: The most operators (e.g. adjectives, "the sum of") an
+            expression can be nested inside.
+        :param max_sections: The most acts and scenes, together.
+        :param max_output_size: The most chars of generated code.
+        :param deadline: The most seconds translation can take.
+        """
+
+        self.max_input_size = max_input_size
+        self.max_tokens = max_tokens
+        self.max_expression_depth = max_expression_depth
+        self.max_sections = max_sections
+        self.max_output_size = max_output_size
+        self.deadline = deadline
+        self.expires = None # the time.monotonic() the deadline is up at, once started
+
+    def __repr__(self):
+        return 'Limits({})'.format(', '.join('{}={!r}'.format(name, value) for name, value in vars(self).items()
+                                             if name != 'expires' and value is not None))
+
+    def start(self):
+        """:returns: a copy of the limits with the deadline counting from now, or these if that's already so."""
+        if self.expires is not None or self.deadline is None:
+            return self
+        started = copy.copy(self)
+        started.expires = time.monotonic() + self.deadline
+        return started
+
+    def check_input(self, spl):
+        """:raises InputTooLargeError: if the SPL source is too long."""
+        if self.max_input_size is not None and len(spl) > self.max_input_size:
+            raise InputTooLargeError('The play is %d characters long, more than the limit of %d.'
+                                     % (len(spl), self.max_input_size))
+
+    def check_tokens(self, count):
+        """:raises TooManyTokensError: if count tokens are too many."""
+        if self.max_tokens is not None and count > self.max_tokens:
+            raise TooManyTokensError('The play has %d tokens, more than the limit of %d.' % (count, self.max_tokens))
+
+    def check_expression_depth(self, depth):
+        """:raises ExpressionTooDeepError: if an expression nested depth operators deep is too deep."""
+        if self.max_expression_depth is not None and depth > self.max_expression_depth:
+            raise ExpressionTooDeepError('An expression is nested more than %d deep.' % self.max_expression_depth)
+
+    def check_sections(self, count):
+        """:raises TooManySectionsError: if count acts and scenes are too many."""
+        if self.max_sections is not None and count > self.max_sections:
+            raise TooManySectionsError('The play has more than %d acts and scenes.' % self.max_sections)
+
+    def check_output(self, size):
+        """:raises OutputTooLargeError: if size chars of generated code are too many."""
+        if self.max_output_size is not None and size > self.max_output_size:
+            raise OutputTooLargeError('The generated code is %d characters long, more than the limit of %d.'
+                                      % (size, self.max_output_size))
+
+    def check_deadline(self):
+        """:raises DeadlineExceededError: if the deadline is up."""
+        if self.expires is not None and time.monotonic() > self.expires:
+            raise DeadlineExceededError('Translation took longer than the limit of %g seconds.' % self.deadline)
+
+
+# reasonable limits for a shared service translating plays from anyone
+UNTRUSTED_LIMITS = Limits(max_input_size=1 << 20, max_tokens=250000, max_expression_depth=500, max_sections=10000,
+                          max_output_size=16 << 20, deadline=10)
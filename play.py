@@ -0,0 +1,321 @@
+"""
+The parsed form of an SPL play, which the parser produces and the code generators consume.
+Like symbols, expressions and statements are tuples of (TYPE, data, ...).
+"""
+
+
+# expression types
+EXPR_CONSTANT = 0 # (EXPR_CONSTANT, value)
+EXPR_CHARACTER = 1 # (EXPR_CHARACTER, name): that character's value
+EXPR_TWICE = 2 # (EXPR_TWICE, x): twice, adjectives
+EXPR_THRICE = 3 # (EXPR_THRICE, x)
+EXPR_SQUARE = 4 # (EXPR_SQUARE, x)
+EXPR_CUBE = 5 # (EXPR_CUBE, x)
+EXPR_SQUARE_ROOT = 6 # (EXPR_SQUARE_ROOT, x)
+EXPR_CUBE_ROOT = 7 # (EXPR_CUBE_ROOT, x)
+EXPR_HALF = 8 # (EXPR_HALF, x)
+EXPR_SUM = 9 # (EXPR_SUM, x, y)
+EXPR_DIFFERENCE = 10 # (EXPR_DIFFERENCE, x, y)
+EXPR_PRODUCT = 11 # (EXPR_PRODUCT, x, y)
+EXPR_QUOTIENT = 12 # (EXPR_QUOTIENT, x, y)
+EXPR_REMAINDER = 13 # (EXPR_REMAINDER, x, y)
+EXPR_LOCAL = 14 # (EXPR_LOCAL, name): the value of a local from a STMT_LOCAL
+
+UNARY_EXPRS = (EXPR_TWICE, EXPR_THRICE, EXPR_SQUARE, EXPR_CUBE, EXPR_SQUARE_ROOT, EXPR_CUBE_ROOT, EXPR_HALF)
+BINARY_EXPRS = (EXPR_SUM, EXPR_DIFFERENCE, EXPR_PRODUCT, EXPR_QUOTIENT, EXPR_REMAINDER)
+
+# comparisons made by questions
+COMPARE_EQUAL = 0 # as ... as
+COMPARE_GREATER = 1 # better than, etc.
+COMPARE_LESS = 2 # worse than, etc.
+
+# statement types
+STMT_ASSIGN = 0 # (STMT_ASSIGN, character, expression)
+STMT_PUSH = 1 # (STMT_PUSH, character): remember
+STMT_POP = 2 # (STMT_POP, character): recall
+STMT_INPUT_NUMBER = 3 # (STMT_INPUT_NUMBER, character): listen to your heart
+STMT_INPUT_CHARACTER = 4 # (STMT_INPUT_CHARACTER, character): open your mind
+STMT_OUTPUT_NUMBER = 5 # (STMT_OUTPUT_NUMBER, character): open your heart
+STMT_OUTPUT_CHARACTER = 6 # (STMT_OUTPUT_CHARACTER, character): speak your mind
+STMT_IF = 7 # (STMT_IF, condition, statement); a condition is (COMPARE_X, expression, expression, negated)
+STMT_JUMP = 8 # (STMT_JUMP, method): let us return to scene II, etc.
+STMT_NEXT = 9 # (STMT_NEXT, method): carry on into the next act or scene
+STMT_OUTPUT_STRING = 10 # (STMT_OUTPUT_STRING, text): output text worked out at translation time
+STMT_LOCAL = 11 # (STMT_LOCAL, name, expression): work out an expression used again later (see cse.py)
+
+# statements which transfer control to another method, never to come back
+GOTO_STMTS = (STMT_JUMP, STMT_NEXT)
+
+
+class Method:
+    """
+    The main method, an act or a scene: its name (e.g. 'act1scene2') and its statements.
+    A method either ends with an unguarded STMT_JUMP or STMT_NEXT, or the play ends with it.
+    """
+
+    def __init__(self, name, statements=None):
+        self.name = name
+        self.statements = statements if statements is not None else []
+
+    def __repr__(self):
+        return 'Method({!r}, {!r})'.format(self.name, self.statements)
+
+
+class Play:
+    """A parsed SPL play: its characters and its methods, starting with 'main'."""
+
+    def __init__(self, characters, methods, initial_values=None, initial_stacks=None):
+        """
+        :param characters: The characters in the play, in the order they were declared.
+        :param methods: A list of Methods in the order they appear; the first one is run first.
+        :param initial_values: A dict mapping characters to their values when the play starts,
+            if not 0.
+        :param initial_stacks: A dict mapping characters to the contents of their stacks when the
+            play starts (bottom first), if not empty.
+        """
+        self.characters = characters
+        self.methods = methods
+        self.initial_values = initial_values if initial_values is not None else {}
+        self.initial_stacks = initial_stacks if initial_stacks is not None else {}
+
+    @property
+    def entry(self):
+        """:returns: the name of the method run first."""
+        return self.methods[0].name
+
+    def method_dict(self):
+        """:returns: a dict mapping method names to Methods."""
+        return {method.name: method for method in self.methods}
+
+
+def unguarded(statement):
+    """:returns: the statement inside any number of STMT_IFs, and a list of their conditions."""
+    conditions = []
+    while statement[0] == STMT_IF:
+        conditions.append(statement[1])
+        statement = statement[2]
+    return statement, conditions
+
+
+def statement_expressions(statement):
+    """:returns: a list of (expression, True if always worked out) for the expressions in a statement, in order."""
+
+    expressions = []
+    always = True
+    while statement[0] == STMT_IF:
+        _, expr1, expr2, _ = statement[1]
+        expressions += [(expr1, always), (expr2, always)]
+        always = False
+        statement = statement[2]
+    if statement[0] == STMT_ASSIGN or statement[0] == STMT_LOCAL:
+        expressions.append((statement[2], always))
+    return expressions
+
+
+def replace_expressions(statement, exprs):
+    """:returns: the statement with its statement_expressions() replaced by those from the iterator exprs."""
+    if statement[0] == STMT_IF:
+        op, _, _, negated = statement[1]
+        condition = op, next(exprs), next(exprs), negated
+        return STMT_IF, condition, replace_expressions(statement[2], exprs)
+    elif statement[0] == STMT_ASSIGN or statement[0] == STMT_LOCAL:
+        return statement[0], statement[1], next(exprs)
+    return statement
+
+
+def statement_targets(statement):
+    """:returns: the names of the methods which statement may go to (possibly none)."""
+    statement, _ = unguarded(statement)
+    return (statement[1],) if statement[0] in GOTO_STMTS else ()
+
+
+def method_targets(method):
+    """:returns: a list of the names of the methods that method may go to, in order, without duplicates."""
+    targets = []
+    for statement in method.statements:
+        for target in statement_targets(statement):
+            if target not in targets:
+                targets.append(target)
+    return targets
+
+
+def reachable_methods(play):
+    """:returns: the methods of the play reachable from its entry, in program order."""
+
+    methods = play.method_dict()
+    reachable = {play.entry}
+    to_visit = [play.entry]
+    while to_visit:
+        for target in method_targets(methods[to_visit.pop()]):
+            if target not in reachable:
+                reachable.add(target)
+                to_visit.append(target)
+    return [method for method in play.methods if method.name in reachable]
+
+
+def subexpressions(expr):
+    """:returns: an iterator over expr and all of the expressions inside it, outermost first, without recursing."""
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        yield expr
+        if expr[0] != EXPR_CONSTANT and expr[0] != EXPR_CHARACTER and expr[0] != EXPR_LOCAL:
+            stack.extend(reversed(expr[1:]))
+
+
+def same_expression(expr1, expr2):
+    """:returns: True if two expressions are the same, without recursing (as comparing the tuples with == does)."""
+    stack = [(expr1, expr2)]
+    while stack:
+        expr1, expr2 = stack.pop()
+        if expr1 is expr2:
+            continue
+        if expr1[0] != expr2[0] or len(expr1) != len(expr2):
+            return False
+        if expr1[0] == EXPR_CONSTANT or expr1[0] == EXPR_CHARACTER or expr1[0] == EXPR_LOCAL:
+            if expr1[1] != expr2[1]:
+                return False
+        else:
+            stack.extend(zip(expr1[1:], expr2[1:]))
+    return True
+
+
+def expression_fragments(expr, formats, leaf):
+    """
+    Write an expression as a list of fragments of code to be joined once, so that a deeply
+    nested expression takes time and memory linear in its size (and no recursion).
+    :param expr: The expression.
+    :param formats: A dict mapping each expression type with operands to a list of the strings
+        that go before, between and after its operands, e.g. ['(', ' + ', ')'].
+    :param leaf: A function returning the code for a constant, character or local.
+    :returns: The list of fragments.
+    """
+
+    fragments = []
+    stack = [expr]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            fragments.append(item)
+        elif item[0] == EXPR_CONSTANT or item[0] == EXPR_CHARACTER or item[0] == EXPR_LOCAL:
+            fragments.append(leaf(item))
+        else:
+            pieces = formats[item[0]]
+            for k in range(len(pieces) - 1, 0, -1):
+                stack.append(pieces[k])
+                stack.append(item[k])
+            stack.append(pieces[0])
+    return fragments
+
+
+def split_formats(formats):
+    """:returns: the dict of str.format() strings formats, with each one split at its {}s for expression_fragments()."""
+    return {expr_type: fmt_str.split('{}') for expr_type, fmt_str in formats.items()}
+
+
+def expression_characters(expr, characters):
+    """Add the names of the characters whose values expr uses to the set characters."""
+    characters.update(node[1] for node in subexpressions(expr) if node[0] == EXPR_CHARACTER)
+
+
+def expression_locals(expr, locals_):
+    """Add the names of the locals whose values expr uses to the set locals_."""
+    locals_.update(node[1] for node in subexpressions(expr) if node[0] == EXPR_LOCAL)
+
+
+def statement_characters(statement, characters):
+    """Add the names of the characters which statement uses or changes to the set characters."""
+    statement, conditions = unguarded(statement)
+    for _, expr1, expr2, _ in conditions:
+        expression_characters(expr1, characters)
+        expression_characters(expr2, characters)
+    if statement[0] == STMT_ASSIGN:
+        characters.add(statement[1])
+        expression_characters(statement[2], characters)
+    elif statement[0] == STMT_LOCAL:
+        expression_characters(statement[2], characters)
+    elif statement[0] not in GOTO_STMTS and statement[0] != STMT_OUTPUT_STRING:
+        characters.add(statement[1])
+
+
+def used_characters(play):
+    """:returns: the characters the play's statements use or change, in the order they were declared."""
+    used = set()
+    for method in play.methods:
+        for statement in method.statements:
+            statement_characters(statement, used)
+    return [character for character in play.characters if character in used]
+
+
+def stack_characters(play):
+    """:returns: the characters whose stacks the play pushes to, pops from or starts with something in, in order."""
+    used = set(play.initial_stacks)
+    for method in play.methods:
+        for statement in method.statements:
+            statement, _ = unguarded(statement)
+            if statement[0] == STMT_PUSH or statement[0] == STMT_POP:
+                used.add(statement[1])
+    return [character for character in play.characters if character in used]
+
+
+def rename_expression(expr, names):
+    """:returns: expr with each character in the dict names renamed to names[character], without recursing."""
+
+    # build it bottom up: each node goes on the stack, then again once its operands are done
+    done = []
+    stack = [(expr, False)]
+    while stack:
+        node, operands_done = stack.pop()
+        if node[0] == EXPR_CHARACTER:
+            done.append((EXPR_CHARACTER, names.get(node[1], node[1])))
+        elif node[0] == EXPR_CONSTANT or node[0] == EXPR_LOCAL:
+            done.append(node)
+        elif operands_done:
+            count = len(node) - 1
+            operands = done[-count:]
+            del done[-count:]
+            done.append((node[0],) + tuple(operands))
+        else:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in reversed(node[1:]))
+    return done[0]
+
+
+def rename_characters(statement, names):
+    """:returns: the statement with each character in the dict names renamed to names[character]."""
+    exprs = iter([rename_expression(expr, names) for expr, _ in statement_expressions(statement)])
+    statement = replace_expressions(statement, exprs)
+
+    conditions = []
+    while statement[0] == STMT_IF:
+        conditions.append(statement[1])
+        statement = statement[2]
+    if statement[0] not in GOTO_STMTS and statement[0] not in (STMT_OUTPUT_STRING, STMT_LOCAL):
+        statement = (statement[0], names.get(statement[1], statement[1])) + statement[2:]
+    for condition in reversed(conditions):
+        statement = STMT_IF, condition, statement
+    return statement
+
+
+def play_locals(play):
+    """:returns: the names of the locals the play's STMT_LOCALs set, in order."""
+    return [statement[1] for method in play.methods for statement in method.statements
+            if statement[0] == STMT_LOCAL]
+
+
+def falls_off_end(method):
+    """:returns: True if control can reach the end of method (which ends the play)."""
+    return not method.statements or method.statements[-1][0] not in GOTO_STMTS
+
+
+def count_expressions(play):
+    """:returns: the number of whole expressions (not subexpressions) in the play."""
+    count = 0
+    for method in play.methods:
+        for statement in method.statements:
+            while statement[0] == STMT_IF:
+                count += 2
+                statement = statement[2]
+            if statement[0] == STMT_ASSIGN:
+                count += 1
+    return count
@@ -0,0 +1,245 @@
+"""
+Execution profiles of plays, for profile-guided optimization: how many times each act and scene
+was entered, and how many times each jump guarded by a question was taken or not.
+
+A profile is a JSON file like this:
+
+    {
+        "format": "spl2java-profile",
+        "version": 1,
+        "entries": {"main": 1, "act1": 1, "act1scene1": 1, "act1scene2": 1000},
+        "jumps": {"act1scene2": {"act1scene2": [999, 1]}}
+    }
+
+"entries" maps the name of each act and scene (e.g. "act1scene2", as in the generated Java, and
+"main" for the start of the play) to the number of times it was entered. "jumps" maps the name of
+the act or scene a jump guarded by a question is in to the name of the one it goes to, and that to
+[times taken, times not taken]; several jumps from one scene to another are added together. Acts
+and scenes which aren't in the profile count as never entered. record_profile() makes one by
+running a play with the interpreter; anything else (e.g. an instrumented build) can write them too.
+"""
+
+import json
+
+from interpreter import STOP_LIMIT, Interpreter
+from play import *
+
+
+PROFILE_FORMAT = 'spl2java-profile'
+PROFILE_VERSION = 1
+
+PROFILE_MAX_STEPS = 10 ** 7 # statements run by record_profile()
+PROFILE_DEADLINE_STEPS = 10000 # statements run by record_profile() between checks of the deadline
+
+HOT_COVERAGE = 0.99 # the fraction of all scene entries the hot scenes should account for
+
+
+class ScenesProfile:
+    """An execution profile: entry counts for each act and scene, and taken/not taken counts for jumps."""
+
+    def __init__(self, entries=None, jumps=None):
+        """
+        :param entries: A dict mapping method names to the number of times they were entered.
+        :param jumps: A dict mapping method names to dicts mapping the names of the methods their
+            guarded jumps go to to [times taken, times not taken].
+        """
+        self.entries = entries if entries is not None else {}
+        self.jumps = jumps if jumps is not None else {}
+
+    def taken(self, source, target):
+        """:returns: the number of times guarded jumps from source to target were taken."""
+        return self.jumps.get(source, {}).get(target, (0, 0))[0]
+
+    def to_json(self):
+        """:returns: the profile as a JSON object (a dict)."""
+        return {'format': PROFILE_FORMAT, 'version': PROFILE_VERSION, 'entries': self.entries, 'jumps': self.jumps}
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        :param data: A JSON object (a dict) in the format described in this module.
+        :returns: The ScenesProfile.
+        :raises ValueError: if data isn't a profile.
+        """
+
+        if not isinstance(data, dict) or data.get('format') != PROFILE_FORMAT:
+            raise ValueError('Not an SPL execution profile.')
+        if data.get('version') != PROFILE_VERSION:
+            raise ValueError('Unsupported profile version: ' + str(data.get('version')))
+
+        def count(value):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise ValueError('Bad count in profile: ' + repr(value))
+            return value
+
+        entries = {str(name): count(n) for name, n in data.get('entries', {}).items()}
+        jumps = {}
+        for source, targets in data.get('jumps', {}).items():
+            for target, counts in targets.items():
+                if not isinstance(counts, list) or len(counts) != 2:
+                    raise ValueError('Bad jump counts in profile: ' + repr(counts))
+                jumps.setdefault(str(source), {})[str(target)] = [count(counts[0]), count(counts[1])]
+        return cls(entries, jumps)
+
+
+def load_profile(filename):
+    """:returns: the ScenesProfile in a JSON file. :raises ValueError: if it isn't a profile."""
+    with open(filename, 'r') as profile_file:
+        return ScenesProfile.from_json(json.load(profile_file))
+
+
+def save_profile(profile, filename):
+    """Write a ScenesProfile to a JSON file."""
+    with open(filename, 'w') as profile_file:
+        json.dump(profile.to_json(), profile_file, indent=1, sort_keys=True)
+        profile_file.write('\n')
+
+
+def record_profile(play, stdin='', max_steps=PROFILE_MAX_STEPS, limits=None):
+    """
+    Run a play with the interpreter and record how often each act and scene is entered and each
+    guarded jump is taken. It stops early if the play throws an exception or runs max_steps
+    statements; the profile is of what it did up to there.
+    :param play: The parsed Play.
+    :param stdin: The text the play reads as its input.
+    :param max_steps: The most statements to run.
+    :param limits: Optional Limits whose deadline the run has to finish by (see limits.py).
+    :returns: The ScenesProfile.
+    :raises DeadlineExceededError: if the deadline is up before it's done.
+    """
+
+    interpreter = Interpreter(play, stdin, record=True)
+    if limits is None:
+        interpreter.run(max_steps, float('inf'), float('inf'))
+    else:
+        limits = limits.start()
+        steps = 0
+        while steps < max_steps:
+            # check the deadline between runs of a few statements
+            steps = min(steps + PROFILE_DEADLINE_STEPS, max_steps)
+            if interpreter.run(steps, float('inf'), float('inf')) != STOP_LIMIT:
+                break
+            limits.check_deadline()
+    return ScenesProfile(dict(interpreter.entries), {source: {target: list(counts) for target, counts in targets.items()}
+                                                     for source, targets in interpreter.jumps.items()})
+
+
+def hot_methods(play, profile, size, budget):
+    """
+    Choose the methods to put in the main dispatch loop: the most entered ones, until they
+    account for HOT_COVERAGE of all entries or their code would be bigger than budget.
+    :param play: The Play.
+    :param profile: The ScenesProfile.
+    :param size: A function returning the size of a method's code.
+    :param budget: The most code to put in the loop, or None for no limit.
+    :returns: The hot methods, in the order to put them in the loop: the play's entry first, then
+        each one followed by the one it carries on into (or jumps to) at its end if that's hot too.
+    """
+
+    methods = reachable_methods(play)
+    entry = methods[0]
+    total = sum(profile.entries.get(method.name, 0) for method in methods)
+
+    hot = {entry.name}
+    used = size(entry)
+    covered = profile.entries.get(entry.name, 0)
+    for method in sorted(methods[1:], key=lambda method: -profile.entries.get(method.name, 0)):
+        count = profile.entries.get(method.name, 0)
+        if count == 0 or covered >= HOT_COVERAGE * total:
+            break
+        if budget is not None and used + size(method) > budget:
+            continue
+        hot.add(method.name)
+        used += size(method)
+        covered += count
+
+    # lay them out so each one falls through into its usual successor
+    by_name = play.method_dict()
+    remaining = [method for method in sorted(methods, key=lambda method: -profile.entries.get(method.name, 0))
+                 if method.name in hot and method is not entry]
+    order = [entry]
+    while remaining:
+        last = order[-1].statements[-1] if order[-1].statements else None
+        following = by_name.get(last[1]) if last is not None and last[0] in GOTO_STMTS else None
+        if following not in remaining:
+            following = remaining[0]
+        remaining.remove(following)
+        order.append(following)
+    return order
+
+
+def layout_methods(play, profile):
+    """:returns: the play with its hot methods first, as ordered by hot_methods(), then the rest."""
+    hot = hot_methods(play, profile, lambda method: 0, None)
+    hot_names = {method.name for method in hot}
+    methods = hot + [method for method in play.methods if method.name not in hot_names]
+    return Play(play.characters, methods, play.initial_values, play.initial_stacks)
+
+
+def can_throw(expr):
+    """:returns: True if working out the expression might divide by zero."""
+    return any(node[0] in (EXPR_QUOTIENT, EXPR_REMAINDER) and not (node[2][0] == EXPR_CONSTANT and node[2][1] != 0)
+               for node in subexpressions(expr))
+
+
+# the orderings for which each comparison holds, as -1 (less), 0 (equal) and 1 (greater)
+COMPARE_OUTCOMES = {COMPARE_LESS: {-1}, COMPARE_EQUAL: {0}, COMPARE_GREATER: {1}}
+
+
+def exclusive(condition1, condition2):
+    """:returns: True if the conditions of two questions can never both hold."""
+
+    op1, left1, right1, negated1 = condition1
+    op2, left2, right2, negated2 = condition2
+    outcomes1 = COMPARE_OUTCOMES[op1] if not negated1 else {-1, 0, 1} - COMPARE_OUTCOMES[op1]
+    outcomes2 = COMPARE_OUTCOMES[op2] if not negated2 else {-1, 0, 1} - COMPARE_OUTCOMES[op2]
+
+    if same_expression(left1, right2) and same_expression(right1, left2):
+        outcomes2 = {-outcome for outcome in outcomes2}
+        left2, right2 = right2, left2
+    if same_expression(left1, left2) and same_expression(right1, right2):
+        return not outcomes1 & outcomes2
+
+    # the same thing equal to two different constants, like the cases of a switch
+    if outcomes1 == outcomes2 == {0}:
+        for this1, that1 in ((left1, right1), (right1, left1)):
+            for this2, that2 in ((left2, right2), (right2, left2)):
+                if that1[0] == that2[0] == EXPR_CONSTANT and that1[1] != that2[1] and same_expression(this1, this2):
+                    return True
+    return False
+
+
+def order_jumps(play, profile):
+    """
+    Reorder each run of jumps guarded by questions which can't both hold (and can't throw) so the
+    most taken one is checked first. Only one of them can ever go, so it doesn't matter which is
+    checked first, except for how long it takes.
+    :param play: The Play.
+    :param profile: The ScenesProfile.
+    :returns: The new Play.
+    """
+
+    def guarded_jump(statement):
+        if statement[0] != STMT_IF or statement[2][0] != STMT_JUMP:
+            return None
+        condition = statement[1]
+        return None if can_throw(condition[1]) or can_throw(condition[2]) else condition
+
+    methods = []
+    for method in play.methods:
+        statements = list(method.statements)
+        start = 0
+        while start < len(statements):
+            # find the longest run starting here whose conditions are all mutually exclusive
+            end = start
+            while end < len(statements):
+                condition = guarded_jump(statements[end])
+                if condition is None or not all(exclusive(condition, statements[k][1]) for k in range(start, end)):
+                    break
+                end += 1
+            if end - start > 1:
+                statements[start:end] = sorted(statements[start:end],
+                                               key=lambda statement: -profile.taken(method.name, statement[2][1]))
+            start = max(end, start + 1)
+        methods.append(Method(method.name, statements))
+    return Play(play.characters, methods, play.initial_values, play.initial_stacks)
@@ -7,23 +7,34 @@ SPL is an esoteric programming language defined
 
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import cProfile
 import re
+from codesize import HUGE_METHOD_LIMIT
+from instrumentation import TranslationStats, write_collapsed_stacks
+from interpreter import PRECOMPUTE_MAX_STEPS
+from limits import UNTRUSTED_LIMITS, Limits
+from sceneprofile import load_profile, record_profile, save_profile
 from splerror import SplError
-from translator import translate
+from translator import DEFAULT_TRANSLATOR, TARGETS, translate
 
 
-def translate_file(in_filename, java_classname):
+def translate_file(in_filename, java_classname, stats=None, target='java', **options):
     """
     Translate the SPL contents of the file with name in_filename
     to Java, outputting to out_filename. Note that the file extensions
-    are appended.
+    are appended. If the play has errors, all of them are printed, with
+    their lines and columns.
     
     :param in_filename: the input SPL filename.
     :param java_classname: the name of the output Java class; the filename is {java_classname}.java.
+    :param stats: an optional TranslationStats to fill in during translation.
+    :param target: the language to translate to, 'java' or 'c'; the extension of the output file matches.
+    :param options: other options for code generation; see translator.emit().
     :raises FileNotFoundError: if in_filename does not exist
     """
 
-    out_filename = java_classname + '.java'
+    out_filename = java_classname + TARGETS[target]
 
     # parse in_filename and output to out_filename
     
@@ -31,7 +42,7 @@ def translate_file(in_filename, java_classname):
         spl = spl_file.read()
 
     try:
-        java = translate(spl, java_classname)
+        java = translate(spl, java_classname, stats=stats, target=target, recover=True, **options)
     except SplError as e:
         error = e.args[0]
         print('Compilation error:')
@@ -44,13 +55,98 @@ def translate_file(in_filename, java_classname):
     print('Output successfully to', out_filename)
 
 
+def record_profile_file(in_filename, profile_filename, input_filename=None, limits=None):
+    """
+    Run the SPL play in the file with name in_filename with the interpreter, and write how often
+    each act and scene was entered and each guarded jump taken to profile_filename.
+
+    :param in_filename: the input SPL filename.
+    :param profile_filename: the filename to write the profile to (see sceneprofile.py).
+    :param input_filename: the file to give the play as its input, or None for none.
+    :param limits: optional Limits on parsing the play, with a deadline running it has to finish by too.
+    :returns: True if it was recorded, False if the play doesn't compile or goes over a limit.
+    :raises FileNotFoundError: if in_filename or input_filename does not exist
+    """
+
+    with open(in_filename, 'r') as spl_file:
+        spl = spl_file.read()
+    stdin = ''
+    if input_filename is not None:
+        with open(input_filename, 'r') as input_file:
+            stdin = input_file.read()
+
+    try:
+        play = DEFAULT_TRANSLATOR.parse(spl, limits=limits)
+        profile = record_profile(play, stdin, limits=limits)
+    except SplError as e:
+        print('Compilation error:')
+        print(e.args[0])
+        return False
+
+    save_profile(profile, profile_filename)
+    print('Profile recorded to', profile_filename)
+    return True
+
+
 def main():
     """Get in/out files from the command-line arguments and pass to translate()."""
     parser = argparse.ArgumentParser(description='SPL to Java translator.')
     parser.add_argument('spl_file', type=str, help='The file containing SPL code to be translated to Java.')
     parser.add_argument('java_class_name', type=str, help='The name of the output Java class. Cannot contain '
                         'spaces. The output Java file will be {java_class_name}.java.')
+    parser.add_argument('--target', choices=sorted(TARGETS), default='java', help='The language to translate '
+                        'to. With "c", a single C99 file named {java_class_name}.c is written instead.')
+    parser.add_argument('--structured', action='store_true', help='Generate the whole play as one Java '
+                        'method, with jumps between scenes turned into loops, instead of a method per scene.')
+    parser.add_argument('--reentrant', action='store_true', help='Generate a Java class whose instances each run '
+                        'the play with their own characters, input stream and output stream.')
+    parser.add_argument('--character-arrays', action='store_true', help='Keep the characters\' values and stacks '
+                        'in two arrays instead of two Java fields per character, for plays with thousands of characters.')
+    parser.add_argument('--bench', action='store_true', help='Generate a reentrant Java class whose main() times '
+                        'running the play many times on the input in a file, and prints latency percentiles and '
+                        'throughput: java {java_class_name} [INPUT_FILE [ITERATIONS [WARMUP_ITERATIONS]]].')
+    parser.add_argument('--precompute', type=int, nargs='?', const=PRECOMPUTE_MAX_STEPS, default=0, metavar='STEPS',
+                        help='Run the play at translation time until it reads input, and output what it printed '
+                        'as one string. STEPS is the most statements to run (default %d).' % PRECOMPUTE_MAX_STEPS)
+    parser.add_argument('--cse', action='store_true', help='Work out expressions used more than once in a scene '
+                        'only once, in a local variable.')
+    parser.add_argument('--promote-stacks', action='store_true', help='Replace the stack of each character that '
+                        'always has the same number of things on it when it remembers or recalls with a field for '
+                        'each place in it. --stats lists the characters.')
+    parser.add_argument('--max-method-size', type=int, default=HUGE_METHOD_LIMIT, metavar='BYTES', help='Split acts '
+                        'and scenes whose Java bytecode would be bigger than BYTES into several methods (default '
+                        '%d, the most the JIT compiles; 0 to never split).' % HUGE_METHOD_LIMIT)
+    parser.add_argument('--scene-profile', type=str, metavar='PROFILE_FILE', help='Optimize for the execution '
+                        'profile in PROFILE_FILE: lay out the most entered scenes together and check the most taken '
+                        'of exclusive jumps first. See sceneprofile.py for the format.')
+    parser.add_argument('--record-scene-profile', type=str, metavar='PROFILE_FILE', help='Run the play at '
+                        'translation time and record how often each scene is entered and each jump taken to '
+                        'PROFILE_FILE, then translate it using that profile.')
+    parser.add_argument('--profile-input', type=str, metavar='INPUT_FILE', help='The input to give the play '
+                        'when recording a profile with --record-scene-profile (default none).')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N', help='Tokenize, symbolize and parse a big play '
+                        'in N processes. The output is the same.')
+    parser.add_argument('--untrusted', action='store_true', help='Translate with limits suitable for plays from '
+                        'anyone: %r. Each can be changed with the options below.' % UNTRUSTED_LIMITS)
+    parser.add_argument('--max-input-size', type=int, metavar='CHARS', help='Reject plays longer than CHARS.')
+    parser.add_argument('--max-tokens', type=int, metavar='N', help='Reject plays with more than N tokens.')
+    parser.add_argument('--max-expression-depth', type=int, metavar='N', help='Reject plays with expressions '
+                        'nested more than N deep (e.g. N adjectives).')
+    parser.add_argument('--max-sections', type=int, metavar='N', help='Reject plays with more than N acts and '
+                        'scenes.')
+    parser.add_argument('--max-output-size', type=int, metavar='CHARS', help='Fail if the generated code would be '
+                        'longer than CHARS.')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS', help='Fail if translation takes longer than '
+                        'SECONDS.')
+    parser.add_argument('--stats', action='store_true', help='Print the time taken by each stage of translation '
+                        'and counts of tokens, expressions, etc.')
+    parser.add_argument('--stats-allocations', action='store_true', help='Like --stats, but also trace the memory '
+                        'allocated by each stage (slower).')
+    parser.add_argument('--profile', type=str, metavar='STACKS_FILE', help='Run the translation under cProfile and '
+                        'write the results to STACKS_FILE as collapsed stacks (e.g. for flamegraph.pl).')
     args = parser.parse_args()
+    if args.profile_input is not None and not args.record_scene_profile:
+        parser.error('--profile-input needs --record-scene-profile')
 
     spl_file = args.spl_file
     java_class_name = args.java_class_name
@@ -58,10 +154,62 @@ def main():
         print('The Java class name must be a valid Java class name.')
         return
 
+    stats = None
+    if args.stats or args.stats_allocations:
+        stats = TranslationStats(track_allocations=args.stats_allocations)
+
+    limits = None
+    limit_names = ('max_input_size', 'max_tokens', 'max_expression_depth', 'max_sections', 'max_output_size',
+                   'deadline')
+    if args.untrusted or any(getattr(args, name) is not None for name in limit_names):
+        base = UNTRUSTED_LIMITS if args.untrusted else Limits()
+        limits = Limits(**{name: getattr(args, name) if getattr(args, name) is not None else getattr(base, name)
+                           for name in limit_names})
+        # the deadline covers recording a profile and translating together
+        limits = limits.start()
+
+    scene_profile = None
     try:
-        translate_file(spl_file, java_class_name)
+        if args.record_scene_profile:
+            if not record_profile_file(spl_file, args.record_scene_profile, args.profile_input, limits):
+                return
+            args.scene_profile = args.record_scene_profile
+        if args.scene_profile:
+            scene_profile = load_profile(args.scene_profile)
+    except FileNotFoundError as e:
+        print('File does not exist:', e.filename)
+        return
+    except ValueError as e:
+        print('Bad scene profile:', e)
+        return
+
+    profile = cProfile.Profile() if args.profile else None
+    executor = ProcessPoolExecutor(args.jobs) if args.jobs > 1 else None
+
+    try:
+        if profile is not None:
+            profile.enable()
+        try:
+            translate_file(spl_file, java_class_name, stats=stats, target=args.target, executor=executor,
+                           structured=args.structured, precompute=args.precompute, cse=args.cse,
+                           max_method_size=args.max_method_size or None, profile=scene_profile, limits=limits,
+                           reentrant=args.reentrant, bench=args.bench, character_arrays=args.character_arrays,
+                           promote_stacks=args.promote_stacks)
+        finally:
+            if profile is not None:
+                profile.disable()
+            if executor is not None:
+                executor.shutdown()
     except FileNotFoundError:
         print('SPL file does not exist.')
+        return
+
+    if stats is not None:
+        print()
+        print(stats.report())
+    if profile is not None:
+        write_collapsed_stacks(profile, args.profile)
+        print('Profile written to', args.profile)
 
 
 if __name__ == '__main__':
@@ -3,3 +3,57 @@
 class SplError(Exception):
     """Custom exception for SPL compiler errors. Pass a list of errors."""
     pass
+
+
+class SplErrors(SplError):
+    """
+    All of the errors found in a play at once (see translator.parse_play()'s diagnostics). errors is
+    the list of SplErrors, in order; each has a line and column (from 1) if where it is is known.
+    The message has a line for each.
+    """
+
+    def __init__(self, errors):
+        super().__init__('\n'.join(map(describe, errors)))
+        self.errors = errors
+
+
+def describe(error):
+    """:returns: the message of an SplError, after its line and column if it has them."""
+    if getattr(error, 'line', None) is None:
+        return error.args[0]
+    return 'Line %d, column %d: %s' % (error.line, error.column, error.args[0])
+
+
+class LimitError(SplError):
+    """A play went over one of the Limits on translating it (see limits.py)."""
+    pass
+
+
+class InputTooLargeError(LimitError):
+    """The SPL source is too long."""
+    pass
+
+
+class TooManyTokensError(LimitError):
+    """The SPL source has too many tokens."""
+    pass
+
+
+class ExpressionTooDeepError(LimitError):
+    """An expression is nested too deeply."""
+    pass
+
+
+class TooManySectionsError(LimitError):
+    """The play has too many acts and scenes."""
+    pass
+
+
+class OutputTooLargeError(LimitError):
+    """The generated code is too long."""
+    pass
+
+
+class DeadlineExceededError(LimitError):
+    """Translation took too long."""
+    pass
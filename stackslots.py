@@ -0,0 +1,150 @@
+"""
+Stack promotion: a character whose stack always has the same number of things on it at each
+remember and recall, however the play got there, has its stack replaced by a field per place
+in it (Romeo_stk0 at the bottom, Romeo_stk1, etc.), and each remember and recall becomes an
+assignment to or from the field for the top of the stack. The generated code then allocates
+no stack and boxes no Integers for that character.
+
+The depths are worked out along the jumps between acts and scenes. A character keeps its
+real stack if a remember or recall could be reached with different depths (e.g. in a loop
+which remembers more each time round, or after one guarded by a question), if a recall could
+be of an empty stack (which has to fail as it would have), if its stack could get deeper than
+MAX_STACK_SLOTS, or if a remember or recall of it can't be reached at all.
+"""
+
+from play import *
+
+
+MAX_STACK_SLOTS = 16 # the most fields to replace a character's stack with
+
+UNKNOWN = None # the depth at a point which can be reached with different depths
+
+
+def slot_name(character, depth):
+    """:returns: the name of the field for the place depth from the bottom of a character's stack, e.g. Romeo_stk0."""
+    return '%s_stk%d' % (character, depth)
+
+
+def stack_depths(play, max_depth=MAX_STACK_SLOTS):
+    """
+    Work out the depth of the stacks of the characters that use them at each remember and recall.
+    :param play: The Play.
+    :param max_depth: The deepest a stack can get and still be replaced by fields.
+    :returns: A dict mapping each character whose stack can be replaced to a dict mapping the
+        (method name, statement index) of each remember and recall of it to its depth before.
+    """
+
+    characters = stack_characters(play)
+    methods = play.method_dict()
+    rejected = {character for character in characters if len(play.initial_stacks.get(character, ())) > max_depth}
+    sites = {character: {} for character in characters}
+
+    entries = {play.entry: {character: len(play.initial_stacks.get(character, ())) for character in characters}}
+    to_visit = [play.entry]
+    while to_visit:
+        name = to_visit.pop()
+        depths = dict(entries[name])
+
+        for index, statement in enumerate(methods[name].statements):
+            inner, conditions = unguarded(statement)
+            if inner[0] in GOTO_STMTS:
+                # merge the depths here into those at the start of where it goes
+                target = inner[1]
+                if target not in entries:
+                    entries[target] = dict(depths)
+                    to_visit.append(target)
+                else:
+                    target_depths = entries[target]
+                    changed = False
+                    for character, depth in depths.items():
+                        if target_depths[character] != depth and target_depths[character] is not UNKNOWN:
+                            target_depths[character] = UNKNOWN
+                            changed = True
+                    if changed and target not in to_visit:
+                        to_visit.append(target)
+                if not conditions:
+                    break
+
+            elif inner[0] == STMT_PUSH or inner[0] == STMT_POP:
+                character = inner[1]
+                depth = depths[character]
+                if character in rejected:
+                    continue
+                if depth is UNKNOWN or (inner[0] == STMT_POP and depth == 0):
+                    rejected.add(character)
+                    continue
+                sites[character][name, index] = depth
+                new_depth = depth + 1 if inner[0] == STMT_PUSH else depth - 1
+                if new_depth > max_depth:
+                    rejected.add(character)
+                # a question may or may not have let it happen
+                depths[character] = UNKNOWN if conditions else new_depth
+
+    # a remember or recall that can't be reached was never given a depth
+    counts = {character: 0 for character in characters}
+    for method in play.methods:
+        for statement in method.statements:
+            inner, _ = unguarded(statement)
+            if inner[0] == STMT_PUSH or inner[0] == STMT_POP:
+                counts[inner[1]] += 1
+    return {character: sites[character] for character in characters
+            if character not in rejected and len(sites[character]) == counts[character]}
+
+
+def promote_statement(statement, depth):
+    """:returns: a remember or recall (possibly guarded) at a depth as an assignment to or from a stack slot."""
+    if statement[0] == STMT_IF:
+        return STMT_IF, statement[1], promote_statement(statement[2], depth)
+    character = statement[1]
+    if statement[0] == STMT_PUSH:
+        return STMT_ASSIGN, slot_name(character, depth), (EXPR_CHARACTER, character)
+    return STMT_ASSIGN, character, (EXPR_CHARACTER, slot_name(character, depth - 1))
+
+
+def promote_stacks(play, stats=None, max_depth=MAX_STACK_SLOTS):
+    """
+    Replace the stacks of the characters whose depth is always known with fields.
+    :param play: The Play.
+    :param stats: An optional TranslationStats to list the characters whose stacks were replaced in.
+    :param max_depth: The most fields to replace a stack with.
+    :returns: A new Play, with the fields as characters after their owners.
+    """
+
+    promoted = stack_depths(play, max_depth)
+    if not promoted:
+        return play
+
+    sites = {}
+    for depths in promoted.values():
+        sites.update(depths)
+    # as many slots as it's deep after a remember, or to start with
+    slots = {character: len(play.initial_stacks.get(character, ())) for character in promoted}
+
+    methods = []
+    for method in play.methods:
+        statements = list(method.statements)
+        for index, statement in enumerate(statements):
+            depth = sites.get((method.name, index))
+            if depth is not None:
+                inner, _ = unguarded(statement)
+                if inner[0] == STMT_PUSH:
+                    slots[inner[1]] = max(slots[inner[1]], depth + 1)
+                statements[index] = promote_statement(statement, depth)
+        methods.append(Method(method.name, statements))
+
+    characters = []
+    for character in play.characters:
+        characters.append(character)
+        characters += [slot_name(character, depth) for depth in range(slots.get(character, 0))]
+
+    initial_values = dict(play.initial_values)
+    initial_stacks = {}
+    for character, stack in play.initial_stacks.items():
+        if character in promoted:
+            initial_values.update((slot_name(character, depth), value) for depth, value in enumerate(stack) if value)
+        else:
+            initial_stacks[character] = stack
+
+    if stats is not None:
+        stats.promoted_stacks += [character for character in play.characters if character in promoted]
+    return Play(characters, methods, initial_values, initial_stacks)
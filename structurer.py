@@ -0,0 +1,316 @@
+"""
+Recovers structured control flow from the jumps between acts and scenes, so a play can be
+generated as one method with real loops instead of a method per scene calling the next.
+
+The reachable methods are kept in program order. Every backward jump to a method makes it
+the header of a loop ("continue" goes back to it), and every forward jump (other than simply
+carrying on into the next method) ends a labeled block just before its target ("break" goes
+to it). Loops and blocks are widened until they nest properly, the way a stackifier does.
+
+Where they can't be (a jump into the middle of a loop from outside it, i.e. irreducible control
+flow), only the methods of that loop are put in a dispatch loop: a loop around a switch with a
+case for each, and a scene variable saying which case to go to. Jumps between its methods set
+the variable and go round again, a jump into it from outside sets the variable and goes to its
+first method, and a jump out of it sets the variable back to 0 first, so it starts at the first
+case whenever control gets to it in the ordinary way. The rest of the play is structured as
+usual around it. structure_play() only gives up (and the caller should fall back to a dispatch
+loop for the whole play) if the result would have unreachable code in it.
+"""
+
+from play import *
+
+
+LOOP = 'loop'
+BLOCK = 'block'
+DISPATCH = 'dispatch'
+
+LABEL_PREFIXES = {LOOP: 'loop_', BLOCK: 'to_', DISPATCH: 'dispatch_'}
+
+
+class Construct:
+    """A loop, labeled block or dispatch loop around the methods at positions start to end inclusive."""
+
+    def __init__(self, kind, target, start, end):
+        """
+        :param kind: LOOP, BLOCK or DISPATCH.
+        :param target: The name of the method a continue (LOOP) or break (BLOCK) goes to, or the
+            first method (DISPATCH).
+        :param start: The position of the first method inside the construct.
+        :param end: The position of the last method inside the construct.
+        """
+        self.kind = kind
+        self.target = target
+        self.start = start
+        self.end = end
+        self.children = [] # Methods and Constructs, in order; just Methods, for a DISPATCH
+
+    @property
+    def label(self):
+        return LABEL_PREFIXES[self.kind] + self.target
+
+    @property
+    def variable(self):
+        """The name of the variable holding the case a DISPATCH goes to next."""
+        return 'scene_' + self.target
+
+    def __repr__(self):
+        return 'Construct({!r}, {!r}, {!r}, {!r})'.format(self.kind, self.target, self.start, self.end)
+
+
+class Structure:
+    """The structured form of a play: its reachable methods nested inside loops, blocks and dispatch loops."""
+
+    def __init__(self, methods, items, dispatches=()):
+        """
+        :param methods: The reachable methods, in program order.
+        :param items: The top-level Methods and Constructs, in order.
+        :param dispatches: The DISPATCH Constructs among them, whose variables have to be declared first.
+        """
+        self.methods = methods
+        self.items = items
+        self.dispatches = list(dispatches)
+        self.positions = {method.name: i for i, method in enumerate(methods)}
+        self.dispatch_of = {} # position -> the DISPATCH the method there is in
+        for dispatch in self.dispatches:
+            for position in range(dispatch.start, dispatch.end + 1):
+                self.dispatch_of[position] = dispatch
+
+    def transfer(self, position, target, enclosing, final):
+        """
+        Work out how to go from the method at a position to the method target.
+        :param position: The position of the method doing the jumping.
+        :param target: The name of the method to go to.
+        :param enclosing: The Constructs around the method, outermost first.
+        :param final: True if this is the unguarded last statement of the method.
+        :returns: ('continue', label, settings) or ('break', label, settings), where settings is a
+            list of (DISPATCH Construct, case) to set the variables of first; or None if control
+            just falls through.
+        """
+
+        target_position = self.positions[target]
+        settings = []
+        dispatch = self.dispatch_of.get(position)
+        if dispatch is not None:
+            if dispatch.start <= target_position <= dispatch.end:
+                if final and target_position == position + 1:
+                    return None # falling through to the next case gets there
+                return 'continue', dispatch.label, [(dispatch, target_position - dispatch.start)]
+            settings.append((dispatch, 0)) # leaving it
+        entered = self.dispatch_of.get(target_position)
+        if entered is not None and target_position != entered.start:
+            # go to the start of the dispatch loop, which carries on with the right case
+            settings.append((entered, target_position - entered.start))
+            target_position = entered.start
+
+        if target_position <= position:
+            for construct in enclosing:
+                if construct.kind == LOOP and construct.start == target_position:
+                    return 'continue', construct.label, settings
+            raise ValueError('No loop around ' + target) # can't happen for a valid Structure
+
+        # break out of the outermost construct ending just before the target, which leaves us there
+        ending = [construct for construct in enclosing if construct.end == target_position - 1]
+        if final and target_position == position + 1 and not settings and not any(c.kind == LOOP for c in ending):
+            return None # falling off the end of the method (and any blocks) gets there
+        if not ending:
+            raise ValueError('No block before ' + target) # can't happen for a valid Structure
+        return 'break', ending[0].label, settings
+
+
+def _edges(methods, positions):
+    """Yield (position, target position, final) for every jump, where final is as in Structure.transfer."""
+    for i, method in enumerate(methods):
+        for k, statement in enumerate(method.statements):
+            for target in statement_targets(statement):
+                yield i, positions[target], k == len(method.statements) - 1 and statement[0] in GOTO_STMTS
+
+
+def _spans(edges, regions):
+    """
+    Work out the loops and blocks needed for the jumps between methods, with the methods of each
+    dispatch loop treated as one: jumps between them don't need any, and jumps into one go to its start.
+    :param edges: The (position, target position, final) of every jump, as from _edges().
+    :param regions: A dict mapping the first position of each dispatch loop to its last.
+    :returns: (loops, blocks), as for _nest().
+    """
+
+    region_of = {}
+    for start, end in regions.items():
+        for position in range(start, end + 1):
+            region_of[position] = start, end
+
+    loops = {} # header position -> position of the last method in the loop
+    blocks = {} # target position -> position of the first method in the block
+    for position, target_position, final in edges:
+        first, last = region_of.get(position, (position, position))
+        target_region = region_of.get(target_position)
+        if target_region is not None:
+            if first <= target_position <= last:
+                continue # from one case of a dispatch loop to another
+            if target_position != target_region[0]:
+                final = False # it has to set the case, so it isn't a fall through
+                target_position = target_region[0]
+
+        if target_position <= last:
+            loops[target_position] = max(loops.get(target_position, last), last)
+        elif target_position == last + 1 and position in region_of:
+            continue # breaking out of the dispatch loop gets there
+        elif not (final and target_position == position + 1):
+            blocks[target_position] = min(blocks.get(target_position, first), first)
+    return loops, blocks
+
+
+def _nest(loops, blocks):
+    """
+    Widen loops (by moving their ends later) and blocks (by moving their starts earlier) until
+    no two of them overlap without one containing the other.
+    :param loops: A dict mapping header positions to end positions. Modified in place.
+    :param blocks: A dict mapping target positions to start positions. Modified in place.
+    :returns: None, or the (header, end) of a loop which a block ends in the middle of, starting
+        outside it.
+    """
+
+    changed = True
+    while changed:
+        changed = False
+
+        for header1, end1 in loops.items():
+            for header2, end2 in loops.items():
+                if header1 < header2 <= end1 < end2:
+                    # two overlapping loops: the first one has to contain the second
+                    loops[header1] = end1 = end2
+                    changed = True
+
+        for target, start in blocks.items():
+            for header, end in loops.items():
+                if start < header <= target - 1 < end:
+                    return header, end # jumping into the middle of a loop
+                if header < start <= end < target - 1:
+                    # starts inside a loop and ends after it: has to contain the whole loop
+                    blocks[target] = start = header
+                    changed = True
+
+        for target1, start1 in blocks.items():
+            for target2, start2 in blocks.items():
+                if start1 < start2 <= target1 - 1 < target2 - 1:
+                    blocks[target2] = start1
+                    changed = True
+
+    return None
+
+
+def _can_complete(items, structure, enclosing, broken):
+    """
+    Check the structure the way javac checks for unreachable statements.
+    :param items: A list of Methods and Constructs in sequence.
+    :param structure: The Structure.
+    :param enclosing: The Constructs around the items, outermost first.
+    :param broken: A set of labels of constructs which something breaks out of.
+    :returns: True if the sequence can complete normally, False if it can't, or None if there
+        is an unreachable item in it.
+    """
+
+    completes = True
+    for item in items:
+        if not completes:
+            return None # the previous item never completes, so this one is unreachable
+
+        if isinstance(item, Method):
+            position = structure.positions[item.name]
+            if falls_off_end(item):
+                completes = False # it ends the play with a return
+            else:
+                last = item.statements[-1]
+                completes = structure.transfer(position, last[1], enclosing, True) is None
+        elif item.kind == DISPATCH:
+            # every case of a switch can be reached, and the loop around it only ends with a break
+            completes = item.label in broken
+        else:
+            inner = _can_complete(item.children, structure, enclosing + [item], broken)
+            if inner is None:
+                return None
+            completes = item.label in broken or (item.kind == BLOCK and inner)
+    return completes
+
+
+def structure_play(play, limits=None):
+    """
+    Structure the control flow of a play.
+    :param play: The parsed Play.
+    :param limits: Optional Limits whose deadline to check each time a dispatch loop is widened (see limits.py).
+    :returns: A Structure, or None if it would have unreachable code in it.
+    :raises DeadlineExceededError: if the deadline is up before it's done.
+    """
+
+    methods = reachable_methods(play)
+    positions = {method.name: i for i, method in enumerate(methods)}
+    edges = list(_edges(methods, positions))
+
+    # put each loop jumped into the middle of in a dispatch loop, along with any it overlaps, until they nest
+    regions = {} # first position -> last position of each dispatch loop
+    while True:
+        if limits is not None:
+            limits.check_deadline()
+        loops, blocks = _spans(edges, regions)
+        knot = _nest(loops, blocks)
+        if knot is None:
+            break
+        start, end = knot
+        if any(other_start <= start and end <= other_end for other_start, other_end in regions.items()):
+            return None # can't happen: what's in a dispatch loop doesn't need any loops
+        merged = True
+        while merged:
+            merged = False
+            for other_start, other_end in list(regions.items()):
+                if other_start <= end and start <= other_end:
+                    del regions[other_start]
+                    start, end = min(start, other_start), max(end, other_end)
+                    merged = True
+        regions[start] = end
+
+    dispatches = [Construct(DISPATCH, methods[start].name, start, end) for start, end in regions.items()]
+    constructs = [Construct(LOOP, methods[header].name, header, end) for header, end in loops.items()]
+    constructs += [Construct(BLOCK, methods[target].name, start, target - 1) for target, start in blocks.items()]
+    constructs += dispatches
+    # outer constructs first; a block goes outside a loop or dispatch loop with the same span
+    constructs.sort(key=lambda c: (c.start, -c.end, c.kind != BLOCK))
+
+    # build the tree of constructs and methods
+    items = []
+    stack = []
+    construct_index = 0
+    for position, method in enumerate(methods):
+        while stack and stack[-1].end < position:
+            stack.pop()
+        while construct_index < len(constructs) and constructs[construct_index].start == position:
+            construct = constructs[construct_index]
+            if stack and (construct.end > stack[-1].end or stack[-1].kind == DISPATCH):
+                return None # they still overlap, or it's between the cases of a switch
+            (stack[-1].children if stack else items).append(construct)
+            stack.append(construct)
+            construct_index += 1
+        (stack[-1].children if stack else items).append(method)
+
+    structure = Structure(methods, items, dispatches)
+
+    # find out which constructs get broken out of, then make sure javac won't complain
+    broken = set()
+
+    def find_breaks(items, enclosing):
+        for item in items:
+            if isinstance(item, Method):
+                position = structure.positions[item.name]
+                for k, statement in enumerate(item.statements):
+                    final = k == len(item.statements) - 1 and statement[0] in GOTO_STMTS
+                    for target in statement_targets(statement):
+                        transfer = structure.transfer(position, target, enclosing, final)
+                        if transfer is not None and transfer[0] == 'break':
+                            broken.add(transfer[1])
+            else:
+                find_breaks(item.children, enclosing + [item])
+
+    find_breaks(items, [])
+    if _can_complete(items, structure, [], broken) is None:
+        return None
+
+    return structure
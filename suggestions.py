@@ -0,0 +1,154 @@
+"""
+"Did you mean" suggestions for words which aren't in the word lists. symbolize() silently ignores
+them, so a misspelt adjective or character only shows up as a confusing error further on.
+
+Suggestions come from an index of every word in a Vocabulary, built the first time it's needed:
+each word is filed under every string made by deleting up to MAX_DISTANCE of its letters. Two
+words are within that edit distance only if they share one of those strings, so looking up a word
+means looking up its own deletions and checking the few words filed under them, which takes well
+under a millisecond however big the vocabulary is.
+"""
+
+import weakref
+
+from symbolizer import *
+
+
+MAX_DISTANCE = 2 # the most letters inserted, deleted or changed to get from an unknown word to a suggestion
+MAX_SUGGESTIONS = 3 # for each unknown word
+
+MIN_WORD_LENGTH = 4 # shorter words aren't suggested for, since they're mostly "the", "of", etc.
+
+# longer words in ordinary English which are one or two letters from words in the word lists
+FILLER_WORDS = frozenset(('than', 'then', 'that', 'this', 'there', 'these', 'those', 'with', 'what', 'when',
+                          'where', 'which', 'very', 'from', 'into', 'upon', 'have', 'were'))
+
+# what each kind of word is called in suggestions
+SYMBOL_KINDS = {
+    SYM_ADJECTIVE: 'adjective',
+    SYM_POSITIVE_NOUN: 'noun',
+    SYM_NEGATIVE_NOUN: 'noun',
+    SYM_CHARACTER: 'character',
+}
+
+
+def deletions(word, distance):
+    """:returns: the set of strings made by deleting up to distance letters from word, including word."""
+    strings = {word}
+    for _ in range(distance):
+        strings |= {string[:i] + string[i+1:] for string in strings for i in range(len(string))}
+    return strings
+
+
+def edit_distance(word1, word2, max_distance):
+    """:returns: the Levenshtein distance between the words, or max_distance + 1 if it's more than max_distance."""
+
+    if abs(len(word1) - len(word2)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(word2) + 1))
+    for i, char1 in enumerate(word1, 1):
+        current = [i]
+        for j, char2 in enumerate(word2, 1):
+            current.append(min(previous[j] + 1, current[j-1] + 1, previous[j-1] + (char1 != char2)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def allowed_distance(word):
+    """:returns: the most edits to suggest a word for word: short words have too many neighbours."""
+    return 1 if len(word) <= 5 else MAX_DISTANCE
+
+
+class SuggestionIndex:
+    """An index of the words and phrases of a Vocabulary, for suggesting ones near an unknown word."""
+
+    def __init__(self, vocabulary):
+        """:param vocabulary: The Vocabulary."""
+
+        # each word, and what to suggest for it: the word, or the phrase it's in, and what kind of word it is
+        self.entries = {}
+        for word, symbol in vocabulary.words.items():
+            if word.isalpha():
+                # characters are suggested by their names, e.g. "Romeo"
+                display = symbol[1] if symbol[0] == SYM_CHARACTER else word
+                self.entries[word] = display, SYMBOL_KINDS.get(symbol[0])
+        for phrase, symbol in vocabulary.phrases.items():
+            for word in phrase:
+                if word.isalpha() and word not in self.entries:
+                    self.entries[word] = ' '.join(phrase), SYMBOL_KINDS.get(symbol[0], 'phrase')
+
+        self.index = {} # deletion -> words
+        for word in self.entries:
+            for deletion in deletions(word, MAX_DISTANCE):
+                self.index.setdefault(deletion, []).append(word)
+
+    def is_known(self, word):
+        """:returns: True if word (lowercase) is in the vocabulary, on its own or in a phrase."""
+        return word in self.entries
+
+    def suggest(self, word, max_suggestions=MAX_SUGGESTIONS):
+        """
+        :param word: An unknown word, in lowercase.
+        :param max_suggestions: The most suggestions to return.
+        :returns: A list of (suggestion, kind or None) for the nearest words to word, nearest first.
+        """
+
+        distance = allowed_distance(word)
+        candidates = set()
+        for deletion in deletions(word, distance):
+            candidates.update(self.index.get(deletion, ()))
+
+        ranked = []
+        for candidate in candidates:
+            candidate_distance = edit_distance(word, candidate, distance)
+            if candidate_distance <= distance:
+                ranked.append((candidate_distance, candidate))
+
+        suggestions = []
+        for _, candidate in sorted(ranked):
+            if self.entries[candidate] not in suggestions:
+                suggestions.append(self.entries[candidate])
+        return suggestions[:max_suggestions]
+
+
+# the SuggestionIndex of each Vocabulary used so far, dropped along with the Vocabulary
+SUGGESTION_INDEXES = weakref.WeakKeyDictionary()
+
+
+def suggestion_index(vocabulary):
+    """:returns: the SuggestionIndex of the vocabulary, built the first time it's asked for."""
+    index = SUGGESTION_INDEXES.get(vocabulary)
+    if index is None:
+        index = SUGGESTION_INDEXES[vocabulary] = SuggestionIndex(vocabulary)
+    return index
+
+
+def suggest_words(source, symbols, symidx, vocabulary):
+    """
+    Suggest words for the unknown words in the statement starting at symidx, e.g. one with an error.
+    :param source: The diagnostics.SourceMap of the SPL code, for the words that were ignored.
+    :param symbols: Its symbols, without any SYM_IGNOREs.
+    :param symidx: The index of the first symbol of the statement.
+    :param vocabulary: The Vocabulary the code was symbolized with.
+    :returns: A line of suggestions for each unknown word which has any, like
+        'Unknown word "bigg": did you mean "big" (adjective)?', joined by newlines; or '' if none.
+    """
+
+    # the statement ends with its punctuation
+    end = symidx
+    while end < len(symbols) - 1 and symbols[end][0] not in (SYM_END_PUNCTUATION, SYM_QUESTION_MARK):
+        end += 1
+
+    index = suggestion_index(vocabulary)
+    lines = []
+    for word in source.ignored_words(symidx, end):
+        lowercase = word.lower()
+        if len(word) < MIN_WORD_LENGTH or lowercase in FILLER_WORDS or index.is_known(lowercase):
+            continue
+        suggestions = index.suggest(lowercase)
+        if suggestions:
+            lines.append('Unknown word "%s": did you mean %s?' % (word, ', '.join(
+                '"%s" (%s)' % (suggestion, kind) if kind else '"%s"' % suggestion for suggestion, kind in suggestions)))
+    return '\n'.join(lines)
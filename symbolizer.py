@@ -2,10 +2,9 @@
 Transforms SPL code into symbols.
 """
 
-DEBUG = False # if True, print debug messages
-
-
+import os
 import re
+from types import MappingProxyType, SimpleNamespace
 from splerror import SplError
 
 
@@ -59,104 +58,196 @@ SYM_2ND_PERSON_PRONOUN = 44 # i.e. thou, thyself, you, yourself, etc.
 
 # lists of tokens that constitute certain symbols
 
-def read_nouns(filename):
+WORDLISTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wordlists')
+
+def read_nouns(filename, directory=WORDLISTS_DIR):
     # if a noun starts with '*' we don't add 's' on the end, else we do
-    with open('wordlists/' + filename, 'r') as nouns_file:
+    with open(os.path.join(directory, filename), 'r') as nouns_file:
         nouns = map(str.strip, nouns_file.readlines())
         return tuple(list(map(lambda noun: noun[1:] if noun.startswith('*') else noun, nouns))
                      + [noun + 's' for noun in nouns if not noun.startswith('*')])
 
-POSITIVE_NOUNS = read_nouns('positive-nouns.txt')
-NEGATIVE_NOUNS = read_nouns('negative-nouns.txt')
-
-def read_list_file(filename):
-    with open('wordlists/' + filename, 'r') as file_:
+def read_list_file(filename, directory=WORDLISTS_DIR):
+    with open(os.path.join(directory, filename), 'r') as file_:
         return tuple(map(str.strip, file_.readlines()))
 
-ADJECTIVES = read_list_file('adjectives.txt')
-FIRST_PERSON_PRONOUNS = read_list_file('first-person-pronouns.txt')
-SECOND_PERSON_PRONOUNS = read_list_file('second-person-pronouns.txt')
-
-ASSIGNMENTS = read_list_file('equal.txt')
-
-GREATER = read_list_file('greater.txt')
-LESSER = read_list_file('lesser.txt')
-
-ZERO = read_list_file('zero.txt')
-
-# this gigantic dict maps a list of tokens to symbols they should be translated to
-TOKENS_TO_SYMBOLS = {
-    ('.', '!'): (SYM_END_PUNCTUATION,),
-    (',',): (SYM_COMMA,),
-    ('?',): (SYM_QUESTION_MARK,),
-    (':',): (SYM_COLON,),
-    ('[',): (SYM_OPEN_STAGE_DIRECTION,),
-    (']',): (SYM_CLOSE_STAGE_DIRECTION,),
-    ('enter',): (SYM_STAGE_DIRECTION_ENTER,),
-    ('exit',): (SYM_STAGE_DIRECTION_EXIT,),
-    ('exeunt',): (SYM_STAGE_DIRECTION_EXEUNT,),
-    ('and',): (SYM_AND,),
-    ('act',): (SYM_ACT,),
-    ('scene',): (SYM_SCENE,),
-    ASSIGNMENTS: (SYM_ASSIGNMENT,),
-    ('as',): (SYM_AS,),
-    ('sum',): (SYM_SUM,),
-    ('difference',): (SYM_DIFFERENCE,),
-    ('product',): (SYM_PRODUCT,),
-    ('quotient',): (SYM_QUOTIENT,),
-    ('remainder',): (SYM_REMAINDER,),
-    ('twice',): (SYM_TWICE,),
-    ('thrice',): (SYM_THRICE,),
-    ('half',): (SYM_HALF,),
-    ('square',): (SYM_SQUARE,),
-    ('cube',): (SYM_CUBE,),
-    ZERO: (SYM_ZERO,),
-    POSITIVE_NOUNS: (SYM_POSITIVE_NOUN,),
-    NEGATIVE_NOUNS: (SYM_NEGATIVE_NOUN,),
-    ADJECTIVES: (SYM_ADJECTIVE,),
-    GREATER: (SYM_GREATER_THAN,),
-    LESSER: (SYM_LESS_THAN,),
-    ('remember',): (SYM_PUSH_TO_STACK,),
-    ('recall',): (SYM_POP_FROM_STACK,),
-    FIRST_PERSON_PRONOUNS: (SYM_1ST_PERSON_PRONOUN,),
-    SECOND_PERSON_PRONOUNS: (SYM_2ND_PERSON_PRONOUN,),
-}
-
-# tokens that must be in order to constitute a symbol
-MULTI_TOKENS_TO_SYMBOLS = {
-    ('if', 'so'): (SYM_IF_SO,),
-    ('if', 'not'): (SYM_IF_NOT,),
-    ('listen', 'to', 'your', 'heart'): (SYM_INPUT_NUMBER,),
-    ('listen', 'to', 'thy', 'heart'): (SYM_INPUT_NUMBER,),
-    ('open', 'your', 'mind'): (SYM_INPUT_CHARACTER,),
-    ('open', 'thy', 'mind'): (SYM_INPUT_CHARACTER,),
-    ('open', 'your', 'heart'): (SYM_OUTPUT_NUMBER,),
-    ('open', 'thy', 'heart'): (SYM_OUTPUT_NUMBER,),
-    ('speak', 'your', 'mind'): (SYM_OUTPUT_CHARACTER,),
-    ('speak', 'thy', 'mind'): (SYM_OUTPUT_CHARACTER,),
-    ('let', 'us', 'return'): (SYM_JUMP,),
-    ('let', 'us', 'proceed'): (SYM_JUMP,),
-    ('we', 'must', 'return'): (SYM_JUMP,),
-    ('we', 'must', 'proceed'): (SYM_JUMP,),
-    ('we', 'shall', 'return'): (SYM_JUMP,),
-    ('we', 'shall', 'proceed'): (SYM_JUMP,),
-    ('square', 'root'): (SYM_SQUARE_ROOT,),
-    ('cube', 'root'): (SYM_CUBE_ROOT,),
-}
-
-with open('wordlists/characters.txt', 'r') as characters_file:
+# the names of the word lists, which are also their filenames without ".txt"
+NOUN_WORDLISTS = ('positive-nouns', 'negative-nouns')
+WORDLIST_NAMES = NOUN_WORDLISTS + ('adjectives', 'first-person-pronouns', 'second-person-pronouns', 'equal',
+                                   'greater', 'lesser', 'zero', 'characters')
+
+def read_wordlists(directory=WORDLISTS_DIR, extra_words=None):
+    """
+    Read all of the word lists from a directory.
+    :param directory: The directory containing the word list files.
+    :param extra_words: An optional dict mapping word list names (e.g. 'adjectives') to
+        iterables of extra words to add to that list.
+    :returns: A dict mapping each word list name to a tuple of its words.
+    :raises ValueError: if extra_words names a word list that doesn't exist.
+    """
+
+    extra_words = extra_words or {}
+    for name in extra_words:
+        if name not in WORDLIST_NAMES:
+            raise ValueError('Unknown word list: ' + name)
+
+    wordlists = {}
+    for name in WORDLIST_NAMES:
+        read = read_nouns if name in NOUN_WORDLISTS else read_list_file
+        wordlists[name] = read(name + '.txt', directory) + tuple(map(str.strip, extra_words.get(name, ())))
+    return wordlists
+
+def build_symbol_tables(wordlists):
+    """
+    Build the tables mapping tokens to symbols from the word lists.
+    :param wordlists: A dict from word list names to tuples of words, as from read_wordlists().
+    :returns: A dict mapping lists of tokens to the symbol any of them translates to, and a
+        dict mapping sequences of tokens to the symbol they translate to together.
+    """
+
+    # this gigantic dict maps a list of tokens to symbols they should be translated to
+    tokens_to_symbols = {
+        ('.', '!'): (SYM_END_PUNCTUATION,),
+        (',',): (SYM_COMMA,),
+        ('?',): (SYM_QUESTION_MARK,),
+        (':',): (SYM_COLON,),
+        ('[',): (SYM_OPEN_STAGE_DIRECTION,),
+        (']',): (SYM_CLOSE_STAGE_DIRECTION,),
+        ('enter',): (SYM_STAGE_DIRECTION_ENTER,),
+        ('exit',): (SYM_STAGE_DIRECTION_EXIT,),
+        ('exeunt',): (SYM_STAGE_DIRECTION_EXEUNT,),
+        ('and',): (SYM_AND,),
+        ('act',): (SYM_ACT,),
+        ('scene',): (SYM_SCENE,),
+        wordlists['equal']: (SYM_ASSIGNMENT,),
+        ('as',): (SYM_AS,),
+        ('sum',): (SYM_SUM,),
+        ('difference',): (SYM_DIFFERENCE,),
+        ('product',): (SYM_PRODUCT,),
+        ('quotient',): (SYM_QUOTIENT,),
+        ('remainder',): (SYM_REMAINDER,),
+        ('twice',): (SYM_TWICE,),
+        ('thrice',): (SYM_THRICE,),
+        ('half',): (SYM_HALF,),
+        ('square',): (SYM_SQUARE,),
+        ('cube',): (SYM_CUBE,),
+        wordlists['zero']: (SYM_ZERO,),
+        wordlists['positive-nouns']: (SYM_POSITIVE_NOUN,),
+        wordlists['negative-nouns']: (SYM_NEGATIVE_NOUN,),
+        wordlists['adjectives']: (SYM_ADJECTIVE,),
+        wordlists['greater']: (SYM_GREATER_THAN,),
+        wordlists['lesser']: (SYM_LESS_THAN,),
+        ('remember',): (SYM_PUSH_TO_STACK,),
+        ('recall',): (SYM_POP_FROM_STACK,),
+        wordlists['first-person-pronouns']: (SYM_1ST_PERSON_PRONOUN,),
+        wordlists['second-person-pronouns']: (SYM_2ND_PERSON_PRONOUN,),
+    }
+
+    # tokens that must be in order to constitute a symbol
+    multi_tokens_to_symbols = {
+        ('if', 'so'): (SYM_IF_SO,),
+        ('if', 'not'): (SYM_IF_NOT,),
+        ('listen', 'to', 'your', 'heart'): (SYM_INPUT_NUMBER,),
+        ('listen', 'to', 'thy', 'heart'): (SYM_INPUT_NUMBER,),
+        ('open', 'your', 'mind'): (SYM_INPUT_CHARACTER,),
+        ('open', 'thy', 'mind'): (SYM_INPUT_CHARACTER,),
+        ('open', 'your', 'heart'): (SYM_OUTPUT_NUMBER,),
+        ('open', 'thy', 'heart'): (SYM_OUTPUT_NUMBER,),
+        ('speak', 'your', 'mind'): (SYM_OUTPUT_CHARACTER,),
+        ('speak', 'thy', 'mind'): (SYM_OUTPUT_CHARACTER,),
+        ('let', 'us', 'return'): (SYM_JUMP,),
+        ('let', 'us', 'proceed'): (SYM_JUMP,),
+        ('we', 'must', 'return'): (SYM_JUMP,),
+        ('we', 'must', 'proceed'): (SYM_JUMP,),
+        ('we', 'shall', 'return'): (SYM_JUMP,),
+        ('we', 'shall', 'proceed'): (SYM_JUMP,),
+        ('square', 'root'): (SYM_SQUARE_ROOT,),
+        ('cube', 'root'): (SYM_CUBE_ROOT,),
+    }
+
     # characters go in either one depending on whether or not they have spaces
-    all_characters = map(str.strip, characters_file.readlines())
-    for character in all_characters:
+    for character in wordlists['characters']:
         if ' ' in character:
             nospaces = ''.join(character.split()) # remove all whitespace
-            MULTI_TOKENS_TO_SYMBOLS[tuple(character.lower().split())] = (SYM_CHARACTER, nospaces)
+            multi_tokens_to_symbols[tuple(character.lower().split())] = (SYM_CHARACTER, nospaces)
         else:
-            TOKENS_TO_SYMBOLS[(character.lower(),)] = (SYM_CHARACTER, character)
+            tokens_to_symbols[(character.lower(),)] = (SYM_CHARACTER, character)
+
+    return tokens_to_symbols, multi_tokens_to_symbols
+
+WORDLISTS = read_wordlists()
+
+POSITIVE_NOUNS = WORDLISTS['positive-nouns']
+NEGATIVE_NOUNS = WORDLISTS['negative-nouns']
+ADJECTIVES = WORDLISTS['adjectives']
+FIRST_PERSON_PRONOUNS = WORDLISTS['first-person-pronouns']
+SECOND_PERSON_PRONOUNS = WORDLISTS['second-person-pronouns']
+
+ASSIGNMENTS = WORDLISTS['equal']
+
+GREATER = WORDLISTS['greater']
+LESSER = WORDLISTS['lesser']
+
+ZERO = WORDLISTS['zero']
+
+TOKENS_TO_SYMBOLS, MULTI_TOKENS_TO_SYMBOLS = build_symbol_tables(WORDLISTS)
 
 MULTI_TOKENS = list(MULTI_TOKENS_TO_SYMBOLS.keys())
 
 
+class Vocabulary:
+    """
+    A compiled, read-only form of the symbol tables, used by symbolize(). Single tokens
+    are looked up in a dict, and multi-token symbols are indexed by their last token,
+    so symbolizing doesn't scan every word list for every token. A Vocabulary is never
+    modified after it is built, so one can be shared between threads.
+    """
+
+    __slots__ = ('words', 'phrases', 'phrases_by_last_token', 'max_phrase_length', '__weakref__')
+
+    def __init__(self, tokens_to_symbols, multi_tokens_to_symbols):
+        """
+        :param tokens_to_symbols: A dict like TOKENS_TO_SYMBOLS. If a token is in more than one
+            list of tokens, the first list wins, just like scanning the dict in order.
+        :param multi_tokens_to_symbols: A dict like MULTI_TOKENS_TO_SYMBOLS. Earlier entries
+            take priority over later ones ending with the same token.
+        """
+
+        words = {}
+        for token_list, symbol in tokens_to_symbols.items():
+            for token in token_list:
+                words.setdefault(token, symbol)
+
+        phrases_by_last_token = {}
+        for multi_token, symbol in multi_tokens_to_symbols.items():
+            phrases_by_last_token.setdefault(multi_token[-1], []).append((multi_token, symbol))
+
+        object.__setattr__(self, 'words', MappingProxyType(words))
+        object.__setattr__(self, 'phrases', MappingProxyType(dict(multi_tokens_to_symbols)))
+        object.__setattr__(self, 'phrases_by_last_token', MappingProxyType(
+            {token: tuple(phrases) for token, phrases in phrases_by_last_token.items()}))
+        object.__setattr__(self, 'max_phrase_length', max(map(len, multi_tokens_to_symbols), default=0))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Vocabulary objects are read-only.')
+
+    def __reduce__(self):
+        # for pickling, e.g. to send to a process pool
+        return Vocabulary, ({(word,): symbol for word, symbol in self.words.items()}, dict(self.phrases))
+
+    @classmethod
+    def from_wordlists(cls, directory=WORDLISTS_DIR, extra_words=None):
+        """
+        Build a Vocabulary from the word lists in a directory.
+        :param directory: The directory containing the word list files.
+        :param extra_words: An optional dict mapping word list names to extra words, as in read_wordlists().
+        :returns: The new Vocabulary.
+        """
+        return cls(*build_symbol_tables(read_wordlists(directory, extra_words)))
+
+DEFAULT_VOCABULARY = Vocabulary(TOKENS_TO_SYMBOLS, MULTI_TOKENS_TO_SYMBOLS)
+
+
 def tokenize(spl):
     """
     Tokenize the SPL source into a list of tokens. Tokens are contiguous letters
@@ -232,22 +323,40 @@ def translate_roman_numeral(token):
         raise ValueError('Not a valid Roman numeral')
 
 
-def symbolize(tokens):
+DEADLINE_CHECK_INTERVAL = 4096 # how many tokens symbolize() goes between checking the deadline
+
+
+def symbolize(tokens, stats=None, vocabulary=None, limits=None, keep_ignored=False, token_indices=None):
     """
     Transform a list of tokens into a list of symbols. Symbols are tuples in the
     form of (SYM_X, data, ...) in which SYM_X is a symbol identifier constant.
     :param tokens: The list of tokens to symbolize.
+    :param stats: An optional TranslationStats to record the number of multi-token matches in.
+    :param vocabulary: The Vocabulary to use; DEFAULT_VOCABULARY if None.
+    :param limits: Optional Limits whose deadline to check every DEADLINE_CHECK_INTERVAL tokens.
+    :param keep_ignored: If True, the SYM_IGNOREs are (SYM_IGNORE, token), e.g. for suggestions.py.
+    :param token_indices: An optional list to fill with the index of the first token of each symbol,
+        e.g. to find where in the source an error is (see diagnostics.py).
     :returns: The list of tokens transformed into a list of symbols.
     """
 
+    if vocabulary is None:
+        vocabulary = DEFAULT_VOCABULARY
+    words = vocabulary.words
+    phrases_by_last_token = vocabulary.phrases_by_last_token
+
     symbols = []
+    multi_token_matches = 0
+    last_sym = None # the last non-IGNORE symbol type, for interpreting "I"
 
     for i, token in enumerate(tokens):
+        if limits is not None and i % DEADLINE_CHECK_INTERVAL == 0:
+            limits.check_deadline()
         lowercase = token.lower() # for case-insensitive symbols
         foundit = False # for continuing the outer loop
         
         # multi-token symbols
-        for multi_token in MULTI_TOKENS:
+        for multi_token, symbol in phrases_by_last_token.get(lowercase, ()):
             if i < len(multi_token) - 1:
                 continue # not enough tokens to possibly be this multi token
 
@@ -260,60 +369,198 @@ def symbolize(tokens):
             if possible_multi_token == multi_token:
                 # we found it - remove the last n-1 symbols and add the new one
                 del symbols[-len(multi_token)+1:]
-                symbols.append(MULTI_TOKENS_TO_SYMBOLS[multi_token])
+                symbols.append(symbol)
+                if token_indices is not None:
+                    del token_indices[-len(multi_token)+1:]
+                    token_indices.append(i - len(multi_token) + 1)
+                last_sym = symbol[0]
                 foundit = True
-                if DEBUG:
-                    print('m', MULTI_TOKENS_TO_SYMBOLS[multi_token], multi_token)
+                multi_token_matches += 1
                 break
         if foundit:
             continue
 
-        # translate single-word tokens defined in TOKENS_TO_SYMBOLS to their respective symbols
-        for token_list, symbol in TOKENS_TO_SYMBOLS.items():
-            if lowercase in token_list:
-                if lowercase == 'i':
-                    # special case: "I" is ambiguous
-                    # figure out if it's the pronoun I or a Roman numeral
-                    # if the last non-IGNORE symbol is "act" or "scene" it's a Roman numeral, else the pronoun
-                    try:
-                        last_sym = next(sym for sym in reversed(symbols) if sym[0] != SYM_IGNORE)[0]
-                        if last_sym in (SYM_ACT, SYM_SCENE):
-                            # interpret as Roman numeral
-                            symbols.append((SYM_ROMAN_NUMERAL, 1))
-                            if DEBUG:
-                                print('r', token, 1, 'note: interpreted as Roman numeral')
-                        else:
-                            # interpret as pronoun
-                            symbols.append((SYM_1ST_PERSON_PRONOUN,))
-                            if DEBUG:
-                                print('s', (SYM_1ST_PERSON_PRONOUN,), token, FIRST_PERSON_PRONOUNS[0], 'note: interpreted as pronoun')
-                    except StopIteration:
-                        # there are only IGNOREs before it: it's at the beginning of the program, ignore it
-                        symbols.append((SYM_IGNORE,))
-                    
-                    foundit = True
-                    break
+        # translate single-word tokens defined in the word lists to their respective symbols
+        symbol = words.get(lowercase)
+        if symbol is not None:
+            if lowercase == 'i':
+                # special case: "I" is ambiguous
+                # figure out if it's the pronoun I or a Roman numeral
+                # if the last non-IGNORE symbol is "act" or "scene" it's a Roman numeral, else the pronoun
+                if last_sym is None:
+                    # there are only IGNOREs before it: it's at the beginning of the program, ignore it
+                    symbols.append((SYM_IGNORE, token) if keep_ignored else (SYM_IGNORE,))
+                    if token_indices is not None:
+                        token_indices.append(i)
+                    continue
+                elif last_sym in (SYM_ACT, SYM_SCENE):
+                    # interpret as Roman numeral
+                    symbol = (SYM_ROMAN_NUMERAL, 1)
+                else:
+                    # interpret as pronoun
+                    symbol = (SYM_1ST_PERSON_PRONOUN,)
 
-                symbols.append(symbol)
-                if DEBUG:
-                    print('s', symbol, token, token_list[0])
-                foundit = True
-                break
-        if foundit:
+            symbols.append(symbol)
+            last_sym = symbol[0]
+            if token_indices is not None:
+                token_indices.append(i)
             continue
 
         # translate Roman numerals
         try:
             num = translate_roman_numeral(token)
             symbols.append((SYM_ROMAN_NUMERAL, num))
-            if DEBUG:
-                print('r', token, num)
+            last_sym = SYM_ROMAN_NUMERAL
+            if token_indices is not None:
+                token_indices.append(i)
             continue
         except ValueError:
             # not a Roman numeral: carry on
             pass
 
         # it's not a recognized symbol
-        symbols.append((SYM_IGNORE,))
+        symbols.append((SYM_IGNORE, token) if keep_ignored else (SYM_IGNORE,))
+        if token_indices is not None:
+            token_indices.append(i)
+
+    if stats is not None:
+        stats.multi_token_matches += multi_token_matches
+
+    return symbols
+
+
+PARALLEL_CHUNK_SIZE = 1 << 20 # about how many characters of SPL each process symbolizes at once
+
+# tokens a chunk of SPL can start with, if the vocabulary allows it (see can_start_chunk())
+CHUNK_START_TOKENS = ('[', 'act', 'scene')
+
+
+def can_start_chunk(token, vocabulary):
+    """
+    :returns: True if token always translates to a symbol of its own (so an "I" after it is always
+        interpreted the same way) and is in no multi-token symbol except at its start (so no
+        multi-token symbol can match across it), i.e. the tokens before it don't matter.
+    """
+    if token == 'i' or vocabulary.words.get(token) is None:
+        return False
+    return not any(token in multi_token[1:] for multi_token in vocabulary.phrases)
+
 
+def split_source(spl, vocabulary=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    Split SPL source into chunks of at least chunk_size characters (except the last), each of which
+    tokenizes the same on its own as it does as part of the whole source. Every chunk after the first
+    starts with one of the CHUNK_START_TOKENS which can_start_chunk(), so it symbolizes the same too,
+    except for multi-token symbols which overlap each other (see symbolize_chunk()).
+    :param spl: The SPL source code.
+    :param vocabulary: The Vocabulary it will be symbolized with; DEFAULT_VOCABULARY if None.
+    :param chunk_size: The minimum size of a chunk.
+    :returns: A list of (chunk, token it starts with) pairs, where the token is None for the first
+        chunk. It's just [(spl, None)] if it can't be split.
+    """
+
+    if vocabulary is None:
+        vocabulary = DEFAULT_VOCABULARY
+    starts = [token for token in CHUNK_START_TOKENS if can_start_chunk(token, vocabulary)]
+    if len({vocabulary.words[token] for token in starts}) < 2:
+        return [(spl, None)] # symbolize_chunk() needs a different one to pad chunks with
+
+    # whole tokens only, and not case-insensitive matching, which would also match e.g. a long s for an s
+    pattern = re.compile('|'.join(
+        '(%s)' % (re.escape(token) if not token.isalpha() else
+                  r'(?<![\-\w])' + ''.join('[%s%s]' % (c.upper(), c) for c in token) + r'(?![\-\w])')
+        for token in starts))
+
+    chunks = []
+    chunk_start = 0
+    start_token = None
+    while True:
+        match = pattern.search(spl, chunk_start + chunk_size)
+        if match is None:
+            break
+        chunks.append((spl[chunk_start:match.start()], start_token))
+        chunk_start = match.start()
+        start_token = starts[match.lastindex - 1]
+    chunks.append((spl[chunk_start:], start_token))
+    return chunks
+
+
+def symbolize_chunk(spl, start_token, last, vocabulary):
+    """
+    Tokenize and symbolize a chunk of SPL from split_source(), e.g. in another process.
+    When one multi-token symbol matches in the middle of another, symbolize() removes more
+    symbols than the second one has tokens, which could reach back into the previous chunk.
+    The chunk is symbolized after some padding tokens to find out if that happens.
+    :param spl: The chunk.
+    :param start_token: The token it starts with, or None if it's the first chunk.
+    :param last: True if it's the last chunk.
+    :param vocabulary: The Vocabulary to use.
+    :returns: The number of tokens, the list of symbols without any SYM_IGNOREs, the number of
+        SYM_IGNOREs and the number of multi-token matches; or None if symbols before the chunk
+        would have been removed, so it has to be symbolized along with them.
+    """
+
+    tokens = tokenize(spl)
+
+    # a non-letter at either end of a chunk makes an empty token there, which the whole source doesn't have
+    if start_token is not None and tokens and tokens[0] == '':
+        del tokens[0]
+    if not last and tokens and tokens[-1] == '':
+        tokens.pop()
+
+    padding = []
+    if start_token is not None:
+        start_symbol = vocabulary.words[start_token]
+        pad_token = next(token for token in CHUNK_START_TOKENS
+                         if can_start_chunk(token, vocabulary) and vocabulary.words[token] != start_symbol)
+        padding = [pad_token] * max(vocabulary.max_phrase_length - 1, 1)
+
+    counters = SimpleNamespace(multi_token_matches=0)
+    all_symbols = symbolize(padding + tokens, counters, vocabulary)
+
+    if padding:
+        # the padding and the first token's symbol must be untouched
+        pad_symbol = vocabulary.words[padding[0]]
+        if all_symbols[:len(padding)] != [pad_symbol] * len(padding) or all_symbols[len(padding)] != start_symbol:
+            return None
+        del all_symbols[:len(padding)]
+
+    symbols = [symbol for symbol in all_symbols if symbol[0] != SYM_IGNORE]
+    return len(tokens), symbols, len(all_symbols) - len(symbols), counters.multi_token_matches
+
+
+def symbolize_parallel(spl, executor, stats=None, vocabulary=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    Tokenize and symbolize SPL source in chunks in parallel, giving the same symbols as
+    symbolize(tokenize(spl)) without the SYM_IGNOREs.
+    :param spl: The SPL source code.
+    :param executor: A concurrent.futures.Executor, e.g. a ProcessPoolExecutor.
+    :param stats: An optional TranslationStats to count tokens, ignored tokens and multi-token matches in.
+    :param vocabulary: The Vocabulary to use; DEFAULT_VOCABULARY if None.
+    :param chunk_size: The minimum size of a chunk; see split_source().
+    :returns: The list of symbols, without any SYM_IGNOREs.
+    """
+
+    if vocabulary is None:
+        vocabulary = DEFAULT_VOCABULARY
+    chunks = split_source(spl, vocabulary, chunk_size)
+    futures = [executor.submit(symbolize_chunk, chunk, start_token, i == len(chunks) - 1, vocabulary)
+               for i, (chunk, start_token) in enumerate(chunks)]
+    results = [future.result() for future in futures]
+
+    if None in results:
+        # rare: do it all in one go instead
+        tokens = tokenize(spl)
+        counters = SimpleNamespace(multi_token_matches=0)
+        all_symbols = symbolize(tokens, counters, vocabulary)
+        symbols = [symbol for symbol in all_symbols if symbol[0] != SYM_IGNORE]
+        results = [(len(tokens), symbols, len(all_symbols) - len(symbols), counters.multi_token_matches)]
+
+    symbols = []
+    for token_count, chunk_symbols, ignored_count, multi_token_matches in results:
+        symbols += chunk_symbols
+        if stats is not None:
+            stats.tokens += token_count
+            stats.ignored_tokens += ignored_count
+            stats.multi_token_matches += multi_token_matches
     return symbols
@@ -0,0 +1,83 @@
+# This file tests the C code generated by cemitter.py by compiling and running the examples.
+# The expected output is what the Java translations of the examples print.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from translator import translate
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples')
+CC = shutil.which(os.environ.get('CC', 'cc'))
+
+
+def compile_and_run(spl, stdin=b'', **options):
+    """Translate spl to C, compile it with the system C compiler and run it. :returns: its output."""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        c_filename = os.path.join(tmp, 'play.c')
+        exe_filename = os.path.join(tmp, 'play')
+        with open(c_filename, 'w') as c_file:
+            c_file.write(translate(spl, 'Play', target='c', **options))
+        subprocess.run([CC, '-std=c99', '-O2', '-o', exe_filename, c_filename, '-lm'], check=True)
+        return subprocess.run([exe_filename], input=stdin, stdout=subprocess.PIPE, check=True).stdout
+
+
+def read_example(name):
+    with open(os.path.join(EXAMPLES_DIR, name + '.spl'), 'r') as spl_file:
+        return spl_file.read()
+
+
+@unittest.skipIf(CC is None, 'no C compiler')
+class TestCEmitter(unittest.TestCase):
+
+    def test_hello_world(self):
+        self.assertEqual(compile_and_run(read_example('hello-world')), b'Hello World!\n')
+
+    def test_primes(self):
+        self.assertEqual(compile_and_run(read_example('primes'), b'30\n'),
+                         b'>' + b''.join(b'%d\n' % p for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29)))
+
+    def test_reverse(self):
+        self.assertEqual(compile_and_run(read_example('reverse'), b'hello\n'), b'olleh\n')
+
+    def test_test(self):
+        # the character echoed, then 6 (not 8: "horrid" isn't an adjective), then -1
+        self.assertEqual(compile_and_run(read_example('test'), b'x\n'), b'x6-1')
+        # at the end of the input, reading a character gives -1, printed as the char U+FFFF
+        self.assertEqual(compile_and_run(read_example('test')), '￿6-1'.encode())
+
+    def test_precompute(self):
+        for name, stdin in (('hello-world', b''), ('primes', b'30\n'), ('reverse', b'hello\n'), ('test', b'x\n')):
+            spl = read_example(name)
+            self.assertEqual(compile_and_run(spl, stdin, precompute=True), compile_and_run(spl, stdin))
+
+    def test_java_int_semantics(self):
+        spl = '''Overflow.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: Numbers.
+
+Scene I: Big ones.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Thou art the cube of the product of a big big big big big big big big cat and a big big big big big
+ big big big cat. Open your heart! Thou art the sum of thyself and a cat. Open your heart!
+ Thou art the quotient between thyself and nothing.
+
+[Exeunt]
+'''
+        with self.assertRaises(subprocess.CalledProcessError) as ctx:
+            compile_and_run(spl)
+        # (int) Math.pow saturates, then + 1 wraps around, then / 0 throws
+        self.assertEqual(ctx.exception.stdout, b'2147483647-2147483648')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# This file tests translating plays with large casts, and keeping the characters in arrays
+
+import unittest
+
+from codesize import *
+from play import *
+from symbolizer import SYM_END_PUNCTUATION
+from test_translator import read_example
+from translator import Translator, read_characters, translate
+
+
+
+def character_names(count):
+    """:returns: count made-up character names: Zzaaa, Zzaab, etc."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return ['Zz' + letters[k // 676] + letters[k // 26 % 26] + letters[k % 26] for k in range(count)]
+
+
+def large_cast_play(names):
+    """:returns: a play in which each of names is spoken to by the one before, and prints a number."""
+    spl = 'A large cast.\n\n' + ''.join('%s, a person.\n' % name for name in names)
+    spl += '\nAct I: Everyone.\n\nScene I: Everyone in turn.\n\n'
+    for speaker, listener in zip(names, names[1:]):
+        spl += ('[Enter %s and %s]\n\n%s: You are as good as the sum of yourself and a cat! Open your heart!\n\n'
+                '[Exeunt]\n\n' % (speaker, listener, speaker))
+    return spl
+
+
+UNUSED_CHARACTER_PLAY = read_example('hello-world').replace('Hamlet, the flatterer', 'Macbeth, a bystander.\n'
+                                                            'Hamlet, the flatterer', 1)
+
+
+class TestCharacters(unittest.TestCase):
+
+    def test_cast_table(self):
+        names = character_names(3)
+        translator = Translator(extra_words={'characters': names})
+        symbols = translator.symbolize(large_cast_play(names))
+        characters, _ = read_characters(symbols, symbols.index((SYM_END_PUNCTUATION,)) + 1)
+        self.assertEqual(characters, {name: number for number, name in enumerate(names)})
+
+    def test_large_cast(self):
+        names = character_names(2000)
+        play = Translator(extra_words={'characters': names}).parse(large_cast_play(names))
+        self.assertEqual(play.characters, names)
+        self.assertEqual(used_characters(play), names[1:]) # the first is never spoken to
+
+    def test_unused_characters_left_out(self):
+        java = translate(UNUSED_CHARACTER_PLAY, 'Play')
+        self.assertNotIn('Macbeth', java)
+        self.assertEqual(java, translate(read_example('hello-world'), 'Play'))
+        self.assertNotIn('Macbeth', translate(UNUSED_CHARACTER_PLAY, 'Play', target='c'))
+
+    def test_character_arrays(self):
+        java = translate(UNUSED_CHARACTER_PLAY, 'Play', character_arrays=True)
+        self.assertIn('\t// 0: Romeo\n\t// 1: Juliet\n\t// 2: Ophelia\n\t// 3: Hamlet\n', java)
+        self.assertIn('\tprivate static int[] cast = new int[4];\n', java)
+        self.assertIn('\tprivate static Deque<Integer>[] cast_stk = new Deque[4];\n\tstatic {\n', java)
+        self.assertIn('\t\tcast[0] = cast[3];\n', java) # Romeo = Hamlet
+        self.assertNotIn('Macbeth', java)
+        self.assertNotIn('Romeo;', java)
+
+    def test_character_arrays_stacks(self):
+        java = translate(read_example('reverse'), 'Play', character_arrays=True)
+        self.assertRegex(java, r'cast_stk\[\d\]\.push\(cast\[\d\]\);')
+        self.assertRegex(java, r'cast\[\d\] = cast_stk\[\d\]\.pop\(\);')
+        self.assertNotIn('_stk.', java)
+
+    def test_character_arrays_initial_state(self):
+        java = translate(read_example('hello-world'), 'Play', character_arrays=True, precompute=20)
+        self.assertIn('\tstatic {\n\t\tfor (int i = 0; i < 4; i++) {\n\t\t\tcast_stk[i] = new ArrayDeque<Integer>();'
+                      '\n\t\t}\n\t\tcast[0] = 108;\n', java)
+        java = translate(read_example('hello-world'), 'Play', character_arrays=True, reentrant=True)
+        self.assertIn('\tprivate int[] cast = new int[4];\n', java)
+        self.assertIn('\t{\n\t\tfor (int i = 0; i < 4; i++) {\n', java)
+
+    def test_array_sizes(self):
+        self.assertEqual(character_field('cast[3]'), 'cast')
+        self.assertEqual(character_field('Romeo'), 'Romeo')
+        self.assertEqual(character_size('Romeo'), 3)
+        self.assertEqual(character_size('cast[3]'), 5)
+        self.assertEqual(character_size('cast[1000]'), 7)
+        keys = set()
+        constant_keys((STMT_PUSH, 'cast[3]'), keys, 100)
+        self.assertEqual(keys, {('field', 'cast'), ('field', 'cast_stk')})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# This file tests codesize.py and how the Java generator splits big methods and classes with it.
+
+import re
+import unittest
+
+from codesize import *
+from instrumentation import TranslationStats
+from javaemitter import emit_java
+from play import *
+from translator import Translator, translate
+
+
+def long_scene_play(lines):
+    """:returns: a play whose only scene has that many lines, then loops back to the start."""
+    return '''A long scene.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The only act.
+
+Scene I: The only scene.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+{}
+ Am I better than you? If not, let us return to scene I.
+
+[Exeunt]
+'''.format(' Thou art the sum of thyself and a cat. Open your heart!\n' * lines)
+
+
+class TestCodeSize(unittest.TestCase):
+
+    def test_statement_size(self):
+        twice_romeo = (STMT_ASSIGN, 'Juliet', (EXPR_TWICE, (EXPR_CHARACTER, 'Romeo')))
+        self.assertEqual(statement_size(twice_romeo, 100), 3 + 2 + 3)
+        big = (STMT_ASSIGN, 'Juliet', (EXPR_CONSTANT, 1 << 20))
+        self.assertEqual(statement_size(big, 100), 6)
+        self.assertEqual(statement_size((STMT_OUTPUT_STRING, 'x' * 250), 100), 3 * STRING_CHUNK_SIZE)
+
+        keys = set()
+        constant_keys((STMT_IF, (COMPARE_GREATER, (EXPR_CHARACTER, 'Romeo'), (EXPR_CONSTANT, 1 << 20), False),
+                       (STMT_JUMP, 'act1scene2')), keys, 100)
+        self.assertEqual(keys, {('field', 'Romeo'), ('int', 1 << 20), ('method', 'act1scene2')})
+
+    def test_small_play_unchanged(self):
+        spl = long_scene_play(10)
+        self.assertEqual(translate(spl, 'Long'), translate(spl, 'Long', max_method_size=None))
+
+    def test_split_method(self):
+        spl = long_scene_play(2000)
+        stats = TranslationStats()
+        java = Translator().translate(spl, 'Long', stats)
+
+        self.assertGreater(len(stats.method_sizes), 2)
+        self.assertTrue(all(size <= HUGE_METHOD_LIMIT for size in stats.method_sizes.values()))
+        self.assertEqual(java.count('System.out.print(Romeo);'), 2000)
+
+        # each part ends by calling the next, and the jump back is in the last one
+        self.assertIn('\t\tact1scene1_2();\n\t}\n\tprivate static void act1scene1_2() {', java)
+        last = 'act1scene1_%d' % (len(stats.method_sizes) - 2)
+        self.assertRegex(java, r'%s\(\) \{[^}]*\{ act1scene1\(\); return; \}\n\t\}\n\}\n$' % last)
+
+    def test_split_classes(self):
+        play = Translator().parse(long_scene_play(2000))
+        sizes = {}
+        java = ''.join(emit_java(play, 'Long', max_method_size=1000, method_sizes=sizes, max_constants=80))
+
+        self.assertIn('\tstatic final class Part2 {\n\t\tstatic void ', java)
+        self.assertIn('\tstatic int Romeo;\n', java) # not private, so the nested classes can use it
+        self.assertNotIn('private', java)
+
+        # calls between classes name the class the method is in
+        calls = re.findall(r'(\w+)\.(act\w+)\(\);', java)
+        self.assertGreater(len(calls), 2)
+        for class_name, method in calls:
+            self.assertIn(method if class_name == 'Long' else class_name + '.' + method, sizes)
+        self.assertEqual(len(re.findall(r'static void (\w+)\(\)', java)) + 1, len(sizes))
+
+    def test_structured_too_big(self):
+        spl = long_scene_play(6000)
+        self.assertIn('loop_act1scene1: while (true)', translate(long_scene_play(10), 'Long', structured=True))
+        self.assertEqual(translate(spl, 'Long', structured=True), translate(spl, 'Long'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# This file tests the common subexpression elimination in cse.py.
+
+import re
+import unittest
+
+from cse import eliminate_common_subexpressions, expression_nodes
+from instrumentation import TranslationStats
+from play import *
+from test_cemitter import CC, compile_and_run
+from test_codesize import long_scene_play
+from translator import translate
+
+# the sum of the square of Romeo and twice Romeo is worked out three times before Romeo changes
+REPEATS_PLAY = '''Repeats.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: Sums.
+
+Scene I: The same again.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Listen to your heart!
+
+Romeo:
+ You are as good as the sum of the square of me and twice me. Open your heart!
+ Are you better than the sum of the square of me and twice me? If so, you are the quotient
+ between the sum of the square of me and twice me and a cat.
+ Open your heart! You are as good as the sum of the square of me and twice me.
+ Open your heart!
+
+Juliet:
+ You are the sum of yourself and a cat. You are the sum of the square of yourself and
+ twice yourself. Open your heart! Are you as good as the quotient between me and
+ a big cat? If not, let us proceed to scene II.
+
+Scene II: The end.
+
+Romeo:
+ Open your heart!
+
+[Exeunt]
+'''
+
+ROMEO = (EXPR_CHARACTER, 'Romeo')
+SQUARE_PLUS_TWICE = (EXPR_SUM, (EXPR_SQUARE, ROMEO), (EXPR_TWICE, ROMEO))
+
+
+def eliminate(statements):
+    play = Play(['Romeo', 'Juliet'], [Method('main', statements)])
+    return eliminate_common_subexpressions(play).methods[0].statements
+
+
+class TestCse(unittest.TestCase):
+
+    def test_java(self):
+        stats = TranslationStats()
+        java = translate(REPEATS_PLAY, 'Repeats', stats, cse=True)
+        self.assertIn('\t\tint cse0 = (((int) Math.pow(Romeo, 2)) + (2*Romeo));\n\t\tJuliet = cse0;\n', java)
+        self.assertIn('if (Juliet > cse0) Juliet = (cse0 / 1);', java)
+        self.assertEqual(java.count('Math.pow'), 2) # once more after Romeo changes
+        self.assertEqual((stats.cse_locals, stats.cse_eliminated_nodes), (1, 15))
+
+    def test_only_set_where_always_worked_out(self):
+        # a question guards both: setting a local before it could divide by zero
+        quotient = (EXPR_QUOTIENT, (EXPR_CONSTANT, 1), ROMEO)
+        guarded = (STMT_IF, (COMPARE_GREATER, ROMEO, (EXPR_CONSTANT, 0), False), (STMT_ASSIGN, 'Juliet', quotient))
+        self.assertEqual(eliminate([guarded, guarded]), [guarded, guarded])
+
+        # but once it's worked out, a guarded statement can use it
+        statements = eliminate([(STMT_ASSIGN, 'Juliet', quotient), guarded])
+        local = (EXPR_LOCAL, 'cse0')
+        self.assertEqual(statements, [(STMT_LOCAL, 'cse0', quotient), (STMT_ASSIGN, 'Juliet', local),
+                                      (STMT_IF, guarded[1], (STMT_ASSIGN, 'Juliet', local))])
+
+    def test_nested(self):
+        product = (EXPR_PRODUCT, SQUARE_PLUS_TWICE, (EXPR_CHARACTER, 'Juliet'))
+        statements = eliminate([(STMT_ASSIGN, 'Juliet', SQUARE_PLUS_TWICE), (STMT_ASSIGN, 'Romeo', product),
+                                (STMT_OUTPUT_NUMBER, 'Juliet'), (STMT_ASSIGN, 'Juliet', product)])
+        # the product isn't used again once Romeo changes; the sum isn't used inside it
+        self.assertEqual(statements, [
+            (STMT_LOCAL, 'cse0', SQUARE_PLUS_TWICE),
+            (STMT_ASSIGN, 'Juliet', (EXPR_LOCAL, 'cse0')),
+            (STMT_ASSIGN, 'Romeo', (EXPR_PRODUCT, (EXPR_LOCAL, 'cse0'), (EXPR_CHARACTER, 'Juliet'))),
+            (STMT_OUTPUT_NUMBER, 'Juliet'),
+            (STMT_ASSIGN, 'Juliet', product),
+        ])
+
+    def test_split_methods_keep_locals(self):
+        spl = long_scene_play(200).replace('the sum of thyself and a cat', 'the sum of the square of me and twice me')
+        java = translate(spl, 'Long', cse=True, max_method_size=200)
+        methods = re.findall(r'static void \w+\(\) \{(.*?)\n\t\}', java, re.S)
+        self.assertGreater(len(methods), 4)
+        for body in methods:
+            self.assertLessEqual(set(re.findall(r'cse\d+', body)), set(re.findall(r'int (cse\d+) =', body)))
+
+    def test_deep_expression(self):
+        # far deeper than Python's recursion limit, and worked out twice
+        deep = ROMEO
+        for _ in range(5000):
+            deep = (EXPR_TWICE, deep)
+        statements = eliminate([(STMT_ASSIGN, 'Juliet', deep), (STMT_ASSIGN, 'Juliet', deep)])
+        # (comparing deep tuples would recurse)
+        self.assertEqual(statements[0][:2], (STMT_LOCAL, 'cse0'))
+        self.assertEqual(expression_nodes(statements[0][2]), 5001)
+        self.assertEqual(statements[1:], [(STMT_ASSIGN, 'Juliet', (EXPR_LOCAL, 'cse0'))] * 2)
+
+        spl = REPEATS_PLAY.replace('twice me', 'twice ' + 'the square of ' * 3000 + 'me')
+        stats = TranslationStats()
+        java = translate(spl, 'Repeats', stats, cse=True)
+        # the whole sum is worked out once instead of four times, with the square of Romeo inside it once
+        self.assertEqual(java.count('Math.pow'), 3001)
+        self.assertEqual(translate(spl, 'Repeats').count('Math.pow'), 4 * 3001 + 1)
+        self.assertEqual(stats.cse_locals, 2)
+        translate(spl, 'Repeats', cse=True, target='c')
+
+    @unittest.skipIf(CC is None, 'no C compiler')
+    def test_c_output_unchanged(self):
+        for stdin in (b'3\n', b'-7\n', b'0\n'):
+            self.assertEqual(compile_and_run(REPEATS_PLAY, stdin, cse=True), compile_and_run(REPEATS_PLAY, stdin))
+
+
+if __name__ == '__main__':
+    unittest.main()
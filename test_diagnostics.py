@@ -0,0 +1,154 @@
+# This file tests finding every error in a play at once, and where they are, in diagnostics.py
+
+import time
+import unittest
+
+from diagnostics import *
+from limits import Limits
+from splerror import *
+from symbolizer import *
+from test_translator import read_example
+from translator import MAX_DIAGNOSTICS, Translator, parse_play, translate
+
+
+BROKEN_PLAY = '''The Broken Play.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The only act.
+
+Scene I: Errors.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Thou art as bigg as the sum of a cat and.
+ Speak your mind!
+ You are as good as the diference between a cat and me.
+
+[Exit Hamlet]
+
+Romeo:
+ Open your heart! Let us return to scene III.
+
+Scene II: More.
+
+Juliet:
+ Open your heart!
+
+[Exeunt]
+'''
+
+# the lines of BROKEN_PLAY up to Juliet's first line, for making plays with lots of errors
+BROKEN_PLAY_START = BROKEN_PLAY[:BROKEN_PLAY.index('Juliet:\n Thou')]
+
+
+def many_errors(count):
+    """:returns: a play with count statements with the same error."""
+    return BROKEN_PLAY_START + 'Juliet:\n' + ' Thou art as bigg as the sum of a cat and.\n' * count + '\n[Exeunt]\n'
+
+
+def translate_errors(spl):
+    """:returns: the SplErrors translating spl with recover=True raises."""
+    try:
+        translate(spl, 'Broken', recover=True)
+    except SplErrors as errors:
+        return errors
+    raise AssertionError('no SplErrors')
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_every_error(self):
+        errors = translate_errors(BROKEN_PLAY).errors
+        self.assertEqual([(error.line, error.column) for error in errors[:3]], [(13, 2), (15, 2), (17, 1)])
+        self.assertTrue(errors[0].args[0].startswith('Expression ended too soon'))
+        self.assertIn('did you mean "big"', errors[0].args[0])
+        self.assertIn('did you mean "difference"', errors[1].args[0])
+        self.assertEqual(errors[2].args[0], 'Unknown character in stage direction: Hamlet')
+        # errors found after parsing have no position
+        self.assertEqual(errors[3].args[0], 'Jump to nonexistent act or scene: act1scene3')
+        self.assertIsNone(getattr(errors[3], 'line', None))
+        self.assertEqual(len(errors), 4)
+
+    def test_message(self):
+        message = translate_errors(BROKEN_PLAY).args[0]
+        self.assertTrue(message.startswith('Line 13, column 2: Expression ended too soon'))
+        self.assertIn('\nLine 17, column 1: Unknown character in stage direction: Hamlet\n', message)
+        self.assertTrue(message.endswith('\nJump to nonexistent act or scene: act1scene3'))
+
+    def test_first_error_unchanged(self):
+        # without recover, the first error is raised on its own, as before
+        with self.assertRaises(SplError) as raised:
+            translate(BROKEN_PLAY, 'Broken')
+        self.assertNotIsInstance(raised.exception, SplErrors)
+        self.assertEqual(raised.exception.args[0], translate_errors(BROKEN_PLAY).errors[0].args[0])
+        self.assertEqual((raised.exception.line, raised.exception.column), (13, 2))
+
+    def test_no_cascade(self):
+        # a broken speaker or scene header doesn't cause errors in the lines after it
+        spl = read_example('primes').replace('Romeo:', 'Rome:', 1)
+        self.assertEqual(len(translate_errors(spl).errors), 1)
+        spl = read_example('primes').replace('Scene II:', 'Scene II', 1)
+        self.assertEqual(len(translate_errors(spl).errors), 1)
+
+    def test_valid_play(self):
+        for name in ('hello-world', 'primes', 'reverse'):
+            spl = read_example(name)
+            self.assertEqual(translate(spl, 'Play', recover=True), translate(spl, 'Play'))
+
+    def test_limit_error(self):
+        with self.assertRaises(LimitError):
+            translate(BROKEN_PLAY, 'Broken', recover=True, limits=Limits(max_tokens=10))
+
+    def test_token_offsets(self):
+        spl = 'Romeo:\n  Speak your mind!'
+        tokens = tokenize(spl)
+        self.assertEqual([spl[offset:offset + len(token)] for token, offset in zip(tokens, token_offsets(spl, tokens))],
+                         tokens)
+
+    def test_source_map(self):
+        spl = read_example('hello-world')
+        source = SourceMap(spl, Translator().vocabulary)
+        self.assertEqual(len(source.positions), len(Translator().symbolize(spl)))
+        self.assertEqual(source.positions[0][0], 1) # in the title
+        lines = spl.split('\n')
+        for line, column in source.positions:
+            self.assertFalse(lines[line - 1][column - 1].isspace())
+        self.assertEqual(source.ignored_words(0, 0), ['The']) # before "Infamous"
+
+    def test_many_errors(self):
+        start = time.perf_counter()
+        errors = translate_errors(many_errors(1000)).errors
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(len(errors), MAX_DIAGNOSTICS + 1)
+        self.assertEqual(errors[-1].args[0], 'Stopped after %d errors.' % MAX_DIAGNOSTICS)
+        self.assertEqual((errors[-2].line, errors[-2].column), (13 + MAX_DIAGNOSTICS - 1, 2))
+
+        # explaining them all takes one pass over the play, not one each
+        spl = many_errors(3000)
+        translator = Translator()
+        symbols = translator.symbolize(spl)
+        errors = []
+        parse_play(symbols, diagnostics=errors, max_diagnostics=len(symbols))
+        start = time.perf_counter()
+        translator.explain(errors, spl, symbols)
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(len(errors), 3000)
+        self.assertEqual(errors[-1].line, 13 + 3000 - 1)
+        self.assertIn('did you mean "big"', errors[-1].args[0])
+
+    def test_explain_deadline(self):
+        spl = many_errors(10)
+        translator = Translator()
+        symbols = translator.symbolize(spl)
+        errors = []
+        parse_play(symbols, diagnostics=errors)
+        translator.explain(errors, spl, symbols, Limits(deadline=0).start())
+        self.assertEqual(len(errors), 10)
+        self.assertIsNone(getattr(errors[0], 'line', None))
+        self.assertNotIn('did you mean', errors[0].args[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# This file tests the interpreter and partial evaluation in interpreter.py
+
+import os
+import unittest
+
+from interpreter import INT_MAX, INT_MIN, ProgramError, evaluate, precompute
+from javaemitter import emit_java
+from play import *
+from translator import Translator, translate
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples')
+
+
+def read_example(name):
+    with open(os.path.join(EXAMPLES_DIR, name + '.spl'), 'r') as spl_file:
+        return spl_file.read()
+
+
+def constant(value):
+    return (EXPR_CONSTANT, value)
+
+
+class TestEvaluate(unittest.TestCase):
+
+    def test_java_int_arithmetic(self):
+        values = {'Romeo': INT_MAX, 'Juliet': INT_MIN}
+        romeo, juliet = (EXPR_CHARACTER, 'Romeo'), (EXPR_CHARACTER, 'Juliet')
+        self.assertEqual(evaluate((EXPR_SUM, romeo, constant(1)), values), INT_MIN)
+        self.assertEqual(evaluate((EXPR_TWICE, juliet), values), 0)
+        self.assertEqual(evaluate((EXPR_QUOTIENT, juliet, constant(-1)), values), INT_MIN)
+        self.assertEqual(evaluate((EXPR_SQUARE, romeo), values), INT_MAX) # (int) Math.pow saturates
+        self.assertEqual(evaluate((EXPR_CUBE, juliet), values), INT_MIN)
+        self.assertEqual(evaluate((EXPR_SQUARE_ROOT, constant(-1)), values), 0) # NaN
+        self.assertEqual(evaluate((EXPR_CUBE_ROOT, (EXPR_PRODUCT, constant(-1), (EXPR_CUBE, (EXPR_THRICE,
+                                                                                            constant(1))))), values), -3)
+
+    def test_division_rounds_towards_zero(self):
+        self.assertEqual(evaluate((EXPR_QUOTIENT, constant(-7), (EXPR_TWICE, constant(1))), {}), -3)
+        self.assertEqual(evaluate((EXPR_REMAINDER, constant(-7), (EXPR_TWICE, constant(1))), {}), -1)
+        self.assertEqual(evaluate((EXPR_HALF, constant(-1)), {}), 0)
+        with self.assertRaises(ProgramError):
+            evaluate((EXPR_REMAINDER, constant(1), constant(0)), {})
+
+    def test_deep_expression(self):
+        # far deeper than Python's recursion limit: -1 doubled 5000 times, then less one 5000 times
+        expr = constant(-1)
+        for _ in range(5000):
+            expr = (EXPR_TWICE, expr)
+        self.assertEqual(evaluate(expr, {}), 0)
+        for _ in range(5000):
+            expr = (EXPR_DIFFERENCE, expr, (EXPR_CHARACTER, 'Romeo'))
+        self.assertEqual(evaluate(expr, {'Romeo': 1}), -5000)
+        with self.assertRaises(ProgramError):
+            evaluate((EXPR_QUOTIENT, constant(1), expr), {'Romeo': 0})
+
+
+
+class TestPrecompute(unittest.TestCase):
+
+    def test_no_input_is_one_print(self):
+        play = precompute(Translator().parse(read_example('hello-world')))
+        self.assertEqual(play.characters, [])
+        self.assertEqual(len(play.methods), 1)
+        self.assertEqual(play.methods[0].statements, [(STMT_OUTPUT_STRING, 'Hello World!\n')])
+
+        java = translate(read_example('hello-world'), 'Hello', precompute=True)
+        self.assertEqual(java.count('System.out.print'), 1)
+        self.assertIn('System.out.print("Hello World!\\n");', java)
+
+    def test_stops_at_input(self):
+        play = precompute(Translator().parse(read_example('primes')))
+        self.assertEqual(play.methods[0].statements[:2], [(STMT_OUTPUT_STRING, '>'), (STMT_INPUT_NUMBER, 'TheGhost')])
+        self.assertEqual(play.initial_values, {'Juliet': ord('>')})
+
+    def test_stacks_and_step_limit(self):
+        stack_play = Play(['Romeo'], [
+            Method('main', [(STMT_NEXT, 'act1')]),
+            Method('act1', [(STMT_ASSIGN, 'Romeo', (EXPR_SUM, (EXPR_CHARACTER, 'Romeo'), constant(1))),
+                            (STMT_PUSH, 'Romeo'),
+                            (STMT_IF, (COMPARE_LESS, (EXPR_CHARACTER, 'Romeo'), (EXPR_CUBE, constant(-1)), True),
+                             (STMT_JUMP, 'act1'))]),
+        ])
+        # stopped before the push in the fourth time round the loop
+        play = precompute(stack_play, max_steps=1 + 3 * 3 + 1)
+        self.assertEqual(play.initial_values, {'Romeo': 4})
+        self.assertEqual(play.initial_stacks, {'Romeo': [1, 2, 3]})
+        self.assertEqual(play.methods[0].statements, stack_play.methods[1].statements[1:])
+
+        java = ''.join(emit_java(play, 'Play'))
+        self.assertIn('private static int Romeo = 4;', java)
+        self.assertIn('new ArrayDeque<Integer>(java.util.Arrays.asList(3, 2, 1));', java) # top first
+
+
+if __name__ == '__main__':
+    unittest.main()
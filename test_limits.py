@@ -0,0 +1,112 @@
+# This file tests the limits on translating untrusted plays in limits.py, with adversarial plays
+
+import time
+import tracemalloc
+import unittest
+
+from limits import UNTRUSTED_LIMITS, Limits
+from splerror import *
+from test_translator import long_play, read_example
+from translator import Translator, translate
+
+
+SECONDS = 2 # how long any adversarial play may take to be rejected
+
+
+def roman(n):
+    """:returns: n (less than 49, which the translator reads wrong) as a Roman numeral."""
+    return 'X' * (n // 10) + ['', 'I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX'][n % 10]
+
+
+def many_scenes_play(acts, scenes):
+    """:returns: a play with that many acts of that many scenes, each of which prints something."""
+    spl = 'Scenes.\n\nRomeo, a young man.\nJuliet, a young woman.\n\n'
+    for act in range(1, acts + 1):
+        spl += 'Act %s: An act.\n\n' % roman(act)
+        for scene in range(1, scenes + 1):
+            spl += 'Scene %s: A scene.\n\n[Enter Romeo and Juliet]\n\n' % roman(scene)
+            spl += 'Juliet: Open your heart!\n\n[Exeunt]\n\n'
+    return spl
+
+
+def deep_play(adjectives):
+    """:returns: a play assigning a noun with that many adjectives in front of it."""
+    return read_example('hello-world').replace('You lying stupid', 'You ' + 'big ' * adjectives + 'lying stupid', 1)
+
+
+class TestLimits(unittest.TestCase):
+
+    def assertRejected(self, error_type, spl, **limits):
+        """Check translating spl with those limits raises error_type within SECONDS."""
+        start = time.monotonic()
+        with self.assertRaises(error_type):
+            translate(spl, 'Adversarial', limits=Limits(**limits))
+        self.assertLess(time.monotonic() - start, SECONDS)
+
+    def test_within_limits(self):
+        spl = read_example('primes')
+        self.assertEqual(translate(spl, 'Primes', limits=UNTRUSTED_LIMITS), translate(spl, 'Primes'))
+        self.assertEqual(translate(spl, 'Primes', limits=Limits()), translate(spl, 'Primes'))
+
+    def test_distinct_errors(self):
+        errors = (InputTooLargeError, TooManyTokensError, ExpressionTooDeepError, TooManySectionsError,
+                  OutputTooLargeError, DeadlineExceededError)
+        self.assertEqual(len(set(errors)), len(errors))
+        for error in errors:
+            self.assertTrue(issubclass(error, LimitError) and issubclass(error, SplError))
+
+    def test_input_size(self):
+        spl = 'x' * (64 << 20)
+        tracemalloc.start()
+        self.assertRejected(InputTooLargeError, spl, max_input_size=1 << 20)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertLess(peak, 1 << 20) # it isn't even tokenized
+
+    def test_tokens(self):
+        self.assertRejected(TooManyTokensError, '!' * (1 << 20), max_tokens=10000)
+        self.assertRejected(TooManyTokensError, read_example('primes'), max_tokens=100)
+
+    def test_expression_depth(self):
+        self.assertRejected(ExpressionTooDeepError, deep_play(200000), max_expression_depth=500)
+        self.assertRejected(ExpressionTooDeepError, deep_play(500), max_expression_depth=500)
+        translate(deep_play(490), 'Deep', limits=Limits(max_expression_depth=500))
+
+    def test_sections(self):
+        self.assertRejected(TooManySectionsError, many_scenes_play(48, 48), max_sections=100)
+        self.assertRejected(TooManySectionsError, long_play(12), max_sections=25)
+        translate(long_play(12), 'Long', limits=Limits(max_sections=26))
+
+    def test_output_size(self):
+        self.assertRejected(OutputTooLargeError, many_scenes_play(20, 20), max_output_size=10000)
+        self.assertRejected(OutputTooLargeError, read_example('hello-world'), max_output_size=100)
+
+    def test_deadline(self):
+        # a megabyte of the same thing said over and over, which used to make symbolizing quadratic
+        for phrase in ('I ', 'let us return to ', 'the difference between '):
+            spl = 'Spam.\n\nRomeo, a man.\n\n' + phrase * ((1 << 20) // len(phrase))
+            self.assertRejected(DeadlineExceededError, spl, deadline=0.2)
+        self.assertRejected(DeadlineExceededError, many_scenes_play(48, 48), deadline=0.05)
+
+    def test_precompute_deadline(self):
+        # a loop of slow statements, which precompute would run 100000 of
+        line = ' You are as good as ' + 'the sum of a cat and ' * 2000 + 'a cat.\n'
+        spl = many_scenes_play(1, 1).replace(' Open your heart!\n\n[Exeunt]\n', line * 4 + ' Let us return to scene I.\n')
+        start = time.monotonic()
+        with self.assertRaises(DeadlineExceededError):
+            translate(spl, 'Adversarial', limits=Limits(deadline=1), precompute=True)
+        self.assertLess(time.monotonic() - start, 1 + SECONDS)
+
+    def test_symbolize_linear(self):
+        # 4 times as many "I"s shouldn't take much more than 4 times as long
+        translator = Translator()
+        times = []
+        for count in (50000, 200000):
+            start = time.perf_counter()
+            translator.symbolize('Act I: ' + 'I ' * count)
+            times.append(time.perf_counter() - start)
+        self.assertLess(times[1], 10 * times[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+# This file tests generating reentrant Java classes, whose instances run a play with their own state and streams
+
+import re
+import unittest
+
+from javaemitter import emit_java
+from sceneprofile import record_profile
+from test_codesize import long_scene_play
+from test_translator import read_example
+from translator import Translator, translate
+
+
+def instance_code(java):
+    """:returns: the Java code with main() and the constructors, which may use System.in and System.out, taken out."""
+    return re.sub(r'\tpublic (static void main|\w+)\([^)]*\) \{\n.*?\n\t\}\n', '', java, flags=re.S)
+
+
+class TestReentrant(unittest.TestCase):
+
+    def assertReentrant(self, java):
+        """Check java keeps no static state and only uses its own streams."""
+        code = instance_code(java)
+        self.assertNotIn('static', code)
+        self.assertNotIn('System.', code)
+        self.assertIn('public void run() {', code)
+        self.assertIn('\tpublic static void main(String[] args) {\n\t\tnew Play().run();\n\t}\n', java)
+        self.assertIn('\tpublic Play(InputStream in, PrintStream out) {\n', java)
+
+    def test_examples(self):
+        for name in ('hello-world', 'primes', 'reverse'):
+            java = translate(read_example(name), 'Play', reentrant=True)
+            self.assertReentrant(java)
+            self.assertIn('public class Play implements Runnable {', java)
+            # the same methods and statements as the static class
+            static = translate(read_example(name), 'Play')
+            self.assertEqual(java.count('scanner.'), static.count('scanner.'))
+            self.assertEqual(java.count('\tout.print('), static.count('System.out.print('))
+
+    def test_default_is_static(self):
+        java = translate(read_example('primes'), 'Play')
+        self.assertIn('\tprivate static int ', java)
+        self.assertNotIn('Runnable', java)
+
+    def test_structured(self):
+        java = translate(read_example('primes'), 'Play', structured=True, reentrant=True)
+        self.assertReentrant(java)
+        self.assertIn('public void run() {\n\t\t// main\n', java)
+
+    def test_profile(self):
+        play = Translator().parse(read_example('primes'))
+        java = translate(read_example('primes'), 'Play', reentrant=True, profile=record_profile(play, '30\n'))
+        self.assertReentrant(java)
+        self.assertIn('dispatch: while (true)', java)
+
+    def test_split_classes(self):
+        play = Translator().parse(long_scene_play(2000))
+        java = ''.join(emit_java(play, 'Play', max_method_size=1000, max_constants=80, reentrant=True))
+        self.assertReentrant(java)
+
+        # the nested classes are inner classes, called through an instance of each
+        classes = re.findall(r'\tfinal class (Part\d+) \{\n', java)
+        self.assertGreater(len(classes), 1)
+        for name in classes:
+            self.assertIn('\tfinal %s %s = new %s();\n' % (name, name.lower(), name), java)
+        for instance, method in re.findall(r'(\w+)\.(act\w+)\(\);', java):
+            self.assertIn(instance.capitalize(), classes)
+            self.assertRegex(java, r'\tfinal class %s \{\n(\t\t.*\n)*\t\tvoid %s\(\)' % (instance.capitalize(), method))
+
+    def test_bench(self):
+        java = translate(read_example('primes'), 'Play', bench=True)
+        self.assertIn('public class Play implements Runnable {', java)
+        self.assertIn('\tpublic void run() {\n', java)
+        # main() runs instances on the input file instead of one on System.in
+        main = java[java.index('\tpublic static void main('):java.index('\tpublic void run()')]
+        self.assertIn('new Play(new java.io.ByteArrayInputStream(input), out).run();', main)
+        self.assertIn('percentile(times, p)', main)
+        self.assertNotIn('new Play().run()', java)
+        # the play is generated the same way as without --bench
+        reentrant = translate(read_example('primes'), 'Play', reentrant=True)
+        self.assertEqual(java[java.index('\tpublic void run()'):], reentrant[reentrant.index('\tpublic void run()'):])
+
+
+if __name__ == '__main__':
+    unittest.main()
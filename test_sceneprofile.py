@@ -0,0 +1,166 @@
+# This file tests recording execution profiles and optimizing with them, in sceneprofile.py
+
+import os
+import tempfile
+import unittest
+
+from interpreter import STOP_END, STOP_ERROR, Interpreter, ProgramError
+from limits import Limits
+from play import *
+from sceneprofile import *
+from splerror import DeadlineExceededError
+from test_cemitter import CC, compile_and_run, read_example
+from translator import Translator, translate
+
+
+PRIMES_OUTPUT = b'>' + b''.join(b'%d\n' % p for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29))
+
+
+def character(name):
+    return (EXPR_CHARACTER, name)
+
+
+def constant(value):
+    return (EXPR_CONSTANT, value)
+
+
+def jump_if(op, expr1, expr2, target, negated=False):
+    return (STMT_IF, (op, expr1, expr2, negated), (STMT_JUMP, target))
+
+
+class TestSceneProfile(unittest.TestCase):
+
+    def test_interpreter_input(self):
+        play = Translator().parse(read_example('reverse'))
+        interpreter = Interpreter(play, 'hello\n')
+        self.assertEqual(interpreter.run(10000, 10000, 10000), STOP_END)
+        self.assertEqual(''.join(interpreter.output), 'olleh\n')
+
+        interpreter = Interpreter(Translator().parse(read_example('primes')), 'x')
+        self.assertEqual(interpreter.run(10000, 10000, 10000), STOP_ERROR) # InputMismatchException
+
+    def test_read_input(self):
+        interpreter = Interpreter(Play([], [Method('main')]), ' -12\n3000000000 a\U0001F600')
+        self.assertEqual(interpreter.read_number(), -12)
+        self.assertEqual(interpreter.read_character(), -1) # the end of the line isn't read
+        self.assertRaises(ProgramError, interpreter.read_number) # too big for an int
+        interpreter.stdin_position = interpreter.stdin.index(' a')
+        self.assertEqual(interpreter.read_character(), ord(' '))
+        self.assertEqual(interpreter.read_character(), ord('a'))
+        self.assertEqual(interpreter.read_character(), 0xD83D)
+        self.assertEqual(interpreter.read_character(), -1)
+        self.assertRaises(ProgramError, interpreter.read_number)
+
+    def test_record_profile(self):
+        profile = record_profile(Translator().parse(read_example('primes')), '30\n')
+        self.assertEqual(profile.entries['main'], 1)
+        self.assertEqual(profile.entries['act2scene1'], 30) # once for each of 2 to 30, then once more
+        self.assertEqual(profile.entries['act2scene3'], 10) # once for each prime
+        self.assertEqual(profile.jumps['act2scene1']['act2scene5'], [1, 29])
+        self.assertEqual(profile.taken('act2scene2', 'act2scene3'), 10)
+        self.assertEqual(profile.taken('act2scene2', 'act1'), 0)
+
+    def test_record_profile_deadline(self):
+        # a loop that never ends is stopped by the deadline, not after all PROFILE_MAX_STEPS statements
+        loop = Play(['Romeo'], [Method('main', [(STMT_ASSIGN, 'Romeo', (EXPR_TWICE, character('Romeo'))),
+                                                (STMT_JUMP, 'main')])])
+        with self.assertRaises(DeadlineExceededError):
+            record_profile(loop, limits=Limits(deadline=0.05))
+        # but one that finishes in time is recorded in full
+        play = Translator().parse(read_example('primes'))
+        self.assertEqual(record_profile(play, '30\n', limits=Limits(deadline=10)).to_json(),
+                         record_profile(play, '30\n').to_json())
+
+    def test_deep_expressions(self):
+        # far deeper than Python's recursion limit
+        deep = constant(0)
+        for _ in range(5000):
+            deep = (EXPR_SUM, constant(1), deep)
+        self.assertFalse(can_throw(deep))
+        self.assertTrue(can_throw((EXPR_TWICE, (EXPR_QUOTIENT, deep, character('Romeo')))))
+        # comparing two copies of it, as == on the tuples would, recurses
+        copy = constant(0)
+        for _ in range(5000):
+            copy = (EXPR_SUM, constant(1), copy)
+        self.assertTrue(exclusive((COMPARE_EQUAL, deep, constant(1), False), (COMPARE_EQUAL, copy, constant(2), False)))
+        self.assertFalse(exclusive((COMPARE_EQUAL, deep, constant(1), False), (COMPARE_LESS, constant(0), copy, False)))
+        spl = read_example('hello-world').replace('You lying stupid', 'You ' + 'big ' * 5000 + 'lying stupid', 1)
+        profile = record_profile(Translator().parse(spl))
+        self.assertEqual(profile.entries['main'], 1)
+
+    def test_load_save(self):
+        profile = ScenesProfile({'main': 1, 'act1scene1': 5}, {'act1scene1': {'act1scene1': [4, 1]}})
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'profile.json')
+            save_profile(profile, filename)
+            loaded = load_profile(filename)
+        self.assertEqual(loaded.entries, profile.entries)
+        self.assertEqual(loaded.jumps, profile.jumps)
+
+        self.assertRaises(ValueError, ScenesProfile.from_json, {'entries': {}})
+        self.assertRaises(ValueError, ScenesProfile.from_json, {'format': PROFILE_FORMAT, 'version': 2})
+        self.assertRaises(ValueError, ScenesProfile.from_json,
+                          {'format': PROFILE_FORMAT, 'version': 1, 'entries': {'main': -1}})
+        self.assertRaises(ValueError, ScenesProfile.from_json,
+                          {'format': PROFILE_FORMAT, 'version': 1, 'jumps': {'main': {'act1': [1]}}})
+
+    def test_exclusive(self):
+        romeo, juliet = character('Romeo'), character('Juliet')
+        self.assertTrue(exclusive((COMPARE_GREATER, romeo, juliet, False), (COMPARE_LESS, romeo, juliet, False)))
+        self.assertTrue(exclusive((COMPARE_GREATER, romeo, juliet, False), (COMPARE_GREATER, juliet, romeo, False)))
+        self.assertTrue(exclusive((COMPARE_EQUAL, romeo, juliet, False), (COMPARE_EQUAL, romeo, juliet, True)))
+        self.assertFalse(exclusive((COMPARE_GREATER, romeo, juliet, True), (COMPARE_LESS, romeo, juliet, True)))
+        self.assertTrue(exclusive((COMPARE_EQUAL, romeo, constant(1), False), (COMPARE_EQUAL, constant(2), romeo, False)))
+        self.assertFalse(exclusive((COMPARE_EQUAL, romeo, constant(1), False), (COMPARE_EQUAL, juliet, constant(2), False)))
+        self.assertFalse(exclusive((COMPARE_EQUAL, romeo, constant(1), False), (COMPARE_EQUAL, romeo, constant(1), False)))
+
+    def test_order_jumps(self):
+        romeo = character('Romeo')
+        statements = [jump_if(COMPARE_EQUAL, romeo, constant(k), 'scene%d' % k) for k in range(3)]
+        unsafe = jump_if(COMPARE_EQUAL, (EXPR_QUOTIENT, constant(1), romeo), constant(3), 'scene3')
+        methods = [Method('main', statements + [unsafe, (STMT_NEXT, 'scene0')])]
+        methods += [Method('scene%d' % k) for k in range(4)]
+        play = Play(['Romeo'], methods)
+
+        profile = ScenesProfile(jumps={'main': {'scene1': [2, 8], 'scene2': [7, 3], 'scene3': [100, 0]}})
+        ordered = order_jumps(play, profile).methods[0].statements
+        # the one that might divide by zero stays put
+        self.assertEqual(ordered, [statements[2], statements[1], statements[0], unsafe, (STMT_NEXT, 'scene0')])
+
+        not_exclusive = jump_if(COMPARE_GREATER, romeo, constant(0), 'scene2')
+        play.methods[0].statements = [statements[1], not_exclusive]
+        self.assertEqual(order_jumps(play, profile).methods[0].statements, [statements[1], not_exclusive])
+
+    def test_java_layout(self):
+        spl = read_example('primes')
+        profile = record_profile(Translator().parse(spl), '30\n')
+        java = translate(spl, 'Primes', profile=profile)
+
+        # the loop is in main(), falling through from each scene to the next, and the rest are methods
+        self.assertRegex(java, r'case 0: // main\n\t+case 1: // act1\n\t+case 2: // act1scene1\n')
+        self.assertIn('{ scene = act2scene5(); continue dispatch; }', java)
+        self.assertIn('\tprivate static int act2scene5() {\n\t\treturn -1;\n\t}\n', java)
+        self.assertIn('\t\t\tdefault:\n\t\t\t\treturn;\n', java)
+
+        # with no profile information, only the start of the play is in main()
+        java = translate(spl, 'Primes', profile=ScenesProfile())
+        self.assertIn('\t\t\tcase 0: // main\n\t\t\t\tscene = act1(); continue dispatch;\n', java)
+        self.assertIn('\tprivate static int act2scene2() {\n\t\tif (Juliet > Hamlet) return act2scene3();\n', java)
+
+        # structured output keeps its own layout
+        self.assertEqual(translate(spl, 'Primes', structured=True, profile=profile),
+                         translate(spl, 'Primes', structured=True))
+
+    @unittest.skipIf(CC is None, 'no C compiler')
+    def test_c_layout(self):
+        spl = read_example('primes')
+        profile = record_profile(Translator().parse(spl), '30\n')
+        self.assertEqual(compile_and_run(spl, b'30\n', profile=profile), PRIMES_OUTPUT)
+        self.assertEqual(compile_and_run(spl, b'30\n', profile=ScenesProfile()), PRIMES_OUTPUT)
+
+        c = translate(spl, 'Primes', target='c', profile=profile)
+        self.assertLess(c.index('act2scene3:'), c.index('act2scene5:')) # cold scenes last
+
+
+if __name__ == '__main__':
+    unittest.main()
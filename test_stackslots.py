@@ -0,0 +1,122 @@
+# This file tests replacing the stacks of characters with fields, in stackslots.py
+
+import unittest
+
+from instrumentation import TranslationStats
+from play import *
+from stackslots import *
+from test_cemitter import CC, compile_and_run
+from test_translator import read_example
+from translator import translate
+
+# Romeo remembers twice in scene II and recalls twice in scene III, round a loop
+BALANCED_PLAY = '''Balanced Stacks.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: Loops.
+
+Scene I: Setup.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ You are nothing.
+
+Scene II: The loop.
+
+Juliet:
+ You are as good as the sum of yourself and a cat. Remember yourself.
+ You are as good as the product of yourself and a big big cat.
+ Remember yourself.
+ You are nothing.
+
+Romeo:
+ Let us proceed to scene III.
+
+Scene III: Recall.
+
+Juliet:
+ Recall your past. Open your heart! Recall your childhood. Open your heart!
+ Are you better than a big big big cat?
+
+Romeo:
+ If not, let us return to scene II.
+
+[Exeunt]
+'''
+
+ROMEO = (EXPR_CHARACTER, 'Romeo')
+CONDITION = (COMPARE_GREATER, ROMEO, (EXPR_CONSTANT, 1), False)
+
+
+def promoted(methods, initial_stacks=None, max_depth=MAX_STACK_SLOTS):
+    """:returns: the characters whose stacks are replaced in a play of methods starting with main."""
+    return list(stack_depths(Play(['Romeo'], methods, initial_stacks=initial_stacks), max_depth))
+
+
+class TestStackSlots(unittest.TestCase):
+
+    def test_java(self):
+        stats = TranslationStats()
+        java = translate(BALANCED_PLAY, 'Play', stats=stats, promote_stacks=True)
+        self.assertEqual(stats.promoted_stacks, ['Romeo'])
+        self.assertIn('Stacks replaced by fields: Romeo', stats.report())
+        self.assertIn('\tprivate static int Romeo_stk0;\n\tprivate static int Romeo_stk1;\n', java)
+        self.assertIn('\t\tRomeo_stk1 = Romeo;\n', java)
+        self.assertIn('\t\tRomeo = Romeo_stk1;\n', java)
+        self.assertNotIn('Deque<Integer> Romeo_stk', java)
+        self.assertNotIn('Romeo_stk2', java)
+
+    def test_unbounded(self):
+        # reverse remembers a character each time round a loop
+        stats = TranslationStats()
+        spl = read_example('reverse')
+        self.assertEqual(translate(spl, 'Play', stats=stats, promote_stacks=True), translate(spl, 'Play'))
+        self.assertEqual(stats.promoted_stacks, [])
+
+    def test_only_used_stacks(self):
+        self.assertNotIn('_stk', translate(read_example('hello-world'), 'Play'))
+        self.assertNotIn('_stk', translate(read_example('hello-world'), 'Play', target='c'))
+        self.assertIn('Deque<Integer> Othello_stk', translate(read_example('reverse'), 'Play'))
+
+    @unittest.skipIf(CC is None, 'no C compiler')
+    def test_same_output(self):
+        self.assertEqual(compile_and_run(BALANCED_PLAY, promote_stacks=True), compile_and_run(BALANCED_PLAY))
+        self.assertEqual(compile_and_run(BALANCED_PLAY, promote_stacks=True, cse=True), compile_and_run(BALANCED_PLAY))
+
+    def test_depths(self):
+        # the same depth either way round a question
+        self.assertEqual(promoted([Method('main', [(STMT_PUSH, 'Romeo'), (STMT_IF, CONDITION, (STMT_JUMP, 'a')),
+                                                   (STMT_NEXT, 'a')]),
+                                   Method('a', [(STMT_POP, 'Romeo')])]), ['Romeo'])
+        # a guarded remember is fine if nothing comes after it
+        self.assertEqual(promoted([Method('main', [(STMT_IF, CONDITION, (STMT_PUSH, 'Romeo'))])]), ['Romeo'])
+
+    def test_not_promoted(self):
+        guarded = [Method('main', [(STMT_IF, CONDITION, (STMT_PUSH, 'Romeo')), (STMT_POP, 'Romeo')])]
+        self.assertEqual(promoted(guarded), [])
+        empty = [Method('main', [(STMT_PUSH, 'Romeo'), (STMT_POP, 'Romeo'), (STMT_POP, 'Romeo')])]
+        self.assertEqual(promoted(empty), [])
+        loop = [Method('main', [(STMT_PUSH, 'Romeo'), (STMT_IF, CONDITION, (STMT_JUMP, 'main'))])]
+        self.assertEqual(promoted(loop), [])
+        deep = [Method('main', [(STMT_PUSH, 'Romeo'), (STMT_PUSH, 'Romeo')])]
+        self.assertEqual(promoted(deep, max_depth=1), [])
+        self.assertEqual(promoted(deep, max_depth=2), ['Romeo'])
+        unreachable = [Method('main', []), Method('a', [(STMT_PUSH, 'Romeo')])]
+        self.assertEqual(promoted(unreachable), [])
+
+    def test_initial_stack(self):
+        play = Play(['Romeo'], [Method('main', [(STMT_POP, 'Romeo'), (STMT_OUTPUT_NUMBER, 'Romeo'), (STMT_POP, 'Romeo')])],
+                    initial_stacks={'Romeo': [3, 0, 5]})
+        play = promote_stacks(play)
+        self.assertEqual(play.characters, ['Romeo', 'Romeo_stk0', 'Romeo_stk1', 'Romeo_stk2'])
+        self.assertEqual(play.initial_values, {'Romeo_stk0': 3, 'Romeo_stk2': 5})
+        self.assertEqual(play.initial_stacks, {})
+        self.assertEqual(play.methods[0].statements[0], (STMT_ASSIGN, 'Romeo', (EXPR_CHARACTER, 'Romeo_stk2')))
+        self.assertEqual(play.methods[0].statements[2], (STMT_ASSIGN, 'Romeo', (EXPR_CHARACTER, 'Romeo_stk1')))
+
+
+if __name__ == '__main__':
+    unittest.main()
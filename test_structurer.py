@@ -0,0 +1,218 @@
+# This file tests structurer.py and the structured Java it's used for.
+
+import os
+import random
+import unittest
+
+from limits import Limits
+from play import *
+from splerror import DeadlineExceededError
+from structurer import BLOCK, DISPATCH, LOOP, structure_play
+from translator import translate, Translator
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples')
+
+
+def read_example(name):
+    with open(os.path.join(EXAMPLES_DIR, name + '.spl'), 'r') as spl_file:
+        return spl_file.read()
+
+
+# scene I can skip into scene III, which loops back to scene II: no loop can have one entry
+IRREDUCIBLE_PLAY = '''A knot.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The knot.
+
+Scene I: In.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Listen to your heart! Is the remainder of the quotient between thyself and a big cat
+ as good as nothing? If so, let us proceed to scene III.
+
+Scene II: Round.
+
+Juliet:
+ Open your heart! Thou art the sum of thyself and a cat.
+
+Scene III: About.
+
+Juliet:
+ Is the remainder of the quotient between thyself and a big big cat as good as nothing?
+ If not, let us return to scene II.
+
+[Exeunt]
+'''
+
+
+def constructs(items):
+    """:returns: (kind, target) for every Construct in items, outermost first."""
+    found = []
+    for item in items:
+        if not isinstance(item, Method):
+            found.append((item.kind, item.target))
+            found += constructs(item.children)
+    return found
+
+
+CONDITION = (COMPARE_GREATER, (EXPR_CHARACTER, 'Romeo'), (EXPR_CONSTANT, 0), False)
+
+
+class Jump(Exception):
+    """A break or continue in the structured code."""
+
+    def __init__(self, kind, label):
+        super().__init__(kind, label)
+        self.kind = kind
+        self.label = label
+
+
+class End(Exception):
+    """The end of the play."""
+    pass
+
+
+def follow_jumps(play, choose, max_methods):
+    """:returns: the names of the methods run going straight from method to method, with choose() saying which guarded jumps happen."""
+    methods = play.method_dict()
+    trace = []
+    name = play.entry
+    while len(trace) < max_methods:
+        trace.append(name)
+        for statement in methods[name].statements:
+            inner, conditions = unguarded(statement)
+            if inner[0] in GOTO_STMTS and (not conditions or choose()):
+                name = inner[1]
+                break
+        else:
+            break
+    return trace
+
+
+def follow_structure(structure, choose, max_methods):
+    """:returns: the names of the methods run by the structured Java code, the way follow_jumps() does."""
+
+    trace = []
+    variables = {dispatch.variable: 0 for dispatch in structure.dispatches}
+
+    def run_method(method, enclosing):
+        if len(trace) == max_methods:
+            raise End()
+        trace.append(method.name)
+        position = structure.positions[method.name]
+        for k, statement in enumerate(method.statements):
+            inner, conditions = unguarded(statement)
+            if inner[0] in GOTO_STMTS and (not conditions or choose()):
+                transfer = structure.transfer(position, inner[1], enclosing, k == len(method.statements) - 1 and not conditions)
+                if transfer is None:
+                    return
+                for dispatch, case in transfer[2]:
+                    variables[dispatch.variable] = case
+                raise Jump(transfer[0], transfer[1])
+        raise End()
+
+    def run_items(items, enclosing):
+        for item in items:
+            if isinstance(item, Method):
+                run_method(item, enclosing)
+                continue
+            while True:
+                try:
+                    if item.kind == DISPATCH:
+                        for method in item.children[variables[item.variable]:]:
+                            run_method(method, enclosing + [item])
+                    else:
+                        run_items(item.children, enclosing + [item])
+                    if item.kind == BLOCK:
+                        break
+                except Jump as jump:
+                    if jump.label != item.label:
+                        raise
+                    if jump.kind == 'break':
+                        break
+
+    try:
+        run_items(structure.items, [])
+    except End:
+        pass
+    return trace
+
+
+def random_play(rng, size):
+    """:returns: a Play of size methods, each with a few guarded jumps to random methods, then going to one or ending the play."""
+    names = ['main'] + ['act1scene%d' % i for i in range(1, size)]
+    methods = []
+    for i, name in enumerate(names):
+        statements = [(STMT_OUTPUT_NUMBER, 'Romeo')]
+        for _ in range(rng.randrange(3)):
+            statements.append((STMT_IF, CONDITION, (STMT_JUMP, rng.choice(names))))
+        if i + 1 < size and rng.random() < 0.6:
+            statements.append((STMT_NEXT, names[i+1]))
+        elif rng.random() < 0.8:
+            statements.append((STMT_JUMP, rng.choice(names)))
+        methods.append(Method(name, statements))
+    return Play(['Romeo'], methods)
+
+
+class TestStructurer(unittest.TestCase):
+
+    def test_primes(self):
+        structure = structure_play(Translator().parse(read_example('primes')))
+        self.assertEqual(constructs(structure.items), [
+            (BLOCK, 'act2scene5'), (LOOP, 'act2scene1'), (BLOCK, 'act2scene4'),
+            (BLOCK, 'act2scene3'), (LOOP, 'act2scene2')])
+
+    def test_structured_java_has_no_calls(self):
+        for name in ('hello-world', 'primes', 'reverse', 'test'):
+            java = translate(read_example(name), 'Play', structured=True)
+            self.assertNotRegex(java, r'act\d+(scene\d+)?\(\)')
+            self.assertNotIn('dispatch', java)
+
+    def test_irreducible_part_in_dispatch_loop(self):
+        # only scenes II and III are in the dispatch loop
+        structure = structure_play(Translator().parse(IRREDUCIBLE_PLAY))
+        self.assertEqual(constructs(structure.items), [(BLOCK, 'act1scene2'), (DISPATCH, 'act1scene2')])
+        self.assertEqual([method.name for method in structure.items[-1].children], ['act1scene2', 'act1scene3'])
+        java = translate(IRREDUCIBLE_PLAY, 'Play', structured=True)
+        self.assertIn('\t\tint scene_act1scene2 = 0;\n', java)
+        self.assertIn('{ scene_act1scene2 = 1; break to_act1scene2; }', java)
+        self.assertIn('dispatch_act1scene2: while (true) {\n\t\t\tswitch (scene_act1scene2) {\n\t\t\tcase 0:\n', java)
+        self.assertIn('{ scene_act1scene2 = 0; continue dispatch_act1scene2; }', java)
+        self.assertNotIn('dispatch:', java)
+
+    def test_deadline(self):
+        play = Translator().parse(IRREDUCIBLE_PLAY)
+        with self.assertRaises(DeadlineExceededError):
+            structure_play(play, Limits(deadline=0).start())
+        self.assertIsNotNone(structure_play(play, Limits(deadline=10).start()))
+
+    def test_same_control_flow(self):
+        # the structured code goes through the same methods as the jumps, whatever the questions say
+        rng = random.Random(29)
+        dispatches = 0
+        for _ in range(200):
+            play = random_play(rng, rng.randrange(1, 12))
+            structure = structure_play(play)
+            if structure is None:
+                continue
+            dispatches += len(structure.dispatches)
+            for _ in range(3):
+                seed = rng.random()
+                choices = random.Random(seed)
+                expected = follow_jumps(play, lambda: choices.random() < 0.5, 200)
+                choices = random.Random(seed)
+                self.assertEqual(follow_structure(structure, lambda: choices.random() < 0.5, 200), expected)
+        self.assertGreater(dispatches, 50)
+
+    def test_default_is_unstructured(self):
+        java = translate(read_example('reverse'), 'Play')
+        self.assertIn('private static void act1scene2() {', java)
+        self.assertNotIn('while', java)
+
+
+if __name__ == '__main__':
+    unittest.main()
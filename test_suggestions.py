@@ -0,0 +1,81 @@
+# This file tests the "did you mean" suggestions for unknown words in errors, in suggestions.py
+
+import gc
+import time
+import unittest
+
+from splerror import *
+from suggestions import *
+from test_translator import read_example
+from translator import Translator, translate
+
+
+def translate_error(spl):
+    """:returns: the message of the SplError translating spl raises."""
+    try:
+        translate(spl, 'Typo')
+    except SplError as error:
+        return error.args[0]
+    raise AssertionError('no SplError')
+
+
+class TestSuggestions(unittest.TestCase):
+
+    def setUp(self):
+        self.spl = read_example('hello-world')
+
+    def test_misspelt_word(self):
+        message = translate_error(self.spl.replace('as the difference between a handsome',
+                                                   'as the diference between a handsome', 1))
+        self.assertIn('Unknown word "diference": did you mean "difference"?', message)
+
+    def test_misspelt_character(self):
+        message = translate_error(self.spl.replace('sum of Romeo and his horse', 'sum of Rome and his horse', 1))
+        self.assertIn('Unknown word "Rome": did you mean "Romeo" (character)', message)
+
+    def test_only_statement_with_error(self):
+        # a typo in another statement isn't mentioned
+        spl = self.spl.replace('sweetest reddest rose', 'sweetest redest rose', 1)
+        message = translate_error(spl.replace('sum of Romeo and his horse', 'sum of Rome and his horse', 1))
+        self.assertNotIn('redest', message)
+
+    def test_no_suggestions(self):
+        # filler words and words like nothing in the word lists get no suggestions
+        message = translate_error(self.spl.replace('sum of Romeo and his horse', 'sum of than zqxjk and his horse', 1))
+        self.assertNotIn('Unknown word', message)
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('codpiece', 'codpiece', 2), 0)
+        self.assertEqual(edit_distance('codpeice', 'codpiece', 2), 2)
+        self.assertEqual(edit_distance('bigg', 'big', 2), 1)
+        self.assertEqual(edit_distance('hamster', 'cat', 2), 3)
+
+    def test_suggest(self):
+        index = suggestion_index(Translator().vocabulary)
+        self.assertIs(index, suggestion_index(Translator().vocabulary))
+        self.assertEqual(index.suggest('juliett'), [('Juliet', 'character')])
+        self.assertEqual(index.suggest('codpeice'), [('codpiece', 'noun')])
+        self.assertEqual(index.suggest('xyzzyq'), [])
+        self.assertTrue(index.is_known('heart'))
+
+    def test_index_dropped_with_vocabulary(self):
+        # a service making Translators with their own words doesn't keep every index
+        translator = Translator(extra_words={'characters': ['Zzyzx']})
+        self.assertEqual(suggestion_index(translator.vocabulary).suggest('zzyzz'), [('Zzyzx', 'character')])
+        self.assertIn(translator.vocabulary, SUGGESTION_INDEXES)
+        count = len(SUGGESTION_INDEXES)
+        del translator
+        gc.collect()
+        self.assertEqual(len(SUGGESTION_INDEXES), count - 1)
+
+    def test_fast_lookup(self):
+        index = suggestion_index(Translator().vocabulary)
+        words = ('bigg', 'juliett', 'differnce', 'codpeice', 'xyzzyq') * 200
+        start = time.perf_counter()
+        for word in words:
+            index.suggest(word)
+        self.assertLess((time.perf_counter() - start) / len(words), 0.001)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# This file tests the Translator class in translator.py
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import io
+import os
+import unittest
+
+from sceneprofile import record_profile
+from symbolizer import DEFAULT_VOCABULARY, symbolize_parallel
+import translator
+from translator import Translator
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples')
+
+
+def read_example(name):
+    with open(os.path.join(EXAMPLES_DIR, name + '.spl'), 'r') as spl_file:
+        return spl_file.read()
+
+
+TINY_PLAY = '''A tiny play.
+
+Romeo, a young man.
+Juliet, a young woman.
+
+Act I: The only act.
+
+Scene I: The only scene.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Thou art a {} cat. Speak your mind!
+
+[Exeunt]
+'''
+
+LONG_PLAY_SCENE = '''Scene {}: A scene.
+
+[Enter Romeo and Juliet]
+
+Juliet:
+ Thou art as good as the sum of a cat and thyself. Speak your mind! Am I better than you?
+ If so, let us proceed to scene {}.
+
+{}
+'''
+
+
+def long_play(scenes):
+    """:returns: A play with two acts of scenes, which have an [Exeunt] between most of them."""
+    numerals = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X', 'XI', 'XII']
+    spl = 'A long play.\n\nRomeo, a young man.\nJuliet, a young woman.\n\n'
+    for act in numerals[:2]:
+        spl += 'Act {}: An act.\n\n'.format(act)
+        for i in range(scenes):
+            exits = '[Exeunt]' if i % 3 else '[Exit Romeo]\n\n[Exit Juliet]'
+            spl += LONG_PLAY_SCENE.format(numerals[i], numerals[min(i + 1, scenes - 1)], exits)
+    return spl
+
+
+class TestTranslator(unittest.TestCase):
+
+    def test_matches_module_translate(self):
+        spl = read_example('hello-world')
+        self.assertEqual(Translator().translate(spl, 'Hello'), translator.translate(spl, 'Hello'))
+
+    def test_translate_to_matches_translate(self):
+        spl = read_example('primes')
+        out = io.StringIO()
+        Translator().translate_to(spl, 'Primes', out)
+        self.assertEqual(out.getvalue(), translator.translate(spl, 'Primes'))
+
+    def test_shared_between_threads(self):
+        shared = Translator()
+        jobs = [(read_example(name), 'Play%d' % i)
+                for i, name in enumerate(['hello-world', 'primes', 'reverse', 'test'] * 8)]
+        expected = [translator.translate(spl, name) for spl, name in jobs]
+        with ThreadPoolExecutor(4) as pool:
+            self.assertEqual(shared.translate_many(jobs, pool), expected)
+
+    def test_extra_words(self):
+        spl = TINY_PLAY.format('splendiferous')
+        # "splendiferous" isn't an adjective, so it's ignored
+        self.assertIn('Romeo = 1;', translator.translate(spl, 'Tiny'))
+
+        custom = Translator(extra_words={'adjectives': ['splendiferous']})
+        self.assertIn('Romeo = (2*1);', custom.translate(spl, 'Tiny'))
+
+        # the default vocabulary is untouched
+        self.assertNotIn('splendiferous', DEFAULT_VOCABULARY.words)
+        self.assertIn('Romeo = 1;', translator.translate(spl, 'Tiny'))
+
+    def test_unknown_wordlist_raises(self):
+        with self.assertRaises(ValueError):
+            Translator(extra_words={'verbs': ['run']})
+
+    def test_parallel_front_end_matches_serial(self):
+        spl = long_play(12)
+        symbols = Translator().symbolize(spl)
+        expected = ''.join(translator.emit(translator.parse_play(symbols), 'Long'))
+        with ProcessPoolExecutor(2) as pool:
+            for chunk_size in (50, 200, 1000):
+                self.assertEqual(symbolize_parallel(spl, pool, chunk_size=chunk_size), symbols)
+            for segment_size in (10, 40, 150):
+                play = translator.parse_play(symbols, pool, segment_size)
+                self.assertEqual(''.join(translator.emit(play, 'Long')), expected)
+
+    def test_parallel_parse_reports_first_error(self):
+        # Juliet speaks alone in act I scene VIII, and there are two scene Xs in act II
+        scenes = long_play(12).split('[Enter Romeo and Juliet]')
+        scenes[8] = '[Enter Juliet]'.join(scenes[7:9])
+        del scenes[7]
+        spl = '[Enter Romeo and Juliet]'.join(scenes).replace('Scene XI:', 'Scene X:')
+        symbols = Translator().symbolize(spl)
+        with self.assertRaises(translator.SplError) as serial:
+            translator.parse_play(symbols)
+        with ProcessPoolExecutor(2) as pool, self.assertRaises(translator.SplError) as parallel:
+            translator.parse_play(symbols, pool, 10)
+        self.assertEqual(parallel.exception.args, serial.exception.args)
+
+    def test_deeply_nested_expression(self):
+        # far deeper than Python's recursion limit
+        spl = read_example('hello-world').replace('You lying stupid', 'You ' + 'big ' * 5000 + 'lying stupid', 1)
+        java = translator.translate(spl, 'Deep')
+        self.assertIn('Romeo = ' + '(2*' * 5006 + '-1' + ')' * 5006 + ';', java)
+        self.assertIn('Romeo = ' + 'spl_mul(2, ' * 5006 + '(-1)' + ')' * 5006 + ';',
+                      translator.translate(spl, 'Deep', target='c'))
+
+    def test_deeply_nested_expression_options(self):
+        # every pass after parsing copes too, with deep questions as well as assignments
+        zero = 'the product of nothing and a ' + 'big ' * 3000 + 'cat'
+        spl = read_example('primes').replace('me as good as\n nothing?', 'me as good as\n %s?' % zero, 1)
+        spl = spl.replace('Am I better than you?', 'Am I better than the sum of you and %s?' % zero, 1)
+        play = translator.Translator().parse(spl)
+        profile = record_profile(play, '30\n')
+        self.assertEqual(profile.entries['act2scene3'], 10) # the same as without the deep expressions
+        for options in ({'cse': True}, {'precompute': True}, {'profile': profile}, {'structured': True},
+                        {'promote_stacks': True}, {'character_arrays': True}, {'reentrant': True}):
+            for target in ('java', 'c'):
+                translator.translate(spl, 'Deep', target=target, **options)
+
+    def test_expression_errors(self):
+        spl = read_example('hello-world')
+        for old, new, message in ((' and thyself', '', 'Expected "and" separating two addends of sum.'),
+                                  ('and thyself', 'and Macbeth', 'Macbeth is not in this program!'),
+                                  ('the sum of yourself', 'the remainder of yourself',
+                                   '"Quotient" must appear after "remainder".')):
+            with self.assertRaises(translator.SplError) as error:
+                translator.translate(spl.replace(old, new, 1), 'Broken')
+            self.assertEqual(error.exception.args[0], message)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,20 @@
 Does the bulk of the translation work in the SPL -> Java translator.
 """
 
-from splerror import SplError
+from cemitter import emit_c
+from codesize import HUGE_METHOD_LIMIT
+from cse import eliminate_common_subexpressions
+from diagnostics import SourceMap, locate
+from instrumentation import timed
+import interpreter
+from javaemitter import emit_java
+from play import *
+from sceneprofile import layout_methods, order_jumps
+from splerror import LimitError, SplError, SplErrors
+import stackslots
+from suggestions import suggest_words
 from symbolizer import *
+from types import SimpleNamespace
 
 
 def skip_as(symbols, symidx):
@@ -50,11 +62,13 @@ def read_characters(symbols, symidx):
     Read the list of characters from the symbols.
     :param symbols: The list of symbols.
     :param symidx: The index into the list of symbols.
-    :returns: A list of characters, and the new symidx.
+    :returns: A dict mapping each character to its number, in the order they were declared (so
+        checking whether a name is a character takes the same time however big the cast is), and
+        the new symidx.
     :raises SplError: if it's in a bad format or there are duplicate characters.
     """
     
-    characters = []
+    characters = {}
     
     try:
         while symbols[symidx][0] != SYM_ACT:
@@ -65,7 +79,7 @@ def read_characters(symbols, symidx):
             character = symbols[symidx][1]
             if character in characters:
                 raise SplError('Duplicate characters are not allowed.')
-            characters.append(character)
+            characters[character] = len(characters)
             symidx += 1
 
             # there then has to be a comma
@@ -134,7 +148,7 @@ def parse_stage_direction(symbols, symidx, characters, stage):
     Parse a stage direction, making the necessary modifications to the stage.
     :param symbols: The list of symbols.
     :param symidx: The index into the list of symbols.
-    :param characters: The list of characters in the program.
+    :param characters: The dict of characters in the program (see read_characters()).
     :param stage: The set representing which characters are currently on stage.
     :returns: The stage and the symidx.
     :raises SplError: If there is an error.
@@ -220,7 +234,7 @@ def parse_character_line_start(symbols, symidx, characters, stage):
     Parse the start of a character's line (e.g. "Juliet:").
     :param symbols: The list of symbols.
     :param symidx: The index into the list of symbols.
-    :param characters: The list of characters in the program.
+    :param characters: The dict of characters in the program (see read_characters()).
     :param stage: The characters on stage.
     :returns: symidx, speaker, other character (being spoken to).
     :raises SplError: if there is an error.
@@ -248,118 +262,77 @@ def parse_character_line_start(symbols, symidx, characters, stage):
     return symidx, speaker, spoken_to
 
 
-def parse_expr_prefix(fmt_str, symbols, symidx, characters, speaker, spoken_to):
-    # e.g. "twice", "half"
-    symidx, java = parse_expression(symbols, symidx + 1, characters, speaker, spoken_to)
-    return symidx, fmt_str.format(java)
-
-def parse_expr_operator(fmt_str, symbols, symidx, characters, speaker, spoken_to):
-    # e.g. "sum", "difference"
-    symidx, expr1 = parse_expression(symbols, symidx + 1, characters, speaker, spoken_to)
-        
-    # there must be "and" separating them
-    if symbols[symidx][0] != SYM_AND:
-        raise SplError('Expected "and" separating two addends of sum.')
-
-    symidx, expr2 = parse_expression(symbols, symidx + 1, characters, speaker, spoken_to)
-    return symidx, fmt_str.format(expr1, expr2)
-
-
-def parse_expression(symbols, symidx, characters, speaker, spoken_to):
+# symbols starting an expression with one operand, e.g. "twice", "half"
+PREFIX_EXPRS = {
+    SYM_TWICE: EXPR_TWICE, # twice, adjectives = (2*x)
+    SYM_ADJECTIVE: EXPR_TWICE,
+    SYM_THRICE: EXPR_THRICE, # thrice = (3*x)
+    SYM_SQUARE: EXPR_SQUARE, # square = Math.pow(x, 2)
+    SYM_CUBE: EXPR_CUBE, # cube = Math.pow(x, 3)
+    SYM_SQUARE_ROOT: EXPR_SQUARE_ROOT, # square root = Math.sqrt(x)
+    SYM_CUBE_ROOT: EXPR_CUBE_ROOT, # cube root = Math.cbrt(x)
+    SYM_HALF: EXPR_HALF, # half = (x/2)
+}
+
+# symbols starting an expression with two operands separated by "and", e.g. "sum", "difference"
+OPERATOR_EXPRS = {
+    SYM_SUM: EXPR_SUM, # sum: (x + y)
+    SYM_DIFFERENCE: EXPR_DIFFERENCE, # difference: (x - y)
+    SYM_PRODUCT: EXPR_PRODUCT, # product: (x * y)
+    SYM_QUOTIENT: EXPR_QUOTIENT, # quotient: (x / y)
+    SYM_REMAINDER: EXPR_REMAINDER, # remainder of the quotient: (x % y)
+}
+
+# constant nouns
+NOUN_VALUES = {
+    SYM_POSITIVE_NOUN: 1,
+    SYM_NEGATIVE_NOUN: -1,
+    SYM_ZERO: 0,
+}
+
+
+def parse_operand(symbols, symidx, characters, speaker, spoken_to):
     """
-    Parse an SPL expression into Java code.
-    E.g. "sum of a large green cat and the difference between Romeo and a woman" -> "((2 * (2 * 1)) + (Romeo - 1))"
-    :param symbols: The list of symbols.
-    :param symidx: The index into the list of symbols.
-    :param characters: The list of characters.
-    :param speaker: The character speaking.
-    :param spoken_to: The character being spoken to.
-    :returns: symidx, and the generated Java code representing that expression.
+    Parse the next operand of an SPL expression: either the start of an expression with
+    operands (e.g. "twice", "the sum of"), or a whole expression without any (e.g. "Romeo").
+    :returns: symidx, and either the expression or the expression type of the operator.
     :raises SplError: if there is an error.
     """
 
     if symidx >= len(symbols):
         raise SplError('Expression exceeded length of program.')
+    sym_type = symbols[symidx][0]
 
-    if symbols[symidx][0] == SYM_TWICE or symbols[symidx][0] == SYM_ADJECTIVE:
-        # twice, adjectives = (2*x)
-        return parse_expr_prefix('(2*{})', symbols, symidx, characters, speaker, spoken_to)
-    
-    elif symbols[symidx][0] == SYM_THRICE:
-        # thrice = (3*x)
-        return parse_expr_prefix('(3*{})', symbols, symidx, characters, speaker, spoken_to)
-    
-    elif symbols[symidx][0] == SYM_SQUARE:
-        # square = Math.pow(x, 2)
-        return parse_expr_prefix('((int) Math.pow({}, 2))', symbols, symidx, characters, speaker, spoken_to)
-    
-    elif symbols[symidx][0] == SYM_CUBE:
-        # cube = Math.pow(x, 3)
-        return parse_expr_prefix('((int) Math.pow({}, 3))', symbols, symidx, characters, speaker, spoken_to)
-    
-    elif symbols[symidx][0] == SYM_SQUARE_ROOT:
-        # square root = Math.sqrt(x)
-        return parse_expr_prefix('((int) Math.sqrt({}))', symbols, symidx, characters, speaker, spoken_to)
+    if sym_type in PREFIX_EXPRS:
+        return symidx + 1, PREFIX_EXPRS[sym_type]
 
-    elif symbols[symidx][0] == SYM_CUBE_ROOT:
-        # cube root = Math.cbrt(x)
-        return parse_expr_prefix('((int) Math.cbrt({}))', symbols, symidx, characters, speaker, spoken_to)
-    
-    elif symbols[symidx][0] == SYM_HALF:
-        # half = (x/2)
-        return parse_expr_prefix('({}/2)', symbols, symidx, characters, speaker, spoken_to)
-    
-    elif symbols[symidx][0] == SYM_1ST_PERSON_PRONOUN:
+    elif sym_type in OPERATOR_EXPRS:
+        if sym_type == SYM_REMAINDER:
+            # there must be "quotient" first
+            symidx += 1
+            if symbols[symidx][0] != SYM_QUOTIENT:
+                raise SplError('"Quotient" must appear after "remainder".')
+        return symidx + 1, OPERATOR_EXPRS[sym_type]
+
+    elif sym_type == SYM_1ST_PERSON_PRONOUN:
         # first person pronouns = the speaker
-        return symidx + 1, speaker
-    
-    elif symbols[symidx][0] == SYM_2ND_PERSON_PRONOUN:
+        return symidx + 1, (EXPR_CHARACTER, speaker)
+
+    elif sym_type == SYM_2ND_PERSON_PRONOUN:
         # second person pronouns = the person being spoken to
-        return symidx + 1, spoken_to
-    
-    elif symbols[symidx][0] == SYM_CHARACTER:
+        return symidx + 1, (EXPR_CHARACTER, spoken_to)
+
+    elif sym_type == SYM_CHARACTER:
         # characters = that character
         if symbols[symidx][1] not in characters:
             raise SplError(symbols[symidx][1] + ' is not in this program!')
-        return symidx + 1, symbols[symidx][1]
-    
-    elif symbols[symidx][0] == SYM_POSITIVE_NOUN:
-        # positive nouns = 1
-        return symidx + 1, '1'
-    
-    elif symbols[symidx][0] == SYM_NEGATIVE_NOUN:
-        # negative nouns = -1
-        return symidx + 1, '-1'
-
-    elif symbols[symidx][0] == SYM_ZERO:
-        # zero: 0
-        return symidx + 1, '0'
-    
-    elif symbols[symidx][0] == SYM_SUM:
-        # sum: (x + y)
-        return parse_expr_operator('({} + {})', symbols, symidx, characters, speaker, spoken_to)
-
-    elif symbols[symidx][0] == SYM_DIFFERENCE:
-        # difference: (x - y)
-        return parse_expr_operator('({} - {})', symbols, symidx, characters, speaker, spoken_to)
-
-    elif symbols[symidx][0] == SYM_PRODUCT:
-        # product: (x * y)
-        return parse_expr_operator('({} * {})', symbols, symidx, characters, speaker, spoken_to)
+        return symidx + 1, (EXPR_CHARACTER, symbols[symidx][1])
 
-    elif symbols[symidx][0] == SYM_QUOTIENT:
-        # quotient: (x / y)
-        return parse_expr_operator('({} / {})', symbols, symidx, characters, speaker, spoken_to)
+    elif sym_type in NOUN_VALUES:
+        # positive nouns = 1, negative nouns = -1, zero = 0
+        return symidx + 1, (EXPR_CONSTANT, NOUN_VALUES[sym_type])
 
-    elif symbols[symidx][0] == SYM_REMAINDER:
-        # remainder of the quotient: (x % y)
-        # there must be "quotient" first
-        symidx += 1
-        if symbols[symidx][0] != SYM_QUOTIENT:
-            raise SplError('"Quotient" must appear after "remainder".')
-        return parse_expr_operator('({} % {})', symbols, symidx, characters, speaker, spoken_to)
-
-    elif symbols[symidx][0] == SYM_END_PUNCTUATION:
+    elif sym_type == SYM_END_PUNCTUATION:
         # ended prematurely: give a more useful error
         raise SplError('Expression ended too soon: did you use an unknown noun/adjective/etc?')
 
@@ -368,15 +341,61 @@ def parse_expression(symbols, symidx, characters, speaker, spoken_to):
         raise SplError('Unknown symbol in expression: ' + str(symbols[symidx]))
 
 
-def parse_assignment(symbols, symidx, characters, speaker, spoken_to):
+def parse_expression(symbols, symidx, characters, speaker, spoken_to, limits=None):
+    """
+    Parse an SPL expression into an expression tuple (see play.py).
+    E.g. "sum of a large green cat and the difference between Romeo and a woman" ->
+    (EXPR_SUM, (EXPR_TWICE, (EXPR_TWICE, (EXPR_CONSTANT, 1))), (EXPR_DIFFERENCE, (EXPR_CHARACTER, 'Romeo'), (EXPR_CONSTANT, 1)))
+    It's parsed with a stack of the operators still waiting for operands rather than by
+    recursion, so there's no limit on how deeply expressions can be nested. Nothing after parsing
+    recurses on expressions either (see e.g. play.subexpressions()).
+    :param symbols: The list of symbols.
+    :param symidx: The index into the list of symbols.
+    :param characters: The dict of characters (see read_characters()).
+    :param speaker: The character speaking.
+    :param spoken_to: The character being spoken to.
+    :param limits: Optional Limits on how deeply the expression can be nested.
+    :returns: symidx, and the expression.
+    :raises SplError: if there is an error.
+    """
+
+    pending = [] # [expression type, operands parsed so far] for each operator waiting for operands
+
+    while True:
+        symidx, operand = parse_operand(symbols, symidx, characters, speaker, spoken_to)
+        if not isinstance(operand, tuple):
+            pending.append([operand, []])
+            if limits is not None:
+                limits.check_expression_depth(len(pending))
+            continue
+
+        # give the finished expression to the operators waiting for it, innermost first
+        expr = operand
+        while pending:
+            expr_type, operands = pending[-1]
+            operands.append(expr)
+            if expr_type in BINARY_EXPRS and len(operands) == 1:
+                # there must be "and" separating them
+                if symbols[symidx][0] != SYM_AND:
+                    raise SplError('Expected "and" separating two addends of sum.')
+                symidx += 1
+                break
+            pending.pop()
+            expr = (expr_type,) + tuple(operands)
+        else:
+            return symidx, expr
+
+
+def parse_assignment(symbols, symidx, characters, speaker, spoken_to, limits=None):
     """
     Parse an assignment - starting with a 2nd person pronoun. E.g. "Thou art as beautiful as a rose".
     :param symbols: The list of symbols.
     :param symidx: The index into the list of symbols.
-    :param characters: The list of characters.
+    :param characters: The dict of characters (see read_characters()).
     :param speaker: The character speaking.
     :param spoken_to: The character being spoken to (assigned to).
-    :returns: symidx, the generated Java code.
+    :param limits: Optional Limits on the expression: see parse_expression().
+    :returns: symidx, the assignment statement.
     :raises SplError: if there is an error.
     """
 
@@ -394,27 +413,27 @@ def parse_assignment(symbols, symidx, characters, speaker, spoken_to):
         symidx = skip_as(symbols, symidx)
 
     # expression
-    symidx, expr = parse_expression(symbols, symidx, characters, speaker, spoken_to)
+    symidx, expr = parse_expression(symbols, symidx, characters, speaker, spoken_to, limits)
 
     # then end punctuation
     if symbols[symidx][0] != SYM_END_PUNCTUATION:
         raise SplError('End punctuation expected after assignment.')
     symidx += 1
 
-    java = spoken_to + ' = ' + expr + ';'
-    return symidx, java
+    return symidx, (STMT_ASSIGN, spoken_to, expr)
 
 
-def parse_question(symbols, symidx, characters, speaker, spoken_to, stage):
+def parse_question(symbols, symidx, characters, speaker, spoken_to, stage, limits=None):
     """
-    Parse a question and the subsequent "if so," and translate into an if statement.
+    Parse a question and the subsequent "if so," into the condition of an if statement.
     :param symbols: The list of symbols.
     :param symidx: The index into the list of symbols.
-    :param characters: The list of characters.
+    :param characters: The dict of characters (see read_characters()).
     :param speaker: The character speaking.
     :param spoken_to: The character being spoken to (assigned to).
     :param stage: The set of characters on stage.
-    :returns: symidx, speaker, spoken_to, the generated Java code (this could possibly change
+    :param limits: Optional Limits on the expressions: see parse_expression().
+    :returns: symidx, speaker, spoken_to, the condition (this could possibly change
         the speaker/spoken_to if there's a new character line in the middle).
     :raises SplError: if there is an error.
     """
@@ -425,25 +444,25 @@ def parse_question(symbols, symidx, characters, speaker, spoken_to, stage):
     symidx += 1
 
     # expression, then greater than/worse than/as...as, then expression
-    symidx, expr1 = parse_expression(symbols, symidx, characters, speaker, spoken_to)
+    symidx, expr1 = parse_expression(symbols, symidx, characters, speaker, spoken_to, limits)
 
     if symbols[symidx][0] == SYM_AS:
         symidx = skip_as(symbols, symidx)
-        op = '=='
+        op = COMPARE_EQUAL
     elif symbols[symidx][0] == SYM_GREATER_THAN:
         if symbols[symidx+1][0] == SYM_ADJECTIVE:
             symidx += 1 # skip adjective in case of "more"
-        op = '>'
+        op = COMPARE_GREATER
         symidx += 1
     elif symbols[symidx][0] == SYM_LESS_THAN:
         if symbols[symidx+1][0] == SYM_ADJECTIVE:
             symidx += 1 # skip adjective in case of "less"
-        op = '<'
+        op = COMPARE_LESS
         symidx += 1
     else:
         raise SplError('Expression in question must be followed by greater than/less than symbol or as ... as.')
 
-    symidx, expr2 = parse_expression(symbols, symidx, characters, speaker, spoken_to)
+    symidx, expr2 = parse_expression(symbols, symidx, characters, speaker, spoken_to, limits)
 
     # then a question mark
     if symbols[symidx][0] != SYM_QUESTION_MARK:
@@ -465,8 +484,7 @@ def parse_question(symbols, symidx, characters, speaker, spoken_to, stage):
     symidx += 1
 
     # maybe invert it depending on "if so" vs "if not"
-    fmt_str = 'if ({} {} {})' if if_type == SYM_IF_SO else 'if (!({} {} {}))'
-    return symidx, speaker, spoken_to, fmt_str.format(expr1, op, expr2)
+    return symidx, speaker, spoken_to, (op, expr1, expr2, if_type == SYM_IF_NOT)
 
 
 def parse_jump(symbols, symidx):
@@ -503,20 +521,385 @@ def parse_jump(symbols, symidx):
     return symidx, jump_type, jump_dest
 
 
-def translate(spl, java_classname):
+class ParserState:
+    """Everything parse_section() keeps track of from one statement to the next."""
+
+    def __init__(self, act_counter=0, scene_counter=0, stage=None, speaker=None, spoken_to=None,
+                 conditions=None, last_was_if=False, need_new_method=False):
+        self.act_counter = act_counter
+        self.scene_counter = scene_counter
+        self.stage = stage if stage is not None else set()
+        self.speaker = speaker
+        self.spoken_to = spoken_to
+        self.conditions = conditions if conditions is not None else [] # questions waiting for the statement they guard
+        self.last_was_if = last_was_if # to prevent the "unreachable code" error
+        self.need_new_method = need_new_method
+
+    def copy(self):
+        return ParserState(self.act_counter, self.scene_counter, set(self.stage), self.speaker, self.spoken_to,
+                           list(self.conditions), self.last_was_if, self.need_new_method)
+
+    def __eq__(self, other):
+        return vars(self) == vars(other)
+
+
+def parse_section(symbols, symidx, end, characters, state, methods, limits=None):
     """
-    This is the main entry point for actual SPL to Java translation.
-    :param spl: The SPL code.
-    :param java_classname: The name of the output Java class.
-    :returns: The translated Java code.
+    Parse statements, acts and scenes until reaching end (or the first statement boundary after it).
+    :param symbols: The list of symbols, without any SYM_IGNOREs.
+    :param symidx: The index of the first symbol to parse.
+    :param end: The index to stop at.
+    :param characters: The dict of characters in the play (see read_characters()).
+    :param state: The ParserState, which is updated.
+    :param methods: The list of Methods so far, which new acts and scenes are added to. Statements are
+        added to the last one.
+    :param limits: Optional Limits on the expressions, the number of acts and scenes and the time taken.
+    :returns: The symidx parsing stopped at.
     :raises SplError: If there is an error in the SPL code.
     """
 
-    tokens = tokenize(spl)
-    symbols = symbolize(tokens)
+    method = methods[-1]
+    conditions = state.conditions
+
+    def add_statement(statement):
+        # guard the statement with any questions before it, innermost last
+        for condition in reversed(conditions):
+            statement = (STMT_IF, condition, statement)
+        conditions.clear()
+        method.statements.append(statement)
 
-    # filter ignored symbols
-    symbols = list(filter(lambda s: s[0] != SYM_IGNORE, symbols))
+    statement_start = symidx
+    try:
+        while symidx < end:
+            statement_start = symidx
+            symbol = symbols[symidx][0]
+            if limits is not None:
+                limits.check_deadline()
+
+            if symbol == SYM_ACT or symbol == SYM_SCENE:
+                # starting a new act or scene
+                name, symidx, counter = parse_header(symbols, symidx, symbol, state.act_counter, state.scene_counter)
+
+                if symbol == SYM_ACT:
+                    state.act_counter = counter
+                    state.scene_counter = 0 # reset scene counter
+                else:
+                    state.scene_counter = counter
+
+                # go on to the new method from the previous one (if it wouldn't cause an error), then start the new one
+                if not state.need_new_method:
+                    add_statement((STMT_NEXT, name))
+                method = Method(name)
+                methods.append(method)
+                if limits is not None:
+                    limits.check_sections(len(methods) - 1) # not counting main
+
+                state.need_new_method = False
+
+            elif symbol == SYM_OPEN_STAGE_DIRECTION:
+                # stage direction
+                state.stage, symidx = parse_stage_direction(symbols, symidx, characters, state.stage)
+                # reset speaker and spoken_to so stage directions can't be in middle of line
+                state.speaker = state.spoken_to = None
+
+            elif symbol == SYM_CHARACTER and symbols[symidx+1][0] == SYM_COLON:
+                # character's line start (e.g. "Juliet:")
+                if state.act_counter == 0 or state.scene_counter == 0:
+                    raise SplError('A character cannot speak outside of an act and scene.')
+                symidx, state.speaker, state.spoken_to = parse_character_line_start(symbols, symidx, characters,
+                                                                                    state.stage)
+
+            elif symbol == SYM_2ND_PERSON_PRONOUN:
+                # assigning to the spoken_to character
+                validate_line(state.speaker, state.spoken_to)
+                symidx, assignment = parse_assignment(symbols, symidx, characters, state.speaker, state.spoken_to,
+                                                      limits)
+                add_statement(assignment)
+
+            elif symbol == SYM_ASSIGNMENT:
+                # question
+                validate_line(state.speaker, state.spoken_to)
+                symidx, state.speaker, state.spoken_to, condition = parse_question(
+                    symbols, symidx, characters, state.speaker, state.spoken_to, state.stage, limits)
+                conditions.append(condition)
+
+            elif symbol == SYM_JUMP:
+                # jump to another scene - go there and never come back
+                validate_line(state.speaker, state.spoken_to)
+                symidx, act_or_scene, number = parse_jump(symbols, symidx)
+                if act_or_scene == SYM_ACT:
+                    target = 'act%d' % number
+                else:
+                    target = 'act%dscene%d' % (state.act_counter, number)
+                add_statement((STMT_JUMP, target))
+
+                if not state.last_was_if:
+                    state.need_new_method = True # it's a definite return
+
+            elif symbol == SYM_PUSH_TO_STACK:
+                # push to spoken_to's stack ("remember")
+                validate_line(state.speaker, state.spoken_to)
+                symidx = skip_till_end_punct(symbols, symidx)
+                add_statement((STMT_PUSH, state.spoken_to))
+
+            elif symbol == SYM_POP_FROM_STACK:
+                # pop from spoken_to's stack ("recall")
+                validate_line(state.speaker, state.spoken_to)
+                symidx = skip_till_end_punct(symbols, symidx)
+                add_statement((STMT_POP, state.spoken_to))
+
+            elif symbol == SYM_INPUT_NUMBER:
+                # input a number into spoken_to ("listen to your/thy heart")
+                validate_line(state.speaker, state.spoken_to)
+                symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "listen to your/thy heart".')
+                add_statement((STMT_INPUT_NUMBER, state.spoken_to))
+
+            elif symbol == SYM_INPUT_CHARACTER:
+                # input a character into spoken_to ("open your/thy mind")
+                validate_line(state.speaker, state.spoken_to)
+                symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "open your/thy mind".')
+                add_statement((STMT_INPUT_CHARACTER, state.spoken_to))
+
+            elif symbol == SYM_OUTPUT_NUMBER:
+                # output a number from spoken_to ("open your/thy heart")
+                validate_line(state.speaker, state.spoken_to)
+                symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "open your/thy heart".')
+                add_statement((STMT_OUTPUT_NUMBER, state.spoken_to))
+
+            elif symbol == SYM_OUTPUT_CHARACTER:
+                # output a character from spoken_to ("speak your/thy mind")
+                validate_line(state.speaker, state.spoken_to)
+                symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "speak your/thy mind".')
+                add_statement((STMT_OUTPUT_CHARACTER, state.spoken_to))
+
+            elif symbol == SYM_END_PUNCTUATION:
+                # ignore double punctuation like !!
+                symidx += 1 # just skip it
+
+            else:
+                # unknown symbol
+                raise SplError('Bad symbol at start of line; symbol=' + str(symbol))
+
+            state.last_was_if = (symbol == SYM_ASSIGNMENT)
+            if state.need_new_method and symbol not in (SYM_JUMP, SYM_END_PUNCTUATION):
+                # there was non-act/scene code after an unguarded jump
+                raise SplError('A jump unguarded by a question must be the last statement in its act or scene.')
+    except SplError as error:
+        # remember where the statement with the error started, for suggest_words()
+        if getattr(error, 'symidx', None) is None:
+            error.symidx = statement_start
+        raise
+
+    return symidx
+
+
+def is_line_start(symbols, symidx):
+    """:returns: True if the symbol at symidx starts a character's line (e.g. "Juliet:")."""
+    return symbols[symidx][0] == SYM_CHARACTER and symidx + 1 < len(symbols) and symbols[symidx+1][0] == SYM_COLON
+
+
+def is_header(symbols, symidx):
+    """:returns: True if the symbol at symidx starts an act or scene header (e.g. "Scene II:")."""
+    return (symbols[symidx][0] in (SYM_ACT, SYM_SCENE) and symidx + 2 < len(symbols)
+            and symbols[symidx+1][0] == SYM_ROMAN_NUMERAL and symbols[symidx+2][0] == SYM_COLON)
+
+
+def recover(symbols, symidx, state, methods):
+    """
+    Find where to carry on parsing after an error in the statement starting at symidx, skipping
+    what's left of it (panic mode), and put the ParserState back together so the error doesn't
+    cause others. An error in an act or scene header skips to the end of it, taking the act or
+    scene as started if it has a number; one in a stage direction, to the "]"; one in a character's
+    line start, to the next line; and one in a statement, to its end punctuation. It stops early
+    at the next stage direction, character's line or act or scene header.
+    :param symbols: The list of symbols, without any SYM_IGNOREs.
+    :param symidx: The index of the first symbol of the statement with the error.
+    :param state: The ParserState, which is updated.
+    :param methods: The list of Methods so far, which a new act or scene is added to.
+    :returns: The symidx to carry on from, which is after symidx.
+    """
+
+    symbol = symbols[symidx][0]
+    if symbol in (SYM_ACT, SYM_SCENE) and symidx + 1 < len(symbols) and symbols[symidx+1][0] == SYM_ROMAN_NUMERAL:
+        # carry on as if the act or scene started, so the ones after it aren't out of order
+        number = symbols[symidx+1][1]
+        if symbol == SYM_ACT:
+            state.act_counter, state.scene_counter = number, 0
+            name = 'act%d' % number
+        else:
+            state.scene_counter = number
+            name = 'act%dscene%d' % (state.act_counter, number)
+        methods.append(Method(name))
+        state.need_new_method = False
+        ends = (SYM_END_PUNCTUATION,)
+    elif symbol == SYM_OPEN_STAGE_DIRECTION:
+        ends = (SYM_CLOSE_STAGE_DIRECTION,)
+    elif is_line_start(symbols, symidx):
+        state.speaker = state.spoken_to = None
+        ends = ()
+    else:
+        ends = (SYM_END_PUNCTUATION,)
+
+    # a question guards nothing after an error, and a statement after a misplaced jump is only an error once
+    state.conditions.clear()
+    state.last_was_if = False
+    state.need_new_method = False
+
+    symidx += 1
+    while symidx < len(symbols):
+        if symbols[symidx][0] in ends:
+            return symidx + 1
+        if (symbols[symidx][0] == SYM_OPEN_STAGE_DIRECTION or is_line_start(symbols, symidx)
+                or is_header(symbols, symidx)):
+            return symidx
+        symidx += 1
+    return symidx
+
+
+PARALLEL_SEGMENT_SYMBOLS = 100000 # about how many symbols of a play each process parses at once
+
+MAX_DIAGNOSTICS = 100 # the most errors to find in a play before giving up on the rest
+
+
+def find_segments(symbols, symidx, segment_size=PARALLEL_SEGMENT_SYMBOLS):
+    """
+    Find places to split the acts and scenes of a play for parse_sections_parallel(). A segment
+    starts right after an act or scene header which comes right after an "[Exeunt]", so nobody is on
+    stage and nobody is speaking there no matter what came before, and the counters follow from the
+    headers before it. These are only guesses: a header could really be part of a bad statement.
+    :param symbols: The list of symbols, without any SYM_IGNOREs.
+    :param symidx: The index of the first symbol after the list of characters.
+    :param segment_size: The minimum number of symbols in a segment.
+    :returns: A list of (start, end, name of the method it's in, ParserState at start) tuples, where
+        the symbols between one segment's end and the next one's start are the next one's header.
+    """
+
+    exeunt = [(SYM_OPEN_STAGE_DIRECTION,), (SYM_STAGE_DIRECTION_EXEUNT,), (SYM_CLOSE_STAGE_DIRECTION,)]
+
+    segments = []
+    act_counter = 0
+    next_start = symidx + segment_size
+    for i in range(symidx, len(symbols) - 2):
+        symbol = symbols[i][0]
+        if (symbol != SYM_ACT and symbol != SYM_SCENE) or symbols[i+1][0] != SYM_ROMAN_NUMERAL \
+                or symbols[i-1][0] not in (SYM_END_PUNCTUATION, SYM_CLOSE_STAGE_DIRECTION):
+            continue
+
+        number = symbols[i+1][1]
+        if symbol == SYM_ACT:
+            act_counter = number
+        if i < next_start or symbols[i-3:i] != exeunt:
+            continue
+
+        try:
+            start = symbols.index((SYM_END_PUNCTUATION,), i) + 1
+        except ValueError:
+            break
+        if segments:
+            segments[-1][1] = i
+        if symbol == SYM_ACT:
+            segments.append([start, None, 'act%d' % number, ParserState(number, 0)])
+        else:
+            segments.append([start, None, 'act%dscene%d' % (act_counter, number), ParserState(act_counter, number)])
+        next_start = start + segment_size
+
+    if segments:
+        segments[-1][1] = len(symbols)
+    return [tuple(segment) for segment in segments]
+
+
+def parse_segment(symbols, characters, name, state, limits=None):
+    """
+    Parse a segment from find_segments(), e.g. in another process.
+    :param symbols: The symbols of the segment.
+    :param characters: The dict of characters in the play (see read_characters()).
+    :param name: The name of the act or scene the segment starts in.
+    :param state: The ParserState at the start of the segment.
+    :param limits: Optional Limits, as in parse_section().
+    :returns: The list of Methods parsed, starting with the one it starts in, and the ParserState at
+        the end; or None if it couldn't be parsed on its own, in which case it has to be parsed along
+        with what comes before it (which also reports any SplError in the right order).
+    """
+
+    methods = [Method(name)]
+    try:
+        if parse_section(symbols, 0, len(symbols), characters, state, methods, limits) != len(symbols):
+            return None # the last statement goes on into the next segment
+    except (SplError, IndexError):
+        return None
+    return methods, state
+
+
+def parse_sections_parallel(symbols, symidx, characters, state, methods, executor,
+                            segment_size=PARALLEL_SEGMENT_SYMBOLS, limits=None):
+    """
+    Parse the acts and scenes of a play like parse_section(), in segments in parallel. Each segment is
+    parsed from the state find_segments() guesses for it. Everything from the start to the first
+    segment, and each segment's header, is parsed here in order; if the state after a header isn't
+    the guessed one, the segment is parsed again here too. So the result is always the same as
+    parse_section()'s.
+    :param symbols: The list of symbols, without any SYM_IGNOREs.
+    :param symidx: The index of the first symbol after the list of characters.
+    :param characters: The dict of characters in the play (see read_characters()).
+    :param state: The ParserState, which is updated.
+    :param methods: The list of Methods so far, which new acts and scenes are added to.
+    :param executor: A concurrent.futures.Executor, e.g. a ProcessPoolExecutor.
+    :param segment_size: The minimum number of symbols in a segment.
+    :param limits: Optional Limits, as in parse_section().
+    :raises SplError: If there is an error in the SPL code.
+    """
+
+    segments = find_segments(symbols, symidx, segment_size)
+    futures = [executor.submit(parse_segment, symbols[start:end], characters, name, guess.copy(), limits)
+               for start, end, name, guess in segments]
+
+    try:
+        for (start, end, name, guess), future in zip(segments, futures):
+            # everything up to the segment, including its header
+            symidx = parse_section(symbols, symidx, start, characters, state, methods, limits)
+            result = future.result()
+            if result is None or symidx != start or state != guess or methods[-1].name != name:
+                continue # parse it with the next one instead
+
+            segment_methods, segment_state = result
+            methods[-1].statements += segment_methods[0].statements
+            methods += segment_methods[1:]
+            state.__dict__.update(vars(segment_state))
+            symidx = end
+            if limits is not None:
+                limits.check_sections(len(methods) - 1)
+
+        parse_section(symbols, symidx, len(symbols), characters, state, methods, limits)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def parse_play_sections(symbols, symidx, characters, state, methods, executor, segment_size, limits):
+    """Parse the acts and scenes of a play from symidx to the end, in parallel if it's big enough and there's an executor."""
+    if executor is not None and len(symbols) - symidx >= 2 * segment_size:
+        parse_sections_parallel(symbols, symidx, characters, state, methods, executor, segment_size, limits)
+    else:
+        parse_section(symbols, symidx, len(symbols), characters, state, methods, limits)
+
+
+def parse_play(symbols, executor=None, segment_size=PARALLEL_SEGMENT_SYMBOLS, limits=None, diagnostics=None,
+               max_diagnostics=MAX_DIAGNOSTICS):
+    """
+    Parse the symbols of a whole play.
+    :param symbols: The list of symbols, without any SYM_IGNOREs.
+    :param executor: An optional concurrent.futures.Executor to parse the acts and scenes of a big
+        play in parallel with (see parse_sections_parallel()).
+    :param segment_size: The minimum number of symbols each process parses, if there's an executor.
+    :param limits: Optional Limits on the expressions, the number of acts and scenes and the time taken.
+    :param diagnostics: An optional list. If given, parsing carries on after an error in an act or
+        scene (see recover()), and every SplError found is added to it instead of raising the first;
+        the Play returned is then only good for finding more errors.
+    :param max_diagnostics: The most SplErrors to add to diagnostics: after that many, one saying so
+        is added and the rest of the play isn't checked.
+    :returns: The parsed Play.
+    :raises SplError: If there is an error in the SPL code (and no diagnostics list).
+    """
 
     if not symbols:
         # the file was empty? or nonsense?
@@ -529,161 +912,399 @@ def translate(spl, java_classname):
     # read the list of characters
     characters, symidx = read_characters(symbols, symidx)
 
-    # setup the act and scene counters + stage
-    act_counter = 0
-    scene_counter = 0
-    stage = set()
-
-    # start the Java generation
-    java = '''\
-// Generated by Ryan Dancy's SPL to Java translator.
-import java.util.ArrayDeque;
-import java.util.Deque;
-import java.util.Scanner;
-
-public class %s {
-\tprivate static Scanner scanner = new Scanner(System.in);
-''' % java_classname
-
-    # add the characters
-    for character in characters:
-        # there's a stack and a number for each character
-        java += '\tprivate static int %s;\n' % character
-        java += '\tprivate static Deque<Integer> %s_stk = new ArrayDeque<Integer>();\n' % character
-
-    # add the main method
-    java += '\tpublic static void main(String[] args) {\n\t\t'
-
-    speaker = None
-    spoken_to = None
-
-    # to make sure we don't jump to a nonexistent act/scene
-    acts_scenes_jumped_to = set() # set of (SYM_ACT/SYM_SCENE, act/scene number)
-
-    # to prevent the "unreachable code" error
-    last_was_if = False
-    need_new_method = False
-
-    # generate the rest of the code
-    while symidx != len(symbols):
-        symbol = symbols[symidx][0]
-        if DEBUG:
-            print('Translating: symbol =', symbol, 'symidx =', symidx, 'speaker =', speaker, 'spoken_to =', spoken_to)
-
-        if symbol == SYM_ACT or symbol == SYM_SCENE:
-            # starting a new act or scene
-            method, symidx, counter = parse_header(symbols, symidx, symbol, act_counter, scene_counter)
-
-            if symbol == SYM_ACT:
-                act_counter = counter
-                scene_counter = 0 # reset scene counter
-            else:
-                scene_counter = counter
+    # the main method comes first, then one for each act and scene
+    methods = [Method('main')]
+    state = ParserState()
+
+    # parse the rest of the play
+    if diagnostics is not None:
+        start = symidx
+        try:
+            parse_play_sections(symbols, symidx, characters, state, methods, executor, segment_size, limits)
+        except LimitError:
+            raise
+        except SplError:
+            # parse it again, carrying on after each error
+            methods = [Method('main')]
+            state = ParserState()
+            symidx = start
+            found = 0
+            while True:
+                try:
+                    parse_section(symbols, symidx, len(symbols), characters, state, methods, limits)
+                    break
+                except LimitError:
+                    raise
+                except SplError as error:
+                    diagnostics.append(error)
+                    found += 1
+                    if found >= max_diagnostics:
+                        # the jumps to acts and scenes not parsed yet would be errors too
+                        diagnostics.append(SplError('Stopped after %d errors.' % found))
+                        return Play(list(characters), methods)
+                    if limits is not None:
+                        limits.check_deadline()
+                    symidx = recover(symbols, error.symidx, state, methods)
+    else:
+        parse_play_sections(symbols, symidx, characters, state, methods, executor, segment_size, limits)
 
-            # call the new method from the previous one (if it wouldn't cause an error), then start the new one
-            if need_new_method:
-                java = java[:-1] # remove the last tab
-            else:
-                java += method + '();\n\t'
-            java += '}\n\t'
-            java += 'private static void ' + method + '() {\n\t\t'
-
-            need_new_method = False
-
-        elif symbol == SYM_OPEN_STAGE_DIRECTION:
-            # stage direction
-            stage, symidx = parse_stage_direction(symbols, symidx, characters, stage)
-            speaker = spoken_to = None # reset speaker and spoken_to so stage directions can't be in middle of line
-
-        elif symbol == SYM_CHARACTER and symbols[symidx+1][0] == SYM_COLON:
-            # character's line start (e.g. "Juliet:")
-            if act_counter == 0 or scene_counter == 0:
-                raise SplError('A character cannot speak outside of an act and scene.')
-            symidx, speaker, spoken_to = parse_character_line_start(symbols, symidx, characters, stage)
-
-        elif symbol == SYM_2ND_PERSON_PRONOUN:
-            # assigning to the spoken_to character
-            validate_line(speaker, spoken_to)
-            symidx, assignment = parse_assignment(symbols, symidx, characters, speaker, spoken_to)
-            java += assignment + '\n\t\t'
-
-        elif symbol == SYM_ASSIGNMENT:
-            # question
-            validate_line(speaker, spoken_to)
-            symidx, speaker, spoken_to, if_statement = parse_question(symbols, symidx, characters, speaker, spoken_to, stage)
-            java += if_statement + ' '
-
-        elif symbol == SYM_JUMP:
-            # jump to another scene - call the method then return
-            validate_line(speaker, spoken_to)
-            symidx, act_or_scene, number = parse_jump(symbols, symidx)
-            acts_scenes_jumped_to.add((act_or_scene, number))
-            
-            # in a block so that it can be used with if statements/questions
-            java += '{ %s%d(); return; }\n\t\t' % ('act' if act_or_scene == SYM_ACT else 'act%dscene' % act_counter, number)
-
-            if not last_was_if:
-                need_new_method = True # it's a definite return
-
-        elif symbol == SYM_PUSH_TO_STACK:
-            # push to spoken_to's stack ("remember")
-            validate_line(speaker, spoken_to)
-            symidx = skip_till_end_punct(symbols, symidx)
-            java += '{0}_stk.push({0});\n\t\t'.format(spoken_to)
+    errors = []
+    if state.conditions:
+        errors.append(SplError('A question must be followed by a statement for it to guard.'))
+
+    # validate the acts and scenes jumped to
+    names = {method.name for method in methods}
+    for method in methods:
+        for target in method_targets(method):
+            if target not in names:
+                errors.append(SplError('Jump to nonexistent act or scene: ' + target))
+                names.add(target) # only once
+    if errors and diagnostics is None:
+        raise errors[0]
+    elif errors:
+        diagnostics.extend(errors)
+
+    return Play(list(characters), methods)
 
-        elif symbol == SYM_POP_FROM_STACK:
-            # pop from spoken_to's stack ("recall")
-            validate_line(speaker, spoken_to)
-            symidx = skip_till_end_punct(symbols, symidx)
-            java += '{0} = {0}_stk.pop();\n\t\t'.format(spoken_to)
-
-        elif symbol == SYM_INPUT_NUMBER:
-            # input a number into spoken_to ("listen to your/thy heart")
-            validate_line(speaker, spoken_to)
-            symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "listen to your/thy heart".')
-            java += '{} = scanner.nextInt();\n\t\t'.format(spoken_to)
-
-        elif symbol == SYM_INPUT_CHARACTER:
-            # input a character into spoken_to ("open your/thy mind")
-            validate_line(speaker, spoken_to)
-            symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "open your/thy mind".')
-            java += '''try {{
-\t\t\t{0} = scanner.findInLine(".").charAt(0);
-\t\t}} catch (NullPointerException e) {{
-\t\t\t{0} = -1;
-\t\t}}
-\t\t'''.format(spoken_to)
-
-        elif symbol == SYM_OUTPUT_NUMBER:
-            # output a number from spoken_to ("open your/thy heart")
-            validate_line(speaker, spoken_to)
-            symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "open your/thy heart".')
-            java += 'System.out.print({});\n\t\t'.format(spoken_to)
-
-        elif symbol == SYM_OUTPUT_CHARACTER:
-            # output a character from spoken_to ("speak your/thy mind")
-            validate_line(speaker, spoken_to)
-            symidx = next_is(symbols, symidx + 1, SYM_END_PUNCTUATION, 'Expected end punctuation after "speak your/thy mind".')
-            java += 'System.out.print((char) {});\n\t\t'.format(spoken_to)
-
-        elif symbol == SYM_END_PUNCTUATION:
-            # ignore double punctuation like !!
-            symidx += 1 # just skip it
 
+# the languages that can be translated to, and the extension of their source files
+TARGETS = {'java': '.java', 'c': '.c'}
+
+
+def emit(play, java_classname, target='java', stats=None, structured=False, precompute=False, cse=False,
+         max_method_size=HUGE_METHOD_LIMIT, profile=None, limits=None, reentrant=False, bench=False,
+         character_arrays=False, promote_stacks=False):
+    """
+    Optimize a parsed play if asked to, then generate its code.
+    :param play: The parsed Play.
+    :param java_classname: The name of the output Java class (only used for Java).
+    :param target: The language to generate: 'java' or 'c'.
+    :param stats: An optional TranslationStats to fill with timings.
+    :param structured: For Java, generate loops in one method instead of a method per act and
+        scene calling each other (see javaemitter.emit_java()). C is always structured.
+    :param precompute: If True, or a number of steps, run the play up to its first input (or for
+        at most that many statements) at translation time and generate what it printed as one
+        output, starting from the state it got to (see interpreter.precompute()).
+    :param cse: If True, put expressions worked out more than once in an act or scene in locals
+        (see cse.py).
+    :param promote_stacks: If True, replace the stacks of characters which always have the same
+        number of things on them at each remember and recall with a field for each place in them
+        (see stackslots.py). The characters whose stacks were replaced are listed in stats.
+    :param max_method_size: For Java, the most bytes of bytecode to put in one method; bigger acts
+        and scenes are split into parts (see javaemitter.emit_java()). None for no limit.
+    :param profile: An optional ScenesProfile of a run of the play (see sceneprofile.py), used to
+        check the most taken of several exclusive jumps first and to lay out the hot acts and
+        scenes together, with the rest out of the way.
+    :param limits: Optional Limits on the size of the output and the time taken (see limits.py).
+    :param reentrant: For Java, generate a class whose instances each run the play with their own
+        characters, input and output, instead of one with static fields (see javaemitter.emit_java()).
+    :param bench: For Java, generate a reentrant class whose main() benchmarks the play, running it
+        many times on input replayed from a file (see javaemitter.emit_java()).
+    :param character_arrays: For Java, keep the characters' values and stacks in two arrays instead
+        of two fields per character, for plays with huge casts (see javaemitter.emit_java()).
+    :returns: A list of fragments of code which make up the program when joined.
+    :raises ValueError: if target isn't in TARGETS.
+    :raises LimitError: if it goes over one of the limits.
+    """
+
+    if target not in TARGETS:
+        raise ValueError('Unknown target language: ' + str(target))
+    if limits is not None:
+        limits = limits.start()
+        limits.check_deadline()
+
+    if precompute:
+        max_steps = interpreter.PRECOMPUTE_MAX_STEPS if precompute is True else precompute
+        max_output = interpreter.PRECOMPUTE_MAX_OUTPUT
+        if limits is not None and limits.max_output_size is not None:
+            max_output = min(max_output, limits.max_output_size)
+        with timed(stats, 'optimize'):
+            play = interpreter.precompute(play, max_steps=max_steps, max_output=max_output, limits=limits)
+        if limits is not None:
+            limits.check_deadline()
+
+    if profile is not None:
+        # before CSE, which only sets locals in the first question of a run
+        with timed(stats, 'optimize'):
+            play = order_jumps(play, profile)
+            if target == 'c':
+                play = layout_methods(play, profile)
+        if limits is not None:
+            limits.check_deadline()
+
+    if promote_stacks:
+        # before CSE, so the fields can be in locals like characters
+        with timed(stats, 'optimize'):
+            play = stackslots.promote_stacks(play, stats)
+        if limits is not None:
+            limits.check_deadline()
+
+    if cse:
+        with timed(stats, 'optimize'):
+            play = eliminate_common_subexpressions(play, stats)
+
+    if limits is not None:
+        limits.check_deadline()
+
+    with timed(stats, 'emit'):
+        if target == 'java':
+            method_sizes = stats.method_sizes if stats is not None else None
+            code = emit_java(play, java_classname, structured, max_method_size, method_sizes, profile=profile,
+                             reentrant=reentrant, bench=bench, character_arrays=character_arrays, limits=limits)
         else:
-            # unknown symbol
-            raise SplError('Bad symbol at start of line; symbol=' + str(symbol))
+            code = emit_c(play)
 
-        last_was_if = (symbol == SYM_ASSIGNMENT)
-        if need_new_method and symbol not in (SYM_JUMP, SYM_END_PUNCTUATION):
-            # there was non-act/scene code after an unguarded jump
-            raise SplError('A jump unguarded by a question must be the last statement in its act or scene.')
+    if limits is not None:
+        limits.check_output(sum(map(len, code)))
+        limits.check_deadline()
+    return code
 
-    # validate the acts and scenes jumped to
-    for act_or_scene, num in acts_scenes_jumped_to:
-        if act_or_scene == SYM_ACT and num > act_counter:
-            raise SplError('Jump to nonexistent act ' + num)
-        if act_or_scene == SYM_SCENE and num > scene_counter:
-            raise SplError('Jump to nonexistent scene ' + num)
 
-    return java[:-1] + '}\n}\n' # remove last "\t"
+class Translator:
+    """
+    A reusable SPL to Java translator. All of its state is a read-only Vocabulary, so one
+    Translator can be shared between any number of threads, and Translators with different
+    word lists can be used side by side without touching the module-level tables.
+    """
+
+    def __init__(self, vocabulary=None, wordlists_dir=None, extra_words=None):
+        """
+        :param vocabulary: The Vocabulary to use. If None, one is built from wordlists_dir and
+            extra_words, or DEFAULT_VOCABULARY is used if neither is given.
+        :param wordlists_dir: A directory of word lists to use instead of the default ones.
+        :param extra_words: A dict mapping word list names (e.g. 'adjectives', 'characters') to
+            iterables of extra words, as in symbolizer.read_wordlists().
+        """
+
+        if vocabulary is None:
+            if wordlists_dir is None and extra_words is None:
+                vocabulary = DEFAULT_VOCABULARY
+            else:
+                vocabulary = Vocabulary.from_wordlists(wordlists_dir or WORDLISTS_DIR, extra_words)
+        self.vocabulary = vocabulary
+
+    def symbolize(self, spl, stats=None, executor=None, limits=None):
+        """
+        Tokenize and symbolize SPL code with this translator's vocabulary.
+        :param spl: The SPL code.
+        :param stats: An optional TranslationStats to fill with timings and counters.
+        :param executor: An optional concurrent.futures.Executor, e.g. a ProcessPoolExecutor, to
+            tokenize and symbolize a big play in chunks in parallel with (see symbolize_parallel()).
+        :param limits: Optional Limits on the size of the code, its number of tokens and the time taken.
+        :returns: The list of symbols, without any SYM_IGNOREs.
+        :raises LimitError: if it goes over one of the limits.
+        """
+
+        if limits is not None:
+            limits = limits.start()
+            limits.check_input(spl)
+
+        if executor is not None and len(spl) >= 2 * PARALLEL_CHUNK_SIZE:
+            # tokenizing happens in the same processes, so it's all counted as symbolizing
+            counters = SimpleNamespace(tokens=0, ignored_tokens=0, multi_token_matches=0)
+            with timed(stats, 'symbolize'):
+                symbols = symbolize_parallel(spl, executor, counters, self.vocabulary)
+            if limits is not None:
+                limits.check_tokens(counters.tokens)
+                limits.check_deadline()
+            if stats is not None:
+                stats.tokens += counters.tokens
+                stats.ignored_tokens += counters.ignored_tokens
+                stats.multi_token_matches += counters.multi_token_matches
+        else:
+            with timed(stats, 'tokenize'):
+                tokens = tokenize(spl)
+            if limits is not None:
+                limits.check_tokens(len(tokens))
+                limits.check_deadline()
+
+            with timed(stats, 'symbolize'):
+                all_symbols = symbolize(tokens, stats, self.vocabulary, limits)
+
+                # filter ignored symbols
+                symbols = list(filter(lambda s: s[0] != SYM_IGNORE, all_symbols))
+
+            if stats is not None:
+                stats.tokens += len(tokens)
+                stats.ignored_tokens += len(all_symbols) - len(symbols)
+
+        return symbols
+
+    def parse(self, spl, stats=None, executor=None, limits=None, recover=False):
+        """
+        Tokenize, symbolize and parse SPL code.
+        :param spl: The SPL code.
+        :param stats: An optional TranslationStats to fill with timings and counters.
+        :param executor: An optional concurrent.futures.Executor to do each stage of a big play in
+            parallel with, e.g. a ProcessPoolExecutor. The result is the same either way.
+        :param limits: Optional Limits on the play and the time taken (see limits.py).
+        :param recover: If True, carry on parsing after an error to find every error in the play, and
+            raise them all at once as an SplErrors, with their lines and columns.
+        :returns: The parsed Play.
+        :raises SplError: If there is an error in the SPL code, or a LimitError if it goes over a limit. The
+            message suggests words for any unknown words in the statement with the error, and it has
+            the line and column of the statement if they're known.
+        """
+
+        if limits is not None:
+            limits = limits.start()
+        symbols = self.symbolize(spl, stats, executor, limits)
+
+        with timed(stats, 'parse'):
+            diagnostics = [] if recover else None
+            try:
+                play = parse_play(symbols, executor, limits=limits, diagnostics=diagnostics)
+            except SplError as error:
+                if not isinstance(error, LimitError):
+                    self.explain([error], spl, symbols, limits)
+                raise
+            if diagnostics:
+                self.explain(diagnostics, spl, symbols, limits)
+                raise SplErrors(diagnostics)
+
+        if stats is not None:
+            stats.expressions += count_expressions(play)
+        return play
+
+    def explain(self, errors, spl, symbols, limits=None):
+        """
+        Set the lines and columns of SplErrors from parsing (see diagnostics.locate()), and add
+        suggestions for any unknown words in the statements with them to their messages. If the
+        deadline of the limits passes first, the rest of the errors are left as they are.
+        :param errors: The SplErrors from parsing spl.
+        :param spl: The SPL code.
+        :param symbols: Its symbols, without any SYM_IGNOREs.
+        :param limits: Optional Limits whose deadline to check.
+        """
+
+        if all(getattr(error, 'symidx', None) is None for error in errors):
+            return
+        try:
+            source = SourceMap(spl, self.vocabulary, limits)
+            locate(errors, source)
+            for error in errors:
+                if getattr(error, 'symidx', None) is not None:
+                    if limits is not None:
+                        limits.check_deadline()
+                    # point out any misspelt words in the statement with the error
+                    hint = suggest_words(source, symbols, error.symidx, self.vocabulary)
+                    if hint:
+                        error.args = (error.args[0] + '\n' + hint,) + error.args[1:]
+        except LimitError:
+            # the errors are still worth reporting without any more help
+            pass
+
+    def translate_fragments(self, spl, java_classname, stats=None, executor=None, limits=None, recover=False,
+                            **options):
+        """
+        Translate SPL code to Java, without joining the result into one string.
+        :param spl: The SPL code.
+        :param java_classname: The name of the output Java class.
+        :param stats: An optional TranslationStats to fill with timings and counters.
+        :param executor: An optional concurrent.futures.Executor to parse a big play in parallel with:
+            see parse().
+        :param limits: Optional Limits on the play, the output and the time taken, for translating
+            plays from untrusted sources (see limits.py).
+        :param recover: If True, find every error in the play before raising them all at once: see parse().
+        :param options: Options for code generation: see emit().
+        :returns: A list of strings which make up the Java code when concatenated.
+        :raises SplError: If there is an error in the SPL code, or a LimitError if it goes over a limit.
+        """
+
+        if limits is not None:
+            limits = limits.start()
+        play = self.parse(spl, stats, executor, limits, recover)
+        return emit(play, java_classname, stats=stats, limits=limits, **options)
+
+    def translate(self, spl, java_classname, stats=None, **options):
+        """
+        Translate SPL code to Java.
+        :param spl: The SPL code.
+        :param java_classname: The name of the output Java class.
+        :param stats: An optional TranslationStats to fill with timings and counters.
+        :param options: Options for code generation, e.g. target='c': see emit(); or an executor to
+            parse a big play in parallel with: see parse(); or limits or recover: see translate_fragments().
+        :returns: The translated Java code.
+        :raises SplError: If there is an error in the SPL code.
+        """
+
+        java = self.translate_fragments(spl, java_classname, stats, **options)
+
+        with timed(stats, 'emit'):
+            java = ''.join(java)
+
+        if stats is not None:
+            stats.output_bytes += len(java.encode())
+        return java
+
+    def translate_to(self, spl, java_classname, out, stats=None, **options):
+        """
+        Translate SPL code to Java, writing the Java code to a file-like object piece by
+        piece instead of building it up as one string first.
+        :param spl: The SPL code.
+        :param java_classname: The name of the output Java class.
+        :param out: The file-like object (with a write() method) to write the Java code to.
+        :param stats: An optional TranslationStats to fill with timings and counters.
+        :param options: Options for code generation: see emit(); or an executor: see parse(); or limits
+            or recover: see translate_fragments().
+        :raises SplError: If there is an error in the SPL code. Nothing is written in that case.
+        """
+
+        java = self.translate_fragments(spl, java_classname, stats, **options)
+
+        with timed(stats, 'emit'):
+            for fragment in java:
+                out.write(fragment)
+                if stats is not None:
+                    stats.output_bytes += len(fragment.encode())
+
+    def translate_iter(self, jobs, executor=None, **options):
+        """
+        Translate many SPL programs, yielding each result as soon as it (and all of the
+        ones before it) are done.
+        :param jobs: An iterable of (spl, java_classname) pairs.
+        :param executor: An optional concurrent.futures.Executor to translate the jobs with,
+            e.g. a ThreadPoolExecutor. If None, the jobs are translated one at a time.
+        :param options: Options for code generation: see emit().
+        :returns: A generator of the Java code for each job, in the same order as jobs.
+        :raises SplError: when the result of a job with an error in its SPL code is reached.
+        """
+
+        if executor is None:
+            for spl, java_classname in jobs:
+                yield self.translate(spl, java_classname, **options)
+        else:
+            futures = [executor.submit(self.translate, spl, java_classname, **options)
+                       for spl, java_classname in jobs]
+            for future in futures:
+                yield future.result()
+
+    def translate_many(self, jobs, executor=None, **options):
+        """
+        Translate many SPL programs.
+        :param jobs: An iterable of (spl, java_classname) pairs.
+        :param executor: An optional concurrent.futures.Executor to translate the jobs with.
+        :param options: Options for code generation: see emit().
+        :returns: A list of the Java code for each job, in the same order as jobs.
+        :raises SplError: if any job has an error in its SPL code.
+        """
+        return list(self.translate_iter(jobs, executor, **options))
+
+
+DEFAULT_TRANSLATOR = Translator()
+
+
+def translate(spl, java_classname, stats=None, **options):
+    """
+    This is the main entry point for actual SPL to Java translation.
+    :param spl: The SPL code.
+    :param java_classname: The name of the output Java class.
+    :param stats: An optional TranslationStats to fill with timings and counters.
+    :param options: Options for code generation, e.g. target='c' or structured=True: see emit(); or
+        an executor to parse a big play in parallel with: see Translator.parse(); or Limits for
+        translating plays from untrusted sources, or recover=True to report every error in the play
+        at once: see Translator.translate_fragments().
+    :returns: The translated Java code.
+    :raises SplError: If there is an error in the SPL code.
+    """
+    return DEFAULT_TRANSLATOR.translate(spl, java_classname, stats, **options)